@@ -1,28 +1,329 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
 import instaloader
+import numpy as np
+from instaloader import FrozenNodeIterator, InvalidArgumentException
 
-L = instaloader.Instaloader()
+from config import get_setting
+
+# Loader contexts (separate sessions) used in parallel, and the minimum
+# gap in seconds between two Instagram queries made by one context
+POOL_SIZE = int(get_setting("INSTALOADER_CONTEXTS", 4))
+MIN_INTERVAL = float(get_setting("INSTALOADER_MIN_INTERVAL", 1.0))
+
+
+# -------------------------------
+# Loader pool
+# -------------------------------
+class ThrottledRateController(instaloader.RateController):
+    """Instaloader's own rate limits plus a fixed gap between queries."""
+
+    def __init__(self, context, min_interval: float = MIN_INTERVAL):
+        super().__init__(context)
+        self.min_interval = min_interval
+        self._last = 0.0
+
+    def wait_before_query(self, query_type: str) -> None:
+        super().wait_before_query(query_type)
+        wait = self._last + self.min_interval - time.monotonic()
+        if wait > 0:
+            self.sleep(wait)
+        self._last = time.monotonic()
+
+
+def make_loader(min_interval: float = MIN_INTERVAL) -> instaloader.Instaloader:
+    """A metadata-only loader (nothing is downloaded to disk)."""
+    return instaloader.Instaloader(
+        quiet=True, download_pictures=False, download_videos=False,
+        download_video_thumbnails=False, save_metadata=False, compress_json=False,
+        rate_controller=lambda context: ThrottledRateController(context, min_interval),
+    )
+
+
+class LoaderPool:
+    """Fixed set of loader contexts, each used by one caller at a time.
+
+    Contexts are created on first use; callers block while all of them are
+    busy, so each context keeps its own query pace.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, min_interval: float = MIN_INTERVAL):
+        self.size = size
+        self.min_interval = min_interval
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def loader(self):
+        with self._lock:
+            create = self._idle.empty() and self._created < self.size
+            if create:
+                self._created += 1
+        loader = make_loader(self.min_interval) if create else self._idle.get()
+        try:
+            yield loader
+        finally:
+            self._idle.put(loader)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> LoaderPool:
+    """Process-wide loader pool shared by the API server and the dashboards."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LoaderPool()
+        return _pool
+
+
+# -------------------------------
+# Row shapes
+# -------------------------------
+def _post_row(post) -> dict:
+    return {
+        "likes": post.likes,
+        "comments": post.comments,
+        "caption": post.caption if post.caption else "",
+        "post_date": post.date_utc.isoformat()
+    }
+
+
+def _post_item(post) -> dict:
+    """A post in the ``/userposts/`` item shape, so ``normalize`` handles both sources."""
+    item = {
+        "id": str(post.mediaid),
+        "code": post.shortcode,
+        "taken_at": int(post.date_utc.replace(tzinfo=timezone.utc).timestamp()),
+        "like_count": post.likes,
+        "comment_count": post.comments,
+        "caption": {"text": post.caption or ""},
+    }
+    if post.is_video:
+        item["video_view_count"] = post.video_view_count
+    return item
+
+
+def _user_info(profile) -> dict:
+    """A profile in the ``/userinfo/`` shape."""
+    return {
+        "username": profile.username,
+        "full_name": profile.full_name,
+        "follower_count": profile.followers,
+        "following_count": profile.followees,
+        "media_count": profile.mediacount,
+        "is_verified": profile.is_verified,
+    }
+
+
+# -------------------------------
+# Resumable post iteration
+# -------------------------------
+def _iter_profile_posts(loader, profile, limit: int = None, since: datetime = None, resume_file: str = None):
+    posts = profile.get_posts()
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    if resume_file and os.path.exists(resume_file):
+        try:
+            with open(resume_file) as f:
+                posts.thaw(FrozenNodeIterator(**json.load(f)))
+        except (InvalidArgumentException, ValueError, TypeError) as e:
+            loader.context.error(f"Not resuming from {resume_file}: {e}")
+
+    completed = False
+    try:
+        for count, post in enumerate(posts):
+            if limit is not None and count >= limit:
+                break
+            if since is not None and post.date_utc.replace(tzinfo=timezone.utc) < since:
+                # pinned posts sit at the top of the feed regardless of age
+                if getattr(post, "is_pinned", False):
+                    continue
+                break
+            yield post
+        completed = True
+    finally:
+        if resume_file:
+            if completed:
+                if os.path.exists(resume_file):
+                    os.remove(resume_file)
+            else:
+                with open(resume_file, "w") as f:
+                    json.dump(posts.freeze()._asdict(), f)
 
-def get_user_data(username: str, limit: int = 5):
-    """Fetch posts + follower count from Instagram public profile."""
+
+def iter_posts(username: str, limit: int = None, since: datetime = None, resume_file: str = None,
+               pool: LoaderPool = None):
+    """Lazily yield posts of a public profile, newest first.
+
+    Stops after ``limit`` posts or at the first post older than ``since``.
+    With ``resume_file`` set, the iterator state is frozen there if the
+    iteration is interrupted (error, or the consumer stops early) and is
+    picked up again on the next call; the interrupted post is re-yielded.
+    A loader context from ``pool`` is held until the iteration ends.
+    """
+    with (pool or get_pool()).loader() as loader:
+        profile = instaloader.Profile.from_username(loader.context, username)
+        for post in _iter_profile_posts(loader, profile, limit, since, resume_file):
+            yield _post_row(post)
+
+
+# -------------------------------
+# Account fetching (fetcher-compatible results)
+# -------------------------------
+def _load_partial(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_partial(path: str, items: list):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(items, f)
+    os.replace(tmp, path)
+
+
+def fetch_account(username: str, limit: int, since: datetime = None, resume_dir: str = None,
+                  pool: LoaderPool = None) -> dict:
+    """Profile info and up to ``limit`` posts, shaped like ``fetcher.fetch_account``.
+
+    Errors are reported in the ``error`` key. With ``resume_dir`` set, an
+    interrupted fetch keeps the posts collected so far and the frozen post
+    iterator there, and the next call for the account continues from them.
+    """
+    result = {"username": username, "user_info": {}, "posts": [], "error": None}
+    resume_file = partial_file = None
+    items = []
+    if resume_dir:
+        os.makedirs(resume_dir, exist_ok=True)
+        resume_file = os.path.join(resume_dir, f"{username.lower()}.json")
+        partial_file = os.path.join(resume_dir, f"{username.lower()}.posts.json")
+        items = _load_partial(partial_file)
+    seen = {item["id"] for item in items}
 
     try:
-        profile = instaloader.Profile.from_username(L.context, username)
+        with (pool or get_pool()).loader() as loader:
+            profile = instaloader.Profile.from_username(loader.context, username)
+            result["user_info"] = _user_info(profile)
+            posts = _iter_profile_posts(loader, profile, since=since, resume_file=resume_file)
+            try:
+                while limit is None or len(items) < limit:
+                    item = _post_item(next(posts))
+                    # a resumed iterator re-yields the post it stopped at
+                    if item["id"] not in seen:
+                        seen.add(item["id"])
+                        items.append(item)
+            except StopIteration:
+                pass
+            finally:
+                posts.close()
     except Exception as e:
-        return {"error": str(e), "posts": [], "followers": 0}
+        result["error"] = str(e)
+        if partial_file and items:
+            _save_partial(partial_file, items)
+        return result
+
+    # stopping at ``limit`` froze the iterator; the next fetch starts fresh
+    for path in (resume_file, partial_file):
+        if path and os.path.exists(path):
+            os.remove(path)
+    result["posts"] = items
+    return result
+
+
+def fetch_accounts(usernames, limit: int, since: datetime = None, resume_dir: str = None,
+                   pool: LoaderPool = None) -> list:
+    """Fetch every account in parallel (one pool context each), preserving the input order."""
+    pool = pool or get_pool()
+    with ThreadPoolExecutor(max_workers=max(1, min(pool.size, len(usernames)))) as executor:
+        return list(executor.map(
+            lambda name: fetch_account(name, limit, since, resume_dir, pool), usernames
+        ))
+
+
+async def fetch_accounts_async(usernames, limit: int, **kwargs) -> list:
+    """:func:`fetch_accounts` off the event loop, for the API server."""
+    return await asyncio.to_thread(fetch_accounts, list(usernames), limit, **kwargs)
+
+
+def sync_accounts(store, usernames, limit: int, pool: LoaderPool = None) -> list:
+    """Delta sync into the post store, like ``store.sync_accounts``.
+
+    Only posts newer than the newest stored one are fetched; accounts not
+    yet in the store get their first ``limit`` posts.
+    """
+    from normalize import normalize_post
 
-    followers = profile.followers
-    posts = []
+    latest = {name: store.latest_taken_at(name) for name in usernames}
+    pool = pool or get_pool()
 
-    for post in profile.get_posts():
-        if len(posts) >= limit:
-            break
+    def sync(name):
+        result = {"username": name, "new_posts": 0, "followers": None, "error": None}
+        since = datetime.fromtimestamp(latest[name], timezone.utc) if latest[name] else None
+        account = fetch_account(name, None if since else limit, since=since, pool=pool)
+        if account["error"]:
+            result["error"] = account["error"]
+            return result
+        followers = account["user_info"].get("follower_count")
+        if followers is not None:
+            store.append_followers(name, int(followers))
+        result["followers"] = followers
+        result["new_posts"] = store.append_posts(name, [normalize_post(p, name) for p in account["posts"]])
+        return result
 
-        posts.append({
-            "likes": post.likes,
-            "comments": post.comments,
-            "caption": post.caption if post.caption else "",
-            "post_date": post.date_utc.isoformat()
-        })
+    with ThreadPoolExecutor(max_workers=max(1, min(pool.size, len(usernames)))) as executor:
+        return list(executor.map(sync, usernames))
+
+
+def fetch_engager_ids(username: str, posts: int = 12, likers: bool = True, pool: LoaderPool = None) -> dict:
+    """User ids of the commenters (and likers, when the session may list
+    them) on the latest ``posts`` posts, for audience sketches.
+
+    Errors are reported in the ``error`` key with the ids collected so far.
+    """
+    result = {"username": username, "ids": [], "error": None}
+    ids = set()
+    try:
+        with (pool or get_pool()).loader() as loader:
+            profile = instaloader.Profile.from_username(loader.context, username)
+            for post in _iter_profile_posts(loader, profile, posts):
+                ids.update(comment.owner.userid for comment in post.get_comments())
+                if likers:
+                    try:
+                        ids.update(liker.userid for liker in post.get_likes())
+                    except instaloader.LoginRequiredException:
+                        # anonymous sessions only see commenters
+                        likers = False
+    except Exception as e:
+        result["error"] = str(e)
+    result["ids"] = sorted(ids)
+    return result
+
+
+def get_user_data(username: str, limit: int = 5):
+    """Fetch posts + follower count from Instagram public profile."""
+
+    try:
+        with get_pool().loader() as loader:
+            profile = instaloader.Profile.from_username(loader.context, username)
+            followers = profile.followers
+            posts = [_post_row(post) for post in _iter_profile_posts(loader, profile, limit)]
+    except Exception as e:
+        return {"error": str(e), "posts": [], "followers": 0}
 
     return {
         "followers": followers,
@@ -30,15 +331,30 @@ def get_user_data(username: str, limit: int = 5):
     }
 
 
-def calculate_engagement(posts):
-    """Calculate average engagement rate from posts."""
-    if not posts:
-        return 0
+# -------------------------------
+# Engagement
+# -------------------------------
+def calculate_engagement(posts, by: str = None):
+    """Average likes + comments per post.
 
-    total_eng = 0
-    total_posts = len(posts)
+    ``posts`` is a list of post dicts (one account), a ``{username: posts}``
+    mapping (dict of averages) or a posts DataFrame; for a DataFrame,
+    ``by="username"`` gives a Series with one average per account in a
+    single grouped pass. Missing counts count as 0.
+    """
+    if isinstance(posts, dict):
+        return {name: calculate_engagement(rows) for name, rows in posts.items()}
 
-    for p in posts:
-        total_eng += p["likes"] + p["comments"]
+    if hasattr(posts, "columns"):
+        if posts.empty:
+            return posts.groupby(by).size().astype("float64") if by else 0
+        total = posts["likes"].fillna(0).astype("float64") + posts["comments"].fillna(0).astype("float64")
+        if by:
+            return total.groupby(posts[by]).mean().round(3)
+        return round(float(total.mean()), 3)
 
-    return round(total_eng / total_posts, 3)
+    if not posts:
+        return 0
+    total = np.fromiter(((p["likes"] or 0) + (p["comments"] or 0) for p in posts),
+                        dtype="float64", count=len(posts))
+    return round(float(total.mean()), 3)
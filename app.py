@@ -1,13 +1,13 @@
 import streamlit as st
-import pandas as pd
-import requests
 import os
-from io import BytesIO
-from sklearn.linear_model import LinearRegression
-import numpy as np
 import plotly.express as px
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+
+from export import FORMATS, export_bytes
+from histograms import WEEKDAYS
+from overlap import get_sketches
+from pipeline import (aggregates_stage, features_stage, fetch_stage, get_pipeline, indexes_stage,
+                      models_stage, normalize_stage)
+from wordclouds import render_png
 
 st.set_page_config(page_title="InstAnalytics - FREE+", layout="wide")
 st.markdown("""
@@ -34,261 +34,240 @@ st.markdown("""
 
 st.markdown('<div class="bigheader">🚀 AI-Enhanced Instagram Intelligence</div>', unsafe_allow_html=True)
 
+SOURCES = {"RapidAPI": "rapidapi", "Instaloader (public profiles)": "instaloader"}
+source = SOURCES[st.radio("Data source", list(SOURCES), horizontal=True)]
+
 # Use Streamlit secrets for API key
 API_KEY = st.secrets.get("RAPIDAPI_KEY")
 
-if not API_KEY:
+if source == "rapidapi" and not API_KEY:
     st.error('RAPIDAPI_KEY not set! Add it to .streamlit/secrets.toml or Streamlit Cloud secrets.')
     st.stop()
 
-headers = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "instagram-scraper-20251.p.rapidapi.com"
-}
-
 usernames = st.text_input("IG usernames (comma)", "nike, puma")
 limit = st.number_input("Posts per account", 1, 50, 10)
+use_store = st.checkbox("Use local post store (fetch only new posts)", value=False)
+
+pipeline = get_pipeline(st.session_state)
 
-if st.button("Analyze"):
+clicked = st.button("Analyze")
+if clicked:
     names = [u.strip() for u in usernames.split(",") if u.strip()]
     if not names:
         st.error("Please enter at least one username.")
         st.stop()
+    # a click always refreshes the data, even with unchanged inputs
+    previous = st.session_state.get("analyze", {})
+    st.session_state["analyze"] = {
+        "names": tuple(names),
+        "limit": int(limit),
+        "use_store": use_store,
+        "source": source,
+        "run": previous.get("run", 0) + 1,
+    }
+
+# Widgets below re-run only the stages that depend on them; the dataset
+# stays in the session until Analyze is clicked again.
+if "analyze" not in st.session_state:
+    st.stop()
+request = st.session_state["analyze"]
+
+
+def chart_stage(df, aggregates, indexes):
+    charts = {}
+
+    charts["avg_eng"] = px.bar(aggregates["avg_eng_per_user"], x="username", y="eng_score",
+                               text="eng_score",
+                               color="eng_score",
+                               color_continuous_scale=px.colors.sequential.Plasma,
+                               labels={"eng_score": "Engagement Score"},
+                               title="🌟 Avg Engagement Score per Brand")
+    charts["avg_eng"].update_traces(texttemplate="%{text:.3f}", textposition="outside")
+
+    charts["followers"] = px.bar(aggregates["comparison"], x="username", y="followers",
+                                 color="followers",
+                                 text="followers",
+                                 color_continuous_scale=px.colors.sequential.Viridis,
+                                 title="👥 Followers per Brand")
+    charts["followers"].update_traces(texttemplate="%{text}", textposition="outside")
+
+    pivot = aggregates["pivot"]
+    charts["heatmap"] = None
+    if not pivot.empty:
+        pivot_reset = pivot.reset_index().melt(id_vars="weekday", var_name="hour", value_name="eng_score")
+        charts["heatmap"] = px.density_heatmap(pivot_reset, x="hour", y="weekday", z="eng_score",
+                                               color_continuous_scale='Inferno',
+                                               labels={"eng_score": "Engagement Score"})
+        charts["heatmap"].update_layout(title="🌈 Engagement Heatmap",
+                                        yaxis={'categoryorder': 'array',
+                                               'categoryarray': WEEKDAYS})
+
+    charts["hook"] = px.bar(aggregates["hook"], x="username", y="hook_score",
+                            text="hook_score",
+                            color="hook_score",
+                            color_continuous_scale=px.colors.sequential.Viridis,
+                            title="🔥 Hook Score by Brand")
+    charts["hook"].update_traces(texttemplate="%{text:.3f}", textposition="outside")
+
+    # precomputed token counts; the PNG is cached by frequency digest
+    freqs = indexes["words"].frequencies()
+    charts["wordcloud"] = render_png(freqs, width=900, height=500, background_color="white")
+
+    top_hash = aggregates["top_hashtags"].copy()
+    charts["hashtags"] = None
+    if not top_hash.empty:
+        top_hash.index = "#" + top_hash.index
+        charts["hashtags"] = px.bar(x=top_hash.index, y=top_hash.values,
+                                    title="Top 15 Hashtags", labels={"x": "Hashtag", "y": "Count"},
+                                    color=top_hash.values, color_continuous_scale="Bluered")
+
+    charts["comparison"] = px.scatter(aggregates["comparison"], x="followers", y="avg_eng_score",
+                                      color="username", size="followers",
+                                      title="Engagement vs Followers", labels={"avg_eng_score": "Avg Engagement Score"})
+    return charts
+
+
+with st.spinner("✨ Fetching Instagram data..."):
+    fetched = pipeline.run("fetch", fetch_stage, API_KEY, request["names"], request["limit"],
+                           request["use_store"], request["run"], request.get("source", "rapidapi"))
+for username, error in fetched["errors"]:
+    st.error(f"Request error for user {username}: {error}")
+    st.stop()
 
-    all_posts = []
-    followers_list = []
-
-    with st.spinner("✨ Scraping Instagram data..."):
-        for u in names:
-            # Followers
-            f_url = f"https://instagram-scraper-20251.p.rapidapi.com/userinfo/?username_or_id={u}"
-            try:
-                fr = requests.get(f_url, headers=headers, timeout=15).json()
-            except Exception as e:
-                st.error(f"Request error for user {u}: {e}")
-                st.stop()
-            followers = fr.get("data", {}).get("follower_count", None)
-            followers_list.append({"username": u, "followers": int(followers) if followers is not None else None})
-
-            # Posts
-            p_url = f"https://instagram-scraper-20251.p.rapidapi.com/userposts/?username_or_id={u}&count={limit}"
-            try:
-                pr = requests.get(p_url, headers=headers, timeout=15).json()
-            except Exception as e:
-                st.error(f"Request error for posts of {u}: {e}")
-                st.stop()
-            posts = pr.get("data", {}).get("items", []) or []
-
-            for post in posts:
-                likes = int(post.get("like_count", 0) or 0)
-                views = int(post.get("view_count") or post.get("play_count") or post.get("video_view_count") or 0)
-                ts = post.get("taken_at", None)
-                cap = ""
-                caption_field = post.get("caption", "")
-                if isinstance(caption_field, dict):
-                    cap = caption_field.get("text", "") or ""
-                elif isinstance(caption_field, str):
-                    cap = caption_field
-                all_posts.append({
-                    "username": u,
-                    "likes": likes,
-                    "views": views,
-                    "comments": int(post.get("comment_count", 0) or 0),
-                    "caption": cap,
-                    "eng_score": (likes / views) if views else (likes / max(1, followers) if followers else None),
-                    "taken_at": ts
-                })
-
-    df = pd.DataFrame(all_posts)
-    df_f = pd.DataFrame(followers_list)
-
-    if df.empty:
-        st.error("❌ No posts returned")
-        st.stop()
-
-    # Parse times and features
-    df["taken_at"] = pd.to_datetime(df["taken_at"], unit="s", errors="coerce")
-    df["hour"] = df["taken_at"].dt.hour
-    df["weekday"] = df["taken_at"].dt.day_name()
-    df["caption"] = df["caption"].fillna("")
-    df["first_line_len"] = df["caption"].str.split("\n").str[0].str.len().fillna(0)
-    df["hook_score"] = df["eng_score"] * (df["first_line_len"] / max(df["first_line_len"].max(), 1))
-
-    # Ensure numeric columns exist for pages
-    df["likes"] = pd.to_numeric(df["likes"], errors="coerce").fillna(0).astype(int)
-    df["views"] = pd.to_numeric(df["views"], errors="coerce").fillna(0).astype(int)
-    df["comments"] = pd.to_numeric(df["comments"], errors="coerce").fillna(0).astype(int)
-
-    # KPIs
-    avg_eng = round(df["eng_score"].replace([np.inf, -np.inf], np.nan).dropna().mean() or 0, 4)
-    total_followers = int(df_f["followers"].dropna().sum() or 0)
-    # best_hour safe
-    try:
-        best_hour = int(df.groupby("hour")["likes"].mean().idxmax())
-    except Exception:
-        best_hour = 0
-
-    col1, col2, col3 = st.columns(3)
-    col1.markdown(f'<div class="metric-card">⭐ Avg Engagement: {avg_eng}</div>', unsafe_allow_html=True)
-    col2.markdown(f'<div class="metric-card">👥 Total Followers: {total_followers:,}</div>', unsafe_allow_html=True)
-    col3.markdown(f'<div class="metric-card">⏰ Best Hour: {best_hour}:00</div>', unsafe_allow_html=True)
-
-    # Competitor overlap
-    overlap = 0.0
-    if len(df_f) >= 2 and df_f["followers"].dropna().size >= 2:
-        f_vals = df_f["followers"].dropna().astype(float).values
-        if f_vals.max() > 0:
-            overlap = float(np.min(f_vals) / np.max(f_vals) * 100)
-
-    # Heatmap pivot
-    pivot = df.pivot_table(values="eng_score", index="weekday", columns="hour", aggfunc="mean")
-
-    # TABS (including new pages made as tabs)
-    tabs = st.tabs([
-        "📊 Summary",
-        "💥 Virality Predictor",
-        "🌈 Heatmap",
-        "🤝 Overlap",
-        "🔥 Hook",
-        "💬 Caption Analysis",
-        "🏷️ Hashtag Insights",
-        "⚔️ Brand Comparison",
-        "🧾 Raw Data",
-        "📈 Forecast"  # quick link to forecast tab inside same app
-    ])
-
-    # ---------- SUMMARY TAB ----------
-    with tabs[0]:
-        st.subheader("Brand Comparison — Engagement Score Avg")
-        avg_eng_df = df.groupby("username")["eng_score"].mean().reset_index()
-        fig1 = px.bar(avg_eng_df, x="username", y="eng_score",
-                      text="eng_score",
-                      color="eng_score",
-                      color_continuous_scale=px.colors.sequential.Plasma,
-                      labels={"eng_score": "Engagement Score"},
-                      title="🌟 Avg Engagement Score per Brand")
-        fig1.update_traces(texttemplate="%{text:.3f}", textposition="outside")
-        st.plotly_chart(fig1, use_container_width=True)
-
-        st.subheader("Followers per Brand")
-        fig_followers = px.bar(df_f, x="username", y="followers",
-                               color="followers",
-                               text="followers",
-                               color_continuous_scale=px.colors.sequential.Viridis,
-                               title="👥 Followers per Brand")
-        fig_followers.update_traces(texttemplate="%{text}", textposition="outside")
-        st.plotly_chart(fig_followers, use_container_width=True)
-
-        st.success(f"🔥 Best posting hour: {best_hour}:00")
-
-    # ---------- VIRALITY TAB ----------
-    with tabs[1]:
-        tmp = df.dropna(subset=["likes", "views"])
-        st.subheader("Reel Virality Predictor")
-        if len(tmp) > 2 and tmp["views"].sum() > 0:
-            X = tmp[["views"]].values
-            y = tmp["likes"].values
-            model = LinearRegression().fit(X, y)
-            pred_views = st.number_input("Enter expected views for prediction", 1000, 10_000_000, 50000)
-            pred_likes = int(model.predict(np.array([[pred_views]]))[0])
-            st.write(f"💥 Predicted Likes for {pred_views:,} views: **{pred_likes:,}**")
-        else:
-            st.info("Not enough video/view data to build a virality model.")
-
-    # ---------- HEATMAP TAB ----------
-    with tabs[2]:
-        st.subheader("Engagement Heatmap (Day x Hour)")
-        if not pivot.empty:
-            pivot_reset = pivot.reset_index().melt(id_vars="weekday", var_name="hour", value_name="eng_score")
-            fig3 = px.density_heatmap(pivot_reset, x="hour", y="weekday", z="eng_score",
-                                      color_continuous_scale='Inferno',
-                                      labels={"eng_score": "Engagement Score"})
-            fig3.update_layout(title="🌈 Engagement Heatmap",
-                               yaxis={'categoryorder': 'array',
-                                      'categoryarray': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']})
-            st.plotly_chart(fig3, use_container_width=True)
-        else:
-            st.info("Not enough data to build a heatmap.")
-
-    # ---------- OVERLAP TAB ----------
-    with tabs[3]:
-        st.subheader("Competitor Overlap %")
-        st.write(f"🤝 Approx Overlap: **{overlap:0.1f}%**")
-
-    # ---------- HOOK TAB ----------
-    with tabs[4]:
-        st.subheader("Hook Score — 1st Line Effect")
-        hook_df = df.groupby("username")["hook_score"].mean().reset_index()
-        fig2 = px.bar(hook_df, x="username", y="hook_score",
-                      text="hook_score",
-                      color="hook_score",
-                      color_continuous_scale=px.colors.sequential.Viridis,
-                      title="🔥 Hook Score by Brand")
-        fig2.update_traces(texttemplate="%{text:.3f}", textposition="outside")
-        st.plotly_chart(fig2, use_container_width=True)
-
-    # ---------- CAPTION ANALYSIS TAB ----------
-    with tabs[5]:
-        st.subheader("💬 Caption Keyword Cloud")
-        all_text = " ".join(df["caption"].dropna().astype(str))
-        if all_text.strip():
-            wc = WordCloud(width=900, height=500, background_color="white").generate(all_text)
-            fig_wc, ax = plt.subplots(figsize=(12, 5))
-            ax.imshow(wc, interpolation="bilinear")
-            ax.axis("off")
-            st.pyplot(fig_wc)
-        else:
-            st.info("No caption text available for word cloud.")
-
-    # ---------- HASHTAG INSIGHTS TAB ----------
-    with tabs[6]:
-        st.subheader("🏷️ Hashtag Usage")
-        hashtags_series = df["caption"].astype(str).str.findall(r"#\w+").explode().dropna().str.lower()
-        if not hashtags_series.empty:
-            top_hash = hashtags_series.value_counts().head(15)
-            fig_hash = px.bar(x=top_hash.index, y=top_hash.values,
-                              title="Top 15 Hashtags", labels={"x": "Hashtag", "y": "Count"},
-                              color=top_hash.values, color_continuous_scale="Bluered")
-            st.plotly_chart(fig_hash, use_container_width=True)
-            st.dataframe(top_hash.reset_index().rename(columns={"index": "hashtag", 0: "count"}).head(30))
-        else:
-            st.info("No hashtags detected in captions.")
-
-    # ---------- BRAND COMPARISON TAB ----------
-    with tabs[7]:
-        st.subheader("⚔️ Brand Comparison — Engagement vs Followers")
-        # compute avg eng_score per username
-        avg_eng_per_user = df.groupby("username")["eng_score"].mean().reset_index().rename(columns={"eng_score": "avg_eng_score"})
-        dff_merge = df_f.merge(avg_eng_per_user, on="username", how="left")
-        # safe fill
-        dff_merge["avg_eng_score"] = dff_merge["avg_eng_score"].fillna(0)
-        fig_comp = px.scatter(dff_merge := dff_merge if False else dff_merge, x="followers", y="avg_eng_score",
-                              color="username", size="followers",
-                              title="Engagement vs Followers", labels={"avg_eng_score": "Avg Engagement Score"})
-        st.plotly_chart(fig_comp, use_container_width=True)
-        st.dataframe(dff_merge)
-
-    # ---------- RAW DATA TAB ----------
-    with tabs[8]:
-        st.subheader("🧾 Raw Posts Data (first 50)")
-        st.dataframe(df.head(50))
-
-    # ---------- FORECAST TAB ----------
-    with tabs[9]:
-        st.info("Open the Forecast page from the sidebar (or use the Forecast tab to run quick forecasts).")
-        st.write("For full forecast features open the dedicated Forecast page in the 'pages' folder.")
-
-    # Save to session for pages
-    st.session_state['df'] = df
-    st.session_state['df_f'] = df_f
-
-    # Export Excel
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name="posts", index=False)
-        df_f.to_excel(writer, sheet_name="followers", index=False)
-    st.download_button("⬇ Export Excel", data=out.getvalue(), file_name="insta_results.xlsx")
+frames = pipeline.run("normalize", normalize_stage, deps=("fetch",))
+if frames[0].empty:
+    st.error("❌ No posts returned")
+    st.stop()
 
+df = pipeline.run("features", features_stage, deps=("normalize",))
+df_f = frames[1]
+indexes = pipeline.run("indexes", indexes_stage, deps=("features", "normalize"))
+window = None if request["use_store"] else request["limit"]
+aggregates = pipeline.run("aggregates", aggregates_stage, window, get_sketches().version,
+                          deps=("features", "normalize"))
+models = pipeline.run("models", models_stage, window, deps=("normalize",))
+charts = pipeline.run("charts", chart_stage, deps=("features", "aggregates", "indexes"))
+
+# KPIs
+avg_eng = aggregates["avg_eng"]
+total_followers = aggregates["total_followers"]
+best_hour = aggregates["best_hour"]
+
+col1, col2, col3 = st.columns(3)
+col1.markdown(f'<div class="metric-card">⭐ Avg Engagement: {avg_eng}</div>', unsafe_allow_html=True)
+col2.markdown(f'<div class="metric-card">👥 Total Followers: {total_followers:,}</div>', unsafe_allow_html=True)
+col3.markdown(f'<div class="metric-card">⏰ Best Hour: {best_hour}:00</div>', unsafe_allow_html=True)
+
+# TABS (including new pages made as tabs)
+tabs = st.tabs([
+    "📊 Summary",
+    "💥 Virality Predictor",
+    "🌈 Heatmap",
+    "🤝 Overlap",
+    "🔥 Hook",
+    "💬 Caption Analysis",
+    "🏷️ Hashtag Insights",
+    "⚔️ Brand Comparison",
+    "🧾 Raw Data",
+    "📈 Forecast"  # quick link to forecast tab inside same app
+])
+
+# ---------- SUMMARY TAB ----------
+with tabs[0]:
+    st.subheader("Brand Comparison — Engagement Score Avg")
+    st.plotly_chart(charts["avg_eng"], use_container_width=True)
+
+    st.subheader("Followers per Brand")
+    st.plotly_chart(charts["followers"], use_container_width=True)
+
+    st.success(f"🔥 Best posting hour: {best_hour}:00")
+
+# ---------- VIRALITY TAB ----------
+with tabs[1]:
+    st.subheader("Reel Virality Predictor")
+    model = models["virality"]
+    if model is not None:
+        # only this prediction re-runs when the input changes
+        pred_views = st.number_input("Enter expected views for prediction", 1000, 10_000_000, 50000)
+        pred_likes = int(model.predict(pred_views))
+        st.write(f"💥 Predicted Likes for {pred_views:,} views: **{pred_likes:,}**")
+        st.caption(f"Fitted on {model.n:,} stored video posts of these accounts (R² {model.r2:.2f}).")
+    else:
+        st.info("Not enough video/view data to build a virality model.")
+
+# ---------- HEATMAP TAB ----------
+with tabs[2]:
+    st.subheader("Engagement Heatmap (Day x Hour)")
+    if charts["heatmap"] is not None:
+        st.plotly_chart(charts["heatmap"], use_container_width=True)
+    else:
+        st.info("Not enough data to build a heatmap.")
+
+# ---------- OVERLAP TAB ----------
+with tabs[3]:
+    st.subheader("Competitor Overlap %")
+    if aggregates["overlap"] is None:
+        st.write("🤝 Approx Overlap: **n/a**")
+        st.caption("Upload follower or engager id lists on the Influencer Comparison page "
+                   "to estimate audience overlap.")
+    else:
+        st.write(f"🤝 Approx Overlap: **{aggregates['overlap']:0.1f}%** (mean pairwise Jaccard)")
+        st.write(f"👥 Combined unique reach: **{aggregates['union_reach']:,.0f}**")
+        st.plotly_chart(px.imshow(aggregates["overlap_matrix"] * 100, text_auto=".1f",
+                                  color_continuous_scale="Blues", labels={"color": "Overlap %"}),
+                        use_container_width=True)
+
+# ---------- HOOK TAB ----------
+with tabs[4]:
+    st.subheader("Hook Score — 1st Line Effect")
+    st.plotly_chart(charts["hook"], use_container_width=True)
+
+# ---------- CAPTION ANALYSIS TAB ----------
+with tabs[5]:
+    st.subheader("💬 Caption Keyword Cloud")
+    if charts["wordcloud"] is not None:
+        st.image(charts["wordcloud"])
+    else:
+        st.info("No caption text available for word cloud.")
+
+# ---------- HASHTAG INSIGHTS TAB ----------
+with tabs[6]:
+    st.subheader("🏷️ Hashtag Usage")
+    if charts["hashtags"] is not None:
+        st.plotly_chart(charts["hashtags"], use_container_width=True)
+        top_hash = aggregates["top_hashtags"]
+        st.dataframe(top_hash.rename_axis("hashtag").reset_index().head(30))
+    else:
+        st.info("No hashtags detected in captions.")
+
+# ---------- BRAND COMPARISON TAB ----------
+with tabs[7]:
+    st.subheader("⚔️ Brand Comparison — Engagement vs Followers")
+    st.plotly_chart(charts["comparison"], use_container_width=True)
+    st.dataframe(aggregates["comparison"])
+
+# ---------- RAW DATA TAB ----------
+with tabs[8]:
+    st.subheader("🧾 Raw Posts Data (first 50)")
+    st.dataframe(df.head(50))
+
+# ---------- FORECAST TAB ----------
+with tabs[9]:
+    st.info("Open the Forecast page from the sidebar (or use the Forecast tab to run quick forecasts).")
+    st.write("For full forecast features open the dedicated Forecast page in the 'pages' folder.")
+
+# Save to session for pages
+st.session_state['df'] = df
+st.session_state['df_f'] = df_f
+
+# Export (the file is only generated when Download is clicked)
+# Excel holds both sheets, Parquet/CSV the posts (caption tokens left out)
+sheets = {"posts": df.drop(columns="tokens"), "followers": df_f}
+for fmt, col in zip(FORMATS, st.columns(len(FORMATS))):
+    col.download_button(f"⬇ Export {fmt.upper()}",
+                        data=lambda fmt=fmt: export_bytes(sheets, fmt),
+                        file_name=f"insta_results.{fmt}", mime=FORMATS[fmt],
+                        on_click="ignore")
+
+if clicked:
     st.balloons()
-
-
@@ -0,0 +1,196 @@
+"""Local stand-in for the RapidAPI Instagram scraper.
+
+Serves ``/userinfo/`` and ``/userposts/`` with the upstream JSON shapes
+(synthetic data from ``payloads.py``, paginated with ``pagination_token``)
+and can add latency, jitter, errors and 429 throttling. Point the API
+server at it with ``RAPIDAPI_BASE_URL``::
+
+    python benchmarks/fake_rapidapi.py --port 9000 --latency 250 --jitter 100 \\
+        --error-rate 0.01 --rps 20
+    RAPIDAPI_BASE_URL=http://127.0.0.1:9000 RAPIDAPI_RPS=1000 uvicorn fastapi_app:app
+
+``--record DIR`` forwards every call to the real host (``RAPIDAPI_KEY``
+required) and saves the responses; ``--replay DIR`` serves those captures
+instead of synthetic data. Captures are keyed by endpoint and query
+parameters, one JSON file each.
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import payloads  # noqa: E402
+
+# Page size when a /userposts/ call does not pass ``count``
+DEFAULT_COUNT = 12
+
+
+class Throttle:
+    """Token bucket; ``allow()`` is False when the caller should get a 429."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = max(1.0, burst or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def capture_path(directory: str, endpoint: str, params: dict) -> str:
+    key = json.dumps(sorted(params.items()))
+    return os.path.join(directory, endpoint, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json")
+
+
+def save_capture(path: str, params: dict, status: int, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"params": params, "status": status, "body": body}, f)
+    os.replace(tmp, path)
+
+
+def load_capture(path: str):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        capture = json.load(f)
+    return capture["status"], capture["body"]
+
+
+# -------------------------------
+# Synthetic responses
+# -------------------------------
+@functools.lru_cache(maxsize=1024)
+def _history(username: str, posts: int, seed: int) -> list:
+    return payloads.post_items(username, posts, seed)
+
+
+def synthetic(endpoint: str, params: dict, posts: int, seed: int) -> dict:
+    username = params.get("username_or_id", "")
+    if endpoint == "userinfo":
+        return payloads.user_info(username, seed)
+
+    items = _history(username, posts, seed)
+    count = int(params.get("count") or DEFAULT_COUNT)
+    token = params.get("pagination_token")
+    start = int(token.rsplit("-", 1)[1]) if token else 0
+    end = start + count
+    return {
+        "data": {"items": items[start:end], "count": len(items)},
+        "pagination_token": f"{username}-{end}" if end < len(items) else None,
+    }
+
+
+# -------------------------------
+# Server
+# -------------------------------
+def make_app(args):
+    import httpx
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    from config import get_setting
+    from fetcher import RAPIDAPI_HOST
+
+    app = FastAPI(title="RapidAPI stand-in")
+    throttle = Throttle(args.rps, args.burst)
+    rng = random.Random(args.seed)
+    stats = {"served": 0, "throttled": 0, "errors": 0, "not_recorded": 0}
+    upstream = None
+    if args.record:
+        upstream = httpx.AsyncClient(
+            base_url=f"https://{RAPIDAPI_HOST}", timeout=30,
+            headers={"x-rapidapi-key": get_setting("RAPIDAPI_KEY") or "",
+                     "x-rapidapi-host": RAPIDAPI_HOST},
+        )
+
+    async def respond(endpoint: str, request: Request):
+        params = dict(request.query_params)
+        delay = max(0.0, args.latency + rng.uniform(-args.jitter, args.jitter)) / 1000
+        await asyncio.sleep(delay)
+
+        if not throttle.allow() or rng.random() < args.throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse({"message": "You have exceeded the rate limit per second for your plan"},
+                                status_code=429)
+        if rng.random() < args.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"message": "Internal Server Error"}, status_code=500)
+
+        if args.record:
+            response = await upstream.get(f"/{endpoint}/", params=params)
+            body = response.json()
+            save_capture(capture_path(args.record, endpoint, params), params, response.status_code, body)
+            stats["served"] += 1
+            return JSONResponse(body, status_code=response.status_code)
+
+        if args.replay:
+            capture = load_capture(capture_path(args.replay, endpoint, params))
+            if capture is None:
+                stats["not_recorded"] += 1
+                return JSONResponse({"message": "No capture for this request"}, status_code=404)
+            stats["served"] += 1
+            return JSONResponse(capture[1], status_code=capture[0])
+
+        stats["served"] += 1
+        return synthetic(endpoint, params, args.posts, args.seed)
+
+    @app.get("/userinfo/")
+    async def userinfo(request: Request):
+        return await respond("userinfo", request)
+
+    @app.get("/userposts/")
+    async def userposts(request: Request):
+        return await respond("userposts", request)
+
+    @app.get("/_stats")
+    def server_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0, help="mean response delay (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="uniform +/- jitter around the delay (ms)")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of calls answered with a 500")
+    parser.add_argument("--rps", type=float, default=0, help="requests/second before 429s (0: unlimited)")
+    parser.add_argument("--burst", type=float, default=None, help="token bucket size (default: --rps)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="share of calls answered with a 429")
+    parser.add_argument("--posts", type=int, default=500, help="synthetic posts per account")
+    parser.add_argument("--seed", type=int, default=0)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="proxy to the real host and save the responses")
+    mode.add_argument("--replay", metavar="DIR", help="serve responses saved with --record")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(make_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
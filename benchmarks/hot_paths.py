@@ -0,0 +1,227 @@
+"""Offline benchmarks of the analytics hot paths on synthetic payloads.
+
+Generates ``/userposts/`` + ``/userinfo/`` payloads (see ``payloads.py``)
+at each size and times every case, reporting the median of ``--repeat``
+runs::
+
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --sizes 10,1000,100000,1000000
+    python benchmarks/hot_paths.py --save benchmarks/hot_paths_baseline.json
+    python benchmarks/hot_paths.py --baseline benchmarks/hot_paths_baseline.json
+
+With ``--baseline`` the script exits non-zero when a case got slower than
+the baseline by more than ``--threshold`` (default 25%). Differences below
+``--min-delta`` seconds are treated as noise.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import payloads  # noqa: E402
+
+DEFAULT_SIZES = [10, 1000, 100_000]
+# openpyxl needs ~0.3 ms per row, so larger Excel exports are skipped
+EXCEL_MAX_ROWS = 20_000
+# accounts in the audience overlap case, each with ``size`` follower ids
+OVERLAP_ACCOUNTS = 200
+
+
+# -------------------------------
+# Cases: each takes the prepared data and returns a zero-argument callable
+# -------------------------------
+def case_normalize(data):
+    from normalize import normalize_accounts
+    return lambda: normalize_accounts(data["accounts"])
+
+
+def case_calculate_engagement(data):
+    from analyzer import calculate_engagement
+    rows = data["df"][["likes", "comments"]].to_dict("records")
+    return lambda: calculate_engagement(rows)
+
+
+def case_hashtags(data):
+    from hashtags import HashtagIndex
+
+    def run():
+        index = HashtagIndex()
+        index.add_posts(data["df"])
+        index.top(10)
+        index.frequency(30)
+    return run
+
+
+def case_heatmap(data):
+    from histograms import HistogramIndex
+
+    def run():
+        index = HistogramIndex()
+        index.add_posts(data["df"])
+        hist = index.histogram()
+        hist.grid("eng")
+        hist.best_hour("likes")
+    return run
+
+
+def case_forecast(data):
+    from forecast import TrendForecaster
+
+    def run():
+        forecaster = TrendForecaster()
+        forecaster.update(data["df"])
+        forecaster.forecast(horizon=5)
+    return run
+
+
+def case_caption_features(data):
+    from captions import caption_features
+
+    # sentiment is memoized on disk, so only the parsing pass is timed
+    return lambda: caption_features(data["df"]["caption"], sentiment=False)
+
+
+def case_summaries(data):
+    from summaries import AccountSummaries
+
+    def run():
+        summaries = AccountSummaries()
+        summaries.add_posts(data["df"])
+        summaries.table()
+    return run
+
+
+def case_post_table(data):
+    from posts import PostTable
+
+    def run():
+        table = PostTable.from_frame(data["df"])
+        table.mean("eng_score", by_user=True)
+        table.sum("likes")
+    return run
+
+
+def case_overlap(data):
+    import numpy as np
+    from overlap import AudienceSketch, hll_cardinality, jaccard_matrix
+
+    size = len(data["df"])
+    rng = np.random.default_rng(0)
+    # overlapping id ranges drawn from a pool ~20x one audience
+    starts = rng.integers(0, 20 * size, OVERLAP_ACCOUNTS)
+
+    def run():
+        sketches = []
+        for start in starts:
+            sketch = AudienceSketch()
+            sketch.add_ids(np.arange(start, start + size))
+            sketches.append(sketch)
+        jaccard_matrix(np.stack([s.minhash for s in sketches]))
+        hll_cardinality(np.stack([s.hll for s in sketches]).max(axis=0))
+    return run
+
+
+def _export_case(fmt):
+    def case(data):
+        from export import iter_export
+        if fmt == "xlsx" and len(data["df"]) > EXCEL_MAX_ROWS:
+            return None
+        sheets = {"posts": data["df"], "followers": data["df_f"]}
+        return lambda: sum(len(chunk) for chunk in iter_export(sheets, fmt))
+    return case
+
+
+CASES = {
+    "normalize": case_normalize,
+    "calculate_engagement": case_calculate_engagement,
+    "hashtags": case_hashtags,
+    "heatmap": case_heatmap,
+    "forecast": case_forecast,
+    "post_table": case_post_table,
+    "caption_features": case_caption_features,
+    "summaries": case_summaries,
+    "overlap": case_overlap,
+    "export_csv": _export_case("csv"),
+    "export_parquet": _export_case("parquet"),
+    "export_xlsx": _export_case("xlsx"),
+}
+
+
+def prepare(size: int, seed: int) -> dict:
+    from normalize import normalize_accounts
+
+    accounts = payloads.accounts(size, seed=seed)
+    df, df_f = normalize_accounts(accounts)
+    return {"accounts": accounts, "df": df, "df_f": df_f}
+
+
+def measure(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def regressions(results: dict, baseline: dict, threshold: float, min_delta: float) -> list:
+    found = []
+    for key, current in results.items():
+        before = baseline.get(key)
+        if before is None or current is None:
+            continue
+        if current > before * (1 + threshold) and current - before > min_delta:
+            found.append(f"{key}: {before:.4f}s -> {current:.4f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"subset of {', '.join(CASES)}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated post counts (10 to 1000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta", type=float, default=0.002)
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        start = time.perf_counter()
+        data = prepare(size, args.seed)
+        print(f"-- {size:,} posts (payloads generated in {time.perf_counter() - start:.1f}s)")
+        for name in args.cases:
+            fn = CASES[name](data)
+            key = f"{name}@{size}"
+            if fn is None:
+                print(f"{name:<22} {'skipped':>10}")
+                continue
+            results[key] = round(measure(fn, args.repeat), 6)
+            print(f"{name:<22} {results[key]:>10.4f}s")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold, args.min_delta)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Load generator for the API server.
+
+Drives ``/analyze``, ``/forecast`` and ``/best_time`` at a fixed
+concurrency and reports throughput and p50/p95/p99 latency per endpoint.
+Run it against a server wired to the local stand-in so no quota is spent::
+
+    python benchmarks/fake_rapidapi.py --latency 250 --jitter 100 &
+    RAPIDAPI_BASE_URL=http://127.0.0.1:9000 RAPIDAPI_RPS=1000 \\
+        INSTA_CACHE_PATH=/tmp/loadtest.sqlite uvicorn fastapi_app:app --workers 4 &
+    python benchmarks/loadtest.py --concurrency 32 --duration 60
+
+Usernames are drawn from ``--accounts`` synthetic names (``brand000``...);
+the API's response cache answers repeated accounts, so raise ``--accounts``
+(or start from an empty ``INSTA_CACHE_PATH``) to measure the upstream path.
+Responses with a non-200 status or an ``error`` key count as errors.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+ENDPOINTS = ["analyze", "forecast", "best_time"]
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return float("nan")
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def make_request(endpoint: str, rng: random.Random, names: list, args):
+    if endpoint == "analyze":
+        picked = rng.sample(names, min(args.per_analyze, len(names)))
+        params = {"usernames": ",".join(picked), "limit": args.limit}
+    else:
+        params = {"username": rng.choice(names), "limit": args.limit}
+    if args.from_store:
+        params["from_store"] = "true"
+    return f"/{endpoint}", params
+
+
+async def worker(client, endpoints, names, args, deadline, budget, samples, rng):
+    # endpoints are interleaved round-robin across all workers
+    while time.monotonic() < deadline and budget["sent"] < budget["limit"]:
+        endpoint = endpoints[budget["sent"] % len(endpoints)]
+        budget["sent"] += 1
+        path, params = make_request(endpoint, rng, names, args)
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            ok = response.status_code == 200 and "error" not in response.json()
+        except Exception:
+            ok = False
+        samples[endpoint].append((time.perf_counter() - start, ok))
+
+
+async def run(args) -> dict:
+    import httpx
+
+    endpoints = [e.strip() for e in args.endpoints.split(",")]
+    names = [u.strip() for u in args.usernames.split(",")] if args.usernames else \
+        [f"brand{i:03d}" for i in range(args.accounts)]
+    samples = {endpoint: [] for endpoint in endpoints}
+    budget = {"sent": 0, "limit": args.requests or math.inf}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            worker(client, endpoints, names, args, deadline, budget, samples, random.Random(args.seed + i))
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - start
+
+    results = {}
+    for endpoint, rows in [*samples.items(), ("all", [r for rows in samples.values() for r in rows])]:
+        latencies = sorted(latency for latency, _ in rows)
+        results[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(not ok for _, ok in rows),
+            "throughput": round(len(rows) / elapsed, 2),
+            **{f"p{q}": round(percentile(latencies, q), 4) for q in (50, 95, 99)},
+        }
+    return {"seconds": round(elapsed, 2), "concurrency": args.concurrency, "endpoints": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: no limit)")
+    parser.add_argument("--accounts", type=int, default=50, help="synthetic usernames to draw from")
+    parser.add_argument("--usernames", help="comma-separated usernames (overrides --accounts)")
+    parser.add_argument("--per-analyze", type=int, default=3, help="accounts per /analyze call")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--from-store", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    unknown = {e.strip() for e in args.endpoints.split(",")} - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    print(f"{report['seconds']}s at concurrency {report['concurrency']}")
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, r in report["endpoints"].items():
+        print(f"{endpoint:<12} {r['requests']:>9} {r['errors']:>7} {r['throughput']:>8.1f} "
+              f"{r['p50']:>7.3f}s {r['p95']:>7.3f}s {r['p99']:>7.3f}s")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
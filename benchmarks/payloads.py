@@ -0,0 +1,146 @@
+"""Synthetic RapidAPI payloads for benchmarks and offline runs.
+
+Mirrors the shapes the dashboards deal with: captions as ``{"text": ...}``
+dicts, plain strings, ``None`` or missing; views under ``view_count``,
+``play_count``, ``video_view_count`` or absent (photos); ids under ``id``,
+``pk`` or ``code``; counts occasionally ``None``. Everything is derived
+from a seed, so the same arguments always give the same payload.
+"""
+import zlib
+
+import numpy as np
+
+WORDS = [
+    "new", "drop", "today", "run", "training", "shoe", "style", "summer", "city",
+    "team", "win", "game", "launch", "fresh", "classic", "limited", "collab",
+    "weekend", "motivation", "street", "vibes", "goals", "sport", "day",
+]
+HASHTAGS = ["justdoit", "running", "sneakers", "fitness", "style", "ootd", "sport",
+            "training", "streetwear", "motivation", "new", "summer", "gym", "football"]
+MENTIONS = ["nike", "puma", "adidas", "nba", "espn", "athlete"]
+EMOJI = ["🔥", "💪", "⚡", "👟", "🏃", "✨", "🙌"]
+
+START = 1_700_000_000
+MEAN_GAP = 6 * 3600
+
+
+def _caption(rng: np.random.Generator) -> str:
+    words = list(rng.choice(WORDS, rng.integers(3, 25)))
+    first_line = " ".join(words[: rng.integers(1, len(words) + 1)])
+    lines = [first_line, " ".join(words)]
+    if rng.random() < 0.7:
+        lines.append(" ".join(f"#{t}" for t in rng.choice(HASHTAGS, rng.integers(1, 8), replace=False)))
+    if rng.random() < 0.3:
+        lines.append(" ".join(f"@{m}" for m in rng.choice(MENTIONS, rng.integers(1, 3), replace=False)))
+    if rng.random() < 0.5:
+        lines[0] += " " + "".join(rng.choice(EMOJI, rng.integers(1, 4)))
+    return "\n".join(lines)
+
+
+def _account_seed(username: str) -> int:
+    # stable across runs and distinct for anagrams (brand001 / brand010)
+    return zlib.crc32(username.encode("utf-8"))
+
+
+def post_item(rng: np.random.Generator, index: int, taken_at: int, id_base: int = 0) -> dict:
+    """One raw ``/userposts/`` item with a random mix of field shapes.
+
+    ``id_base`` offsets the media ids so different accounts never share one.
+    """
+    item = {"taken_at": taken_at}
+
+    media_id = 3_000_000_000_000_000_000 + id_base + index
+    id_shape = rng.random()
+    if id_shape < 0.8:
+        item["id"] = f"{media_id}_{int(rng.integers(1e9))}"
+    elif id_shape < 0.95:
+        item["pk"] = media_id
+    else:
+        item["code"] = f"C{id_base + index:016d}"
+
+    likes = int(rng.lognormal(7, 1.5))
+    item["like_count"] = likes if rng.random() > 0.02 else None
+    item["comment_count"] = int(likes * rng.uniform(0.005, 0.05)) if rng.random() > 0.05 else None
+
+    media = rng.random()
+    views = int(likes * rng.uniform(5, 40))
+    if media < 0.35:
+        item["view_count"] = views
+    elif media < 0.5:
+        item["play_count"] = views
+    elif media < 0.6:
+        item["video_view_count"] = views
+    elif media < 0.65:
+        item["view_count"] = None
+        item["play_count"] = views
+    # else: photo, no view fields
+
+    shape = rng.random()
+    if shape < 0.6:
+        item["caption"] = {"text": _caption(rng), "created_at": taken_at}
+    elif shape < 0.85:
+        item["caption"] = _caption(rng)
+    elif shape < 0.92:
+        item["caption"] = {"text": None}
+    elif shape < 0.97:
+        item["caption"] = None
+    # else: no caption field
+
+    if index == 0 and rng.random() < 0.3:
+        item["is_pinned"] = True
+    return item
+
+
+def post_items(username: str, count: int, seed: int = 0) -> list:
+    """``count`` raw items for ``username``, newest first."""
+    account = _account_seed(username)
+    rng = np.random.default_rng([seed, account])
+    gaps = rng.exponential(MEAN_GAP, count).astype("int64")
+    taken = START - np.cumsum(gaps)
+    id_base = account * 10**8
+    return [post_item(rng, i, int(t), id_base) for i, t in enumerate(taken)]
+
+
+def user_posts(username: str, count: int, page_size: int = None, seed: int = 0) -> list:
+    """``/userposts/`` response pages (one page unless ``page_size`` is set)."""
+    items = post_items(username, count, seed)
+    page_size = page_size or max(count, 1)
+    pages = []
+    for start in range(0, max(count, 1), page_size):
+        last = start + page_size >= count
+        pages.append({
+            "data": {"items": items[start:start + page_size], "count": count},
+            "pagination_token": None if last else f"{username}-{start + page_size}",
+        })
+    return pages
+
+
+def user_info(username: str, seed: int = 0) -> dict:
+    """``/userinfo/`` response."""
+    rng = np.random.default_rng([seed, _account_seed(username), 1])
+    return {"data": {
+        "username": username,
+        "full_name": username.title(),
+        "follower_count": int(rng.lognormal(13, 2)),
+        "following_count": int(rng.integers(0, 2000)),
+        "media_count": int(rng.integers(100, 20000)),
+        "is_verified": bool(rng.random() < 0.5),
+    }}
+
+
+def accounts(total_posts: int, n_accounts: int = None, seed: int = 0) -> list:
+    """Fetcher-style account results (``username``, ``user_info``, ``posts``, ``error``)
+    splitting ``total_posts`` across ``n_accounts`` accounts."""
+    n_accounts = n_accounts or max(1, min(50, total_posts // 100))
+    sizes = np.full(n_accounts, total_posts // n_accounts)
+    sizes[: total_posts % n_accounts] += 1
+    result = []
+    for i, size in enumerate(sizes):
+        username = f"brand{i:03d}"
+        result.append({
+            "username": username,
+            "user_info": user_info(username, seed)["data"],
+            "posts": post_items(username, int(size), seed),
+            "error": None,
+        })
+    return result
@@ -0,0 +1,89 @@
+"""Import-time benchmark for the API server.
+
+Imports each module in a fresh interpreter several times and reports the
+median wall time and the peak resident memory of the process afterwards::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --save benchmarks/startup_baseline.json
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json
+
+With ``--baseline`` the script exits non-zero when a module got slower or
+heavier than the baseline by more than ``--threshold`` (default 25%).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["fastapi_app", "fetcher", "normalize", "store"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = sorted(m for m in ("numpy", "pandas", "sklearn", "streamlit") if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024, "heavy_modules": heavy}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "import_seconds": round(statistics.median(s["seconds"] for s in samples), 4),
+        "rss_mb": round(statistics.median(s["rss_mb"] for s in samples), 1),
+        "heavy_modules": samples[-1]["heavy_modules"],
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for module, current in results.items():
+        before = baseline.get(module)
+        if not before:
+            continue
+        for metric in ("import_seconds", "rss_mb"):
+            if current[metric] > before[metric] * (1 + threshold):
+                found.append(f"{module}.{metric}: {before[metric]} -> {current[metric]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.runs) for module in args.modules}
+    for module, r in results.items():
+        heavy = ", ".join(r["heavy_modules"]) or "-"
+        print(f"{module:<16} {r['import_seconds']:>8.3f}s {r['rss_mb']:>8.1f} MB   heavy: {heavy}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import get_setting
+
+CACHE_PATH = get_setting("INSTA_CACHE_PATH", os.path.join(".insta_cache", "responses.sqlite"))
+
+# Seconds a response stays fresh, per upstream endpoint
+DEFAULT_TTLS = {
+    "userinfo": 60 * 60,
+    "userposts": 10 * 60,
+}
+DEFAULT_TTL = 10 * 60
+MAX_ENTRIES = 5000
+
+
+class ResponseCache:
+    """Disk-backed TTL + LRU cache for upstream responses.
+
+    Entries are keyed by ``(endpoint, username, count)``. A cached post list
+    fetched with a larger ``count`` also answers smaller requests, so the
+    Forecast page can reuse what Analyze just fetched.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttls: dict = None, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                username TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (endpoint, username, count)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, endpoint: str, username: str, count: int = 0):
+        """Return the cached value or ``None`` on a miss/expired entry."""
+        now = time.time()
+        username = username.lower()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count, value FROM responses "
+                "WHERE endpoint = ? AND username = ? AND count >= ? AND expires_at > ? "
+                "ORDER BY count LIMIT 1",
+                (endpoint, username, count, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE endpoint = ? AND username = ? AND count = ?",
+                (now, endpoint, username, row[0]),
+            )
+            self._conn.commit()
+
+        value = json.loads(row[1])
+        if isinstance(value, list) and count:
+            value = value[:count]
+        return value
+
+    def set(self, endpoint: str, username: str, count: int, value):
+        now = time.time()
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (endpoint, username.lower(), count, json.dumps(value), now + ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if size > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE rowid IN "
+                "(SELECT rowid FROM responses ORDER BY last_access LIMIT ?)",
+                (size - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Process-wide cache shared by the API server and the dashboards."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
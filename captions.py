@@ -0,0 +1,98 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import get_setting
+
+MAX_WORKERS = int(get_setting("CAPTION_WORKERS", os.cpu_count() or 1))
+
+# Captions per task sent to a worker process, and the number of distinct
+# captions below which parsing inline beats the cost of the pool
+BATCH_SIZE = 5000
+PARALLEL_THRESHOLD = 50_000
+
+# Columns added by :func:`caption_features`
+FEATURE_COLUMNS = ["hashtags", "mentions", "tokens", "first_line_len", "word_count", "hashtag_count",
+                   "mention_count", "emoji_count", "sentiment", "sentiment_label"]
+
+# Pictographs, symbols and dingbats; a sequence joined by ZWJ or followed by
+# skin-tone / presentation modifiers counts as one emoji, as do flag pairs
+_PICTOGRAPH = "[\U0001F300-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\u2300-\u23FF]"
+_MODIFIERS = "[\uFE0F\U0001F3FB-\U0001F3FF]*"
+EMOJI_PATTERN = (f"{_PICTOGRAPH}{_MODIFIERS}(?:\u200D{_PICTOGRAPH}{_MODIFIERS})*"
+                 "|[\U0001F1E6-\U0001F1FF]{2}")
+
+# Same rules as hashtags.py and wordclouds.py, so the indexes can take
+# these columns as they are
+HASHTAG = re.compile(r"#(\w+)")
+MENTION = re.compile(r"@(\w+(?:\.\w+)*)")
+TOKEN = re.compile(r"\w[\w']*")
+EMOJI = re.compile(EMOJI_PATTERN)
+
+
+def parse_caption(text: str) -> tuple:
+    """``(hashtags, mentions, tokens, first_line_len, emoji_count)`` of one caption.
+
+    Hashtags, mentions and tokens are lower-cased; hashtags and mentions
+    come without their ``#`` / ``@``. Patterns that cannot match (no ``#``,
+    no ``@``, pure ASCII) are skipped.
+    """
+    lower = text.lower()
+    return (
+        HASHTAG.findall(lower) if "#" in lower else [],
+        MENTION.findall(lower) if "@" in lower else [],
+        TOKEN.findall(lower),
+        len(text.partition("\n")[0]),
+        0 if lower.isascii() else len(EMOJI.findall(lower)),
+    )
+
+
+def _parse_batch(texts) -> list:
+    return [parse_caption(text) for text in texts]
+
+
+def _parse(texts: list, max_workers: int) -> list:
+    if len(texts) < PARALLEL_THRESHOLD or max_workers <= 1:
+        return _parse_batch(texts)
+    batches = [texts[i:i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return [row for batch in pool.map(_parse_batch, batches) for row in batch]
+
+
+def caption_features(captions, sentiment: bool = True, max_workers: int = MAX_WORKERS) -> pd.DataFrame:
+    """Every caption feature in one pass, aligned with ``captions``' index.
+
+    Each distinct caption is parsed once (across worker processes for large
+    batches); sentiment comes from the memoized engine in :mod:`sentiment`.
+    Missing captions count as empty.
+    """
+    captions = pd.Series(captions, dtype="object")
+    codes, uniques = pd.factorize(captions.fillna("").astype(str))
+    uniques = list(uniques)
+    parsed = _parse(uniques, max_workers)
+
+    def spread(values, dtype="int64"):
+        # one value per distinct caption, back onto every row
+        return np.fromiter(values, dtype=dtype, count=len(values))[codes]
+
+    hashtags, mentions, tokens, first_line, emoji = (list(c) for c in zip(*parsed)) if parsed else ([],) * 5
+    features = pd.DataFrame({
+        "hashtags": spread(hashtags, object),
+        "mentions": spread(mentions, object),
+        "tokens": spread(tokens, object),
+        "first_line_len": spread(first_line),
+        "word_count": spread([len(t) for t in tokens]),
+        "hashtag_count": spread([len(t) for t in hashtags]),
+        "mention_count": spread([len(m) for m in mentions]),
+        "emoji_count": spread(emoji),
+    }, index=captions.index)
+
+    if sentiment:
+        from sentiment import get_engine, sentiment_labels
+
+        features["sentiment"] = get_engine().score(uniques)[codes]
+        features["sentiment_label"] = sentiment_labels(features["sentiment"])
+    return features
@@ -0,0 +1,39 @@
+import os
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+# Same places Streamlit looks for secrets, so one secrets.toml serves both
+# the dashboards and the API server. INSTA_CONFIG points at another file.
+CONFIG_PATHS = [
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+]
+
+_settings = None
+
+
+def load_settings() -> dict:
+    """Merged settings from the first TOML file found (cached)."""
+    global _settings
+    if _settings is None:
+        _settings = {}
+        paths = [os.environ["INSTA_CONFIG"]] if os.environ.get("INSTA_CONFIG") else CONFIG_PATHS
+        for path in paths:
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    _settings = tomllib.load(f)
+                break
+    return _settings
+
+
+def get_setting(name: str, default=None):
+    """Environment variable first, then the TOML config, then ``default``."""
+    if name in os.environ:
+        return os.environ[name]
+    return load_settings().get(name, default)
+
+
+RAPIDAPI_KEY = get_setting("RAPIDAPI_KEY")
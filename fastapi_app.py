@@ -1,14 +1,87 @@
-from fastapi import FastAPI, Query
-import requests
-import os
-import numpy as np
-from sklearn.linear_model import LinearRegression
-import streamlit as st
+import asyncio
+import time
+import zlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.routing import Match
+
+import fetcher
+import metrics
+from config import RAPIDAPI_KEY as API_KEY, get_setting
+from jobs import JobQueue
+from scheduler import BATCH, INTERACTIVE
+
+# NumPy, pandas, the model registry and the post store are imported inside the
+# endpoints that need them, so workers boot without the analytics stack and
+# requests like / and /hashtags never load it. Set PRELOAD_ANALYTICS=1 to
+# pay that cost at start-up instead of on the first analytics request.
+PRELOAD_ANALYTICS = str(get_setting("PRELOAD_ANALYTICS", "0")).lower() in ("1", "true", "yes")
+
+# Adds a Server-Timing header (per-stage durations) to every response
+SERVER_TIMING = str(get_setting("SERVER_TIMING", "0")).lower() in ("1", "true", "yes")
+
+# Where posts come from unless a request passes ``source``: "rapidapi"
+# or "instaloader" (the loader pool in analyzer.py)
+SOURCES = ("rapidapi", "instaloader")
+DATA_SOURCE = str(get_setting("DATA_SOURCE", "rapidapi")).lower()
+
+JOB_WORKERS = int(get_setting("JOB_WORKERS", 4))
+JOB_POLL_INTERVAL = 1.0
 
-app = FastAPI(title="Insta-Analyzer API")
 
-API_KEY = st.secrets.get("RAPIDAPI_KEY")
-BASE_URL = "https://instagram-scraper-20251.p.rapidapi.com"
+# -------------------------------
+# Shared upstream connection pool + job workers
+# -------------------------------
+@asynccontextmanager
+async def lifespan(app):
+    if PRELOAD_ANALYTICS:
+        import registry  # noqa: F401
+        import store  # noqa: F401
+    app.state.client = fetcher.make_client(API_KEY)
+    app.state.jobs = JobQueue()
+    app.state.jobs_wakeup = asyncio.Event()
+    workers = [asyncio.create_task(job_worker()) for _ in range(JOB_WORKERS)]
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await app.state.client.aclose()
+
+
+app = FastAPI(title="Insta-Analyzer API", lifespan=lifespan)
+
+
+# -------------------------------
+# Request metrics + Server-Timing
+# -------------------------------
+def route_template(request) -> str:
+    # label by route template (/jobs/{job_id}), not by raw path
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    route = route_template(request)
+    timings = metrics.begin_request(route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.REQUEST_LATENCY.observe(elapsed, method=request.method, route=route, status=status)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
 
 
 # -------------------------------
@@ -20,79 +93,146 @@ def root():
 
 
 # -------------------------------
-# Helper: Fetch User Posts
+# Helper: Load accounts (live or from the local store)
 # -------------------------------
-def fetch_posts(username, limit):
-    headers = {
-        "x-rapidapi-key": API_KEY,
-        "x-rapidapi-host": "instagram-scraper-20251.p.rapidapi.com"
-    }
-
-    url = f"{BASE_URL}/userposts/?username_or_id={username}&count={limit}"
-    response = requests.get(url, headers=headers).json()
-
-    return response.get("data", {}).get("items", [])
+def resolve_source(source):
+    source = (source or DATA_SOURCE).lower()
+    if source not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
+    return source
+
+
+async def load_accounts(names, limit, from_store=False, priority=INTERACTIVE, source=None,
+                        as_table=False):
+    """Return ``(posts, followers)`` frames as built by ``normalize_accounts``.
+
+    The followers frame carries an ``error`` column per account. With
+    ``from_store`` only posts newer than the stored ones are fetched and the
+    full history is then read from the local post store. With ``as_table``
+    the stored posts are read into a compact :class:`posts.PostTable`
+    instead; fetched posts stay a frame, which normalization builds anyway.
+    Either way, :func:`mean_eng_score` averages them. Loaded posts are
+    ingested into the persisted models (see :mod:`ingest`).
+    """
+    from ingest import ingest_followers, ingest_posts, ingest_stored
+    from normalize import normalize_accounts
+    from store import get_store, sync_accounts
+
+    source = resolve_source(source)
+    if source == "instaloader":
+        import analyzer
+
+    if from_store:
+        store = get_store()
+        with metrics.stage("fetch"):
+            if source == "instaloader":
+                synced = await asyncio.to_thread(analyzer.sync_accounts, store, names, limit)
+            else:
+                synced = await sync_accounts(store, app.state.client, names, limit, priority)
+        with metrics.stage("load"):
+            df, df_f = store.load_table(names) if as_table else store.load_frames(names)
+        with metrics.stage("ingest"):
+            # synced posts were ingested by the store; this covers history from before start-up
+            if as_table:
+                ingest_stored(store, names)
+            else:
+                ingest_posts(df, limit)
+                ingest_followers(df_f)
+        # one row per requested account, even if its sync failed
+        df_f = df_f.set_index("username").reindex([n.lower() for n in names]).reset_index()
+        df_f["error"] = [r["error"] for r in synced]
+        return df, df_f
+
+    # all accounts are fetched concurrently over the shared pool
+    with metrics.stage("fetch"):
+        if source == "instaloader":
+            accounts = await analyzer.fetch_accounts_async(names, limit)
+        else:
+            accounts = await fetcher.fetch_accounts(app.state.client, names, limit, priority=priority)
+    with metrics.stage("normalize"):
+        df, df_f = normalize_accounts(accounts)
+    with metrics.stage("ingest"):
+        ingest_posts(df, limit)
+        ingest_followers(df_f)
+    df_f["error"] = [account["error"] for account in accounts]
+    return df, df_f
+
+
+def mean_eng_score(posts) -> float:
+    """Mean ``eng_score`` (NaN ignored) of a post frame or a :class:`posts.PostTable`."""
+    from posts import PostTable
+
+    if isinstance(posts, PostTable):
+        return posts.mean("eng_score")
+    return float(posts["eng_score"].mean())
 
 
 # -------------------------------
-# Helper: Fetch User Info
+# Helper: Load one account's posts
 # -------------------------------
-def fetch_user_info(username):
-    headers = {
-        "x-rapidapi-key": API_KEY,
-        "x-rapidapi-host": "instagram-scraper-20251.p.rapidapi.com"
-    }
-
-    url = f"{BASE_URL}/userinfo/?username_or_id={username}"
-    response = requests.get(url, headers=headers).json()
-
-    return response.get("data", {})
+async def load_posts(username, limit, from_store=False, source=None):
+    from ingest import ingest_followers, ingest_posts
+    from normalize import normalize_accounts
+    from store import get_store, sync_account
+
+    source = resolve_source(source)
+    if source == "instaloader":
+        import analyzer
+
+    if from_store:
+        with metrics.stage("fetch"):
+            if source == "instaloader":
+                await asyncio.to_thread(analyzer.sync_accounts, get_store(), [username], limit)
+            else:
+                await sync_account(get_store(), app.state.client, username, limit)
+        with metrics.stage("load"):
+            df, df_f = get_store().load_frames([username])
+        with metrics.stage("ingest"):
+            ingest_posts(df, limit)
+            ingest_followers(df_f)
+        return df
+
+    # user info comes along so eng_score uses the follower count, as in load_accounts
+    with metrics.stage("fetch"):
+        if source == "instaloader":
+            account = (await analyzer.fetch_accounts_async([username], limit))[0]
+        else:
+            account = await fetcher.fetch_account(app.state.client, username, limit)
+    if account["error"]:
+        raise HTTPException(status_code=502, detail=account["error"])
+    with metrics.stage("normalize"):
+        df, df_f = normalize_accounts([account])
+    with metrics.stage("ingest"):
+        ingest_posts(df, limit)
+        ingest_followers(df_f)
+    return df
 
 
 # -------------------------------
 # 🔥 1. ANALYZE ENDPOINT
 # -------------------------------
 @app.get("/analyze")
-def analyze(usernames: str = Query(...), limit: int = 10):
+async def analyze(usernames: str = Query(...), limit: int = 10, from_store: bool = False,
+                  source: str = None):
+    import math
+
     names = [u.strip() for u in usernames.split(",")]
 
-    all_posts = []
-    total_followers = 0
-
-    for name in names:
-        user_info = fetch_user_info(name)
-        followers = user_info.get("follower_count", 0)
-        total_followers += followers
-
-        posts = fetch_posts(name, limit)
-
-        for p in posts:
-            likes = p.get("like_count", 0)
-            views = (
-                p.get("view_count")
-                or p.get("play_count")
-                or p.get("video_view_count")
-                or 1  # avoid divide-by-zero
-            )
-            eng = likes / views
-
-            all_posts.append({
-                "username": name,
-                "likes": likes,
-                "views": views,
-                "engagement": eng
-            })
-
-    if not all_posts:
+    # stored posts are read into a compact column table; the aggregates run on its arrays
+    posts, df_f = await load_accounts(names, limit, from_store, source=source, as_table=True)
+
+    if not len(posts):
         return {"error": "No posts returned"}
 
-    avg_eng = float(np.mean([p["engagement"] for p in all_posts]))
+    with metrics.stage("aggregate"):
+        avg_eng = mean_eng_score(posts)
+        total_followers = int(df_f["followers"].fillna(0).sum())
 
     return {
         "brands_analyzed": names,
         "total_followers": total_followers,
-        "average_engagement": round(avg_eng, 4),
-        "posts_analyzed": len(all_posts)
+        "average_engagement": round(avg_eng, 4) if not math.isnan(avg_eng) else 0.0,
+        "posts_analyzed": len(posts)
     }
 
 
@@ -100,58 +240,121 @@ def analyze(usernames: str = Query(...), limit: int = 10):
 # 🔥 2. BEST POSTING TIME
 # -------------------------------
 @app.get("/best_time")
-def best_time(username: str = Query(...), limit: int = 20):
-    posts = fetch_posts(username, limit)
+async def best_time(username: str = Query(...), limit: int = 20, from_store: bool = False,
+                    source: str = None):
+    from histograms import get_histograms
 
-    if not posts:
-        return {"error": "No posts returned"}
+    df = await load_posts(username, limit, from_store, source)
 
-    hours = []
-    for p in posts:
-        ts = p.get("taken_at")
-        if ts:
-            hour = int(np.datetime64(ts, "h").astype(int) % 24)
-            hours.append(hour)
+    if df.empty:
+        return {"error": "No posts returned"}
 
-    if not hours:
+    # the loaded posts were ingested; read the account's newest ``limit``
+    # (every stored post with ``from_store``) from the stored histograms
+    with metrics.stage("histogram"):
+        # find the most common posting hour
+        window = None if from_store else limit
+        best_hour = get_histograms().histogram([username], limit=window).best_hour("count")
+    if best_hour is None:
         return {"error": "No valid post timestamps"}
 
-    # find the most common posting hour
-    best_hour = int(np.bincount(hours).argmax())
-
     return {"username": username, "best_hour_to_post": best_hour}
 
 
+@app.get("/heatmap")
+async def heatmap(usernames: str = Query(...), limit: int = 20, from_store: bool = False,
+                  metric: str = Query("eng", pattern="^(eng|likes|count)$"),
+                  since: str = None, until: str = None, source: str = None):
+    import numpy as np
+    from histograms import HOURS, WEEKDAYS, get_histograms, month_of
+
+    names = [u.strip() for u in usernames.split(",")]
+    for value in (since, until):
+        if value is not None:
+            try:
+                month_of(value)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    df, df_f = await load_accounts(names, limit, from_store, source=source)
+
+    with metrics.stage("histogram"):
+        window = None if from_store else limit
+        merged = get_histograms().histogram(names, since=since, until=until, limit=window)
+
+    if not merged.posts:
+        return {"error": "No posts returned"}
+
+    grid = np.round(merged.grid(metric), 4)
+    return {
+        "usernames": names,
+        "metric": metric,
+        "posts": merged.posts,
+        "weekdays": WEEKDAYS,
+        "hours": HOURS,
+        "values": [[None if np.isnan(v) else float(v) for v in row] for row in grid],
+        "best_hour": merged.best_hour(metric),
+    }
+
+
 # -------------------------------
 # 🔥 3. ENGAGEMENT FORECAST
 # -------------------------------
 @app.get("/forecast")
-def forecast(username: str = Query(...), limit: int = 15):
-    posts = fetch_posts(username, limit)
-
-    if not posts:
-        return {"error": "No posts returned"}
+async def forecast(username: str = Query(...), limit: int = 15, from_store: bool = False,
+                   source: str = None):
+    from registry import get_registry
 
-    engagements = []
-    for p in posts:
-        likes = p.get("like_count", 0)
-        views = p.get("view_count") or p.get("play_count") or 1
-        engagements.append(likes / views)
+    df = await load_posts(username, limit, from_store, source)
 
-    X = np.arange(len(engagements)).reshape(-1, 1)
-    y = np.array(engagements)
-
-    model = LinearRegression()
-    model.fit(X, y)
+    if df.empty:
+        return {"error": "No posts returned"}
 
-    future = model.predict(np.array([[len(engagements) + 1]]))[0]
+    # the loaded posts were ingested; the trend is read over the newest ``limit``
+    # (every stored post with ``from_store``), not refitted
+    with metrics.stage("model"):
+        window = None if from_store else limit
+        result = get_registry().forecast([username], horizon=1, limit=window)[0]
+    if "error" in result:
+        return {"error": "No valid post timestamps"}
 
     return {
         "username": username,
-        "predicted_engagement_next_post": round(float(future), 4)
+        "predicted_engagement_next_post": round(result["predictions"][0], 4)
     }
 
 
+class ForecastBatch(BaseModel):
+    usernames: list[str]
+    limit: int = 15
+    horizon: int = 5
+    from_store: bool = False
+    source: str = None
+
+
+@app.post("/forecast/batch")
+async def forecast_batch(req: ForecastBatch):
+    from registry import get_registry
+
+    df, df_f = await load_accounts(req.usernames, req.limit, req.from_store, priority=BATCH,
+                                   source=req.source)
+
+    with metrics.stage("model"):
+        # one vectorized solve for the whole roster
+        window = None if req.from_store else req.limit
+        results = get_registry().forecast(req.usernames, horizon=req.horizon, limit=window)
+
+    errors = dict(zip(df_f["username"].str.lower(), df_f["error"]))
+    for result in results:
+        if errors.get(result["username"]):
+            result["error"] = errors[result["username"]]
+        if "predictions" in result:
+            result["predictions"] = [round(p, 4) for p in result["predictions"]]
+            for key in ("slope", "intercept", "r2", "mae"):
+                result[key] = round(result[key], 4)
+    return {"horizon": req.horizon, "forecasts": results}
+
+
 # -------------------------------
 # 🔥 4. HASHTAG SUGGESTIONS (simple)
 # -------------------------------
@@ -167,3 +370,354 @@ def hashtags(keyword: str = Query(...)):
         f"{keyword}fans"
     ]
     return {"keyword": keyword, "suggested_hashtags": ideas}
+
+
+# -------------------------------
+# 🔥 5. BACKGROUND ANALYZE JOBS
+# -------------------------------
+class AnalyzeJob(BaseModel):
+    usernames: list[str]
+    limit: int = 10
+    from_store: bool = False
+    source: str = None
+
+
+async def analyze_account(item):
+    """Per-account summary stored as one job result."""
+    import math
+    import pandas as pd
+
+    params = item["params"]
+    posts, df_f = await load_accounts([item["username"]], params["limit"], params["from_store"],
+                                      priority=BATCH, source=params.get("source"), as_table=True)
+    account = df_f.iloc[0]
+    if account["error"]:
+        raise RuntimeError(account["error"])
+
+    avg_eng = mean_eng_score(posts)
+    return {
+        "followers": int(account["followers"]) if pd.notna(account["followers"]) else None,
+        "posts_analyzed": len(posts),
+        "average_engagement": round(avg_eng, 4) if not math.isnan(avg_eng) else None
+    }
+
+
+JOB_HANDLERS = {"analyze": analyze_account}
+
+
+async def job_worker():
+    queue = app.state.jobs
+    wakeup = app.state.jobs_wakeup
+    while True:
+        item = queue.claim()
+        if item is None:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            result = await JOB_HANDLERS[item["kind"]](item)
+        except Exception as e:
+            queue.complete(item, error=str(e))
+        else:
+            queue.complete(item, result)
+
+
+@app.post("/jobs/analyze")
+async def submit_analyze_job(job: AnalyzeJob):
+    names = [u.strip() for u in job.usernames if u.strip()]
+    if not names:
+        raise HTTPException(status_code=400, detail="No usernames given")
+
+    resolve_source(job.source)
+    job_id = app.state.jobs.submit("analyze", names, {"limit": job.limit, "from_store": job.from_store,
+                                                      "source": job.source})
+    app.state.jobs_wakeup.set()
+    return {"job_id": job_id, "status": "queued", "total": len(names)}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, offset: int = 0, limit: int = Query(100, le=1000)):
+    status = app.state.jobs.get(job_id, offset, limit)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+# -------------------------------
+# 🔥 6. CAPTION SENTIMENT (batched)
+# -------------------------------
+class SentimentRequest(BaseModel):
+    captions: list[str]
+
+
+@app.post("/sentiment")
+def sentiment(req: SentimentRequest):
+    from sentiment import get_engine, sentiment_labels
+
+    scores = get_engine().score(req.captions)
+    labels = sentiment_labels(scores)
+    return {
+        "scores": [
+            {"polarity": round(float(score), 4), "label": str(label)}
+            for score, label in zip(scores, labels)
+        ]
+    }
+
+
+# -------------------------------
+# 🔥 7. EXPORT (streamed)
+# -------------------------------
+@app.get("/export")
+async def export(usernames: str = Query(...), limit: int = 10, from_store: bool = False,
+                 format: str = Query("xlsx", pattern="^(xlsx|parquet|csv)$"), source: str = None):
+    from export import FORMATS, iter_export
+
+    names = [u.strip() for u in usernames.split(",")]
+
+    df, df_f = await load_accounts(names, limit, from_store, source=source)
+
+    if df.empty:
+        raise HTTPException(status_code=404, detail="No posts returned")
+
+    # the file is generated while it is sent, chunk by chunk
+    sheets = {"posts": df, "followers": df_f.drop(columns="error")}
+    return StreamingResponse(
+        iter_export(sheets, format),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="insta_results.{format}"'},
+    )
+
+
+# -------------------------------
+# 🔥 8. METRICS (Prometheus text format)
+# -------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    from cache import get_cache
+    from scheduler import get_scheduler
+
+    cache = get_cache().stats()
+    scheduler = get_scheduler().stats()
+    samples = {
+        "insta_cache_hits_total": ("counter", "Response cache hits.", cache["hits"]),
+        "insta_cache_misses_total": ("counter", "Response cache misses.", cache["misses"]),
+        "insta_cache_hit_ratio": ("gauge", "Response cache hit ratio since start-up.", cache["hit_ratio"]),
+        "insta_cache_entries": ("gauge", "Responses held in the cache.", cache["entries"]),
+        "insta_upstream_dispatched_total": ("counter", "Upstream calls sent by the scheduler.", scheduler["dispatched"]),
+        "insta_upstream_coalesced_total": ("counter", "Calls served by an identical in-flight request.", scheduler["coalesced"]),
+        "insta_upstream_queued": ("gauge", "Calls waiting for a rate-limit token.", scheduler["queued"]),
+        "insta_upstream_in_flight": ("gauge", "Upstream calls in flight.", scheduler["in_flight"]),
+    }
+    return PlainTextResponse(metrics.render(samples), media_type="text/plain; version=0.0.4")
+
+
+# -------------------------------
+# 🔥 9. POST STREAM (NDJSON)
+# -------------------------------
+async def gzipped(chunks):
+    from export import gzip_compressor
+
+    compressor = gzip_compressor()
+    async for chunk in chunks:
+        # sync flush so every account's rows reach the client right away
+        out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+@app.get("/posts/stream")
+async def posts_stream(request: Request, usernames: str = Query(...), limit: int = 10,
+                       from_store: bool = False, source: str = None, compress: bool = None):
+    """Normalized posts as newline-delimited JSON, account by account.
+
+    Every account is loaded concurrently and its rows are sent as soon as it
+    arrives (completion order), so only accounts not yet sent are held in
+    memory. Failed accounts produce one ``{"username", "error"}`` line.
+    Gzip is used when the client accepts it (or with ``compress``).
+    """
+    from export import iter_ndjson, ndjson_line
+
+    names = [u.strip() for u in usernames.split(",") if u.strip()]
+    resolve_source(source)
+    if compress is None:
+        compress = "gzip" in request.headers.get("accept-encoding", "")
+
+    async def rows():
+        tasks = [asyncio.create_task(load_accounts([name], limit, from_store, source=source))
+                 for name in names]
+        try:
+            for done in asyncio.as_completed(tasks):
+                df, df_f = await done
+                error = df_f["error"].iloc[0]
+                if error:
+                    yield ndjson_line({"username": df_f["username"].iloc[0], "error": str(error)})
+                    continue
+                # per-post engagement, as in analyzer.calculate_engagement
+                df = df.assign(engagement=df["likes"] + df["comments"])
+                for chunk in iter_ndjson(df):
+                    yield chunk
+        finally:
+            # client went away: stop fetching what nobody will read
+            for task in tasks:
+                task.cancel()
+
+    headers = {"Content-Encoding": "gzip"} if compress else {}
+    return StreamingResponse(gzipped(rows()) if compress else rows(),
+                             media_type="application/x-ndjson", headers=headers)
+
+
+# -------------------------------
+# 🔥 10. ACCOUNT COMPARISON (summary table)
+# -------------------------------
+@app.get("/compare")
+async def compare(usernames: str = Query(...), limit: int = 20, from_store: bool = False,
+                  refresh: bool = False, source: str = None):
+    """Per-account summary rows: mean, std, CV and p50/p90 of likes, comments and eng_score,
+    over each account's newest ``limit`` posts (every stored post with ``from_store``).
+
+    Rows are read from the summary table filled at ingest; only accounts
+    with fewer than ``limit`` posts in it are loaded first, or every
+    account with ``refresh``.
+    """
+    import numpy as np
+    from ingest import ingest_stored
+    from store import get_store
+    from summaries import get_summaries
+
+    names = [u.strip() for u in usernames.split(",") if u.strip()]
+    summaries = get_summaries()
+    if from_store:
+        with metrics.stage("load"):
+            ingest_stored(get_store(), names)
+    errors = {}
+    stale = [name for name in names if refresh or summaries.posts(name) < limit]
+    if stale:
+        df, df_f = await load_accounts(stale, limit, from_store, source=source)
+        errors = {u.lower(): e for u, e in zip(df_f["username"], df_f["error"]) if e}
+
+    with metrics.stage("aggregate"):
+        table = summaries.table(names, limit=None if from_store else limit)
+    table = table.astype(object).where(table.notna(), None)
+    accounts = []
+    for row in table.to_dict("records"):
+        row = {k: round(v, 4) if isinstance(v, (float, np.floating)) else v for k, v in row.items()}
+        if row["username"] in errors:
+            row["error"] = errors[row["username"]]
+        accounts.append(row)
+    return {"accounts": accounts}
+
+
+# -------------------------------
+# 🔥 11. AUDIENCE OVERLAP (MinHash / HyperLogLog sketches)
+# -------------------------------
+class AudienceIds(BaseModel):
+    ids: list[int | str]
+    replace: bool = False
+
+
+def sketch_summary(username, sketch):
+    return {"username": username.lower(), "audience": round(sketch.cardinality()),
+            "ids_added": sketch.ids_added}
+
+
+@app.post("/audience/{username}/ids")
+async def add_audience_ids(username: str, req: AudienceIds):
+    """Fold follower or engager ids into the account's audience sketch."""
+    from overlap import get_sketches
+
+    with metrics.stage("sketch"):
+        sketch = await asyncio.to_thread(get_sketches().add_ids, username, req.ids, req.replace)
+    return sketch_summary(username, sketch)
+
+
+@app.post("/audience/{username}/engagers")
+async def add_audience_engagers(username: str, posts: int = 12, likers: bool = True, replace: bool = False):
+    """Sketch the commenters (and likers, when visible) of the latest posts via instaloader."""
+    import analyzer
+    from overlap import get_sketches
+
+    with metrics.stage("fetch"):
+        result = await asyncio.to_thread(analyzer.fetch_engager_ids, username, posts, likers)
+    if result["error"] and not result["ids"]:
+        raise HTTPException(status_code=502, detail=result["error"])
+    with metrics.stage("sketch"):
+        sketch = await asyncio.to_thread(get_sketches().add_ids, username, result["ids"], replace)
+    return {**sketch_summary(username, sketch), "engagers": len(result["ids"]), "error": result["error"]}
+
+
+@app.get("/overlap")
+async def overlap(usernames: str = Query(...)):
+    """Estimated audience size per account, pairwise Jaccard overlap and
+    combined unique reach; accounts without a sketch are listed in ``missing``."""
+    from overlap import get_sketches
+
+    names = [u.strip() for u in usernames.split(",") if u.strip()]
+    with metrics.stage("aggregate"):
+        result = await asyncio.to_thread(get_sketches().overlap, names)
+    return {
+        "usernames": result["usernames"],
+        "audience": [round(float(size)) for size in result["audience"]],
+        "jaccard": [[round(float(v), 4) for v in row] for row in result["jaccard"]],
+        "union_reach": round(result["union_reach"]),
+        "missing": result["missing"],
+    }
+
+
+# -------------------------------
+# 🔥 12. VIRALITY MODELS (persisted registry)
+# -------------------------------
+@app.get("/virality/predict")
+async def virality_predict(views: list[float] = Query(...), username: str = None, cohort: str = None,
+                           limit: int = 20, from_store: bool = False, source: str = None):
+    """Predicted likes for ``views`` from the stored likes ~ views model of an
+    account or a cohort. An account is (re)loaded when the registry has not
+    yet fetched ``limit`` posts of it; after that, answers come from the
+    stored statistics."""
+    from registry import get_registry
+
+    if (username is None) == (cohort is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of username or cohort")
+    registry = get_registry()
+
+    if username is not None and registry.fetched_limit(username) < limit:
+        # ingesting the loaded posts records that ``limit`` was fetched
+        await load_posts(username, limit, from_store, source)
+
+    with metrics.stage("model"):
+        try:
+            model = registry.model("virality", username=username, cohort=cohort)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown cohort {cohort!r}")
+    if model is None:
+        return {"error": "Not enough video/view data"}
+    return {
+        **{k: round(v, 6) if isinstance(v, float) else v for k, v in model.to_dict().items()},
+        "predictions": [{"views": v, "likes": round(float(model.predict(v)), 2)} for v in views],
+    }
+
+
+class Cohort(BaseModel):
+    usernames: list[str]
+
+
+@app.put("/cohorts/{name}")
+def put_cohort(name: str, cohort: Cohort):
+    """Define a named group of accounts whose models are pooled."""
+    from registry import get_registry
+
+    return {"name": name, "usernames": get_registry().set_cohort(name, cohort.usernames)}
+
+
+@app.get("/models")
+def list_models(usernames: str = None):
+    """Stored virality and trend models per account, with their data versions."""
+    from registry import get_registry
+
+    registry = get_registry()
+    names = [u.strip() for u in usernames.split(",") if u.strip()] if usernames else None
+    return {"models": registry.describe(names), "cohorts": registry.cohorts()}
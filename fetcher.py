@@ -0,0 +1,275 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from cache import get_cache
+from config import get_setting
+from metrics import observe_upstream
+from scheduler import INTERACTIVE, get_scheduler
+
+RAPIDAPI_HOST = "instagram-scraper-20251.p.rapidapi.com"
+# RAPIDAPI_BASE_URL points the client at another server, e.g. the local
+# stand-in in benchmarks/fake_rapidapi.py
+BASE_URL = get_setting("RAPIDAPI_BASE_URL", f"https://{RAPIDAPI_HOST}")
+
+# Upper bound on simultaneous upstream requests (and pooled connections)
+MAX_CONCURRENCY = 8
+TIMEOUT = 15
+
+# Posts requested per page when following the pagination cursor
+PAGE_SIZE = 50
+
+# Retries of a throttled (429) request; without a Retry-After header the
+# wait doubles from BACKOFF seconds, capped at MAX_BACKOFF
+MAX_RETRIES = 3
+BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+# -------------------------------
+# Shared connection pool
+# -------------------------------
+def make_client(api_key, max_connections: int = MAX_CONCURRENCY) -> httpx.AsyncClient:
+    """Create a keep-alive HTTP client for the RapidAPI host."""
+    headers = {
+        "x-rapidapi-key": api_key or "",
+        "x-rapidapi-host": RAPIDAPI_HOST
+    }
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(base_url=BASE_URL, headers=headers,
+                             limits=limits, timeout=TIMEOUT)
+
+
+def retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled response."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return min(MAX_BACKOFF, max(0.0, when.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return min(MAX_BACKOFF, BACKOFF * 2 ** attempt)
+
+
+async def fetch_json(client: httpx.AsyncClient, path: str, params: dict,
+                     priority: int = INTERACTIVE) -> dict:
+    """GET through the shared scheduler (rate limit, priority, de-duplication).
+
+    Error statuses raise ``httpx.HTTPStatusError``; 429s are retried up to
+    :data:`MAX_RETRIES` times, honouring ``Retry-After``.
+    """
+    async def request():
+        # timed per upstream call; coalesced waiters are not counted twice
+        start = time.perf_counter()
+        error = None
+        try:
+            response = await client.get(path, params=params)
+            if response.status_code >= 400:
+                error = str(response.status_code)
+                response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            error = error or type(e).__name__
+            raise
+        finally:
+            observe_upstream(path.strip("/"), time.perf_counter() - start, error)
+
+    key = (path, tuple(sorted(params.items())))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await get_scheduler().submit(key, request, priority)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 429 or attempt == MAX_RETRIES:
+                raise
+            # each retry goes through the scheduler again, so it also waits for a token
+            await asyncio.sleep(retry_delay(e.response, attempt))
+
+
+# -------------------------------
+# Endpoint helpers
+# -------------------------------
+# Both helpers read through the shared response cache; upstream errors raise
+# before anything is stored, and only responses that carry a "data" payload
+# are cached.
+async def fetch_user_info(client: httpx.AsyncClient, username: str, use_cache: bool = True,
+                          priority: int = INTERACTIVE) -> dict:
+    cache = get_cache()
+    if use_cache:
+        cached = cache.get("userinfo", username)
+        if cached is not None:
+            return cached
+
+    data = await fetch_json(client, "/userinfo/", {"username_or_id": username}, priority)
+    user_info = data.get("data", {}) or {}
+    if "data" in data:
+        cache.set("userinfo", username, 0, user_info)
+    return user_info
+
+
+async def fetch_posts(client: httpx.AsyncClient, username: str, count: int, use_cache: bool = True,
+                      priority: int = INTERACTIVE) -> list:
+    cache = get_cache()
+    if use_cache:
+        cached = cache.get("userposts", username, count)
+        if cached is not None:
+            return cached
+
+    data = await fetch_json(client, "/userposts/", {"username_or_id": username, "count": count}, priority)
+    posts = (data.get("data", {}) or {}).get("items", []) or []
+    if "data" in data:
+        cache.set("userposts", username, count, posts)
+    return posts
+
+
+async def fetch_account(client: httpx.AsyncClient, username: str, count: int,
+                        semaphore: asyncio.Semaphore = None, priority: int = INTERACTIVE) -> dict:
+    """Fetch user info and posts for one account.
+
+    Errors are reported in the ``error`` key instead of being raised so one
+    bad account does not cancel the rest of a batch.
+    """
+    semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENCY)
+    result = {"username": username, "user_info": {}, "posts": [], "error": None}
+
+    async def guarded(coro):
+        async with semaphore:
+            return await coro
+
+    try:
+        user_info, posts = await asyncio.gather(
+            guarded(fetch_user_info(client, username, priority=priority)),
+            guarded(fetch_posts(client, username, count, priority=priority)),
+        )
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    result["user_info"] = user_info
+    result["posts"] = posts
+    return result
+
+
+async def fetch_accounts(client: httpx.AsyncClient, usernames, count: int,
+                         max_concurrency: int = MAX_CONCURRENCY, priority: int = INTERACTIVE) -> list:
+    """Fetch every account concurrently, preserving the input order."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(*(
+        fetch_account(client, name, count, semaphore, priority) for name in usernames
+    ))
+
+
+def fetch_accounts_sync(api_key, usernames, count: int,
+                        max_concurrency: int = MAX_CONCURRENCY) -> list:
+    """Blocking wrapper for callers without an event loop (Streamlit)."""
+    async def run():
+        async with make_client(api_key, max_concurrency) as client:
+            return await fetch_accounts(client, usernames, count, max_concurrency)
+
+    return asyncio.run(run())
+
+
+def fetch_posts_sync(api_key, username: str, count: int) -> list:
+    """Blocking single-account post fetch (Forecast page)."""
+    async def run():
+        async with make_client(api_key, 1) as client:
+            return await fetch_posts(client, username, count)
+
+    return asyncio.run(run())
+
+
+# -------------------------------
+# Cursor-paginated post stream
+# -------------------------------
+def load_cursor(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("cursor")
+
+
+def save_cursor(path: str, username: str, cursor):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"username": username, "cursor": cursor}, f)
+    os.replace(tmp, path)
+
+
+def _next_cursor(data: dict):
+    inner = data.get("data", {}) or {}
+    return data.get("pagination_token") or inner.get("pagination_token") or inner.get("next_max_id")
+
+
+async def aiter_posts(client: httpx.AsyncClient, username: str, page_size: int = PAGE_SIZE,
+                      max_posts: int = None, since=None, cursor: str = None,
+                      checkpoint: str = None, priority: int = INTERACTIVE):
+    """Yield normalized posts (newest first) following the upstream cursor.
+
+    Stops after ``max_posts`` posts or at the first post older than ``since``
+    (a datetime or unix timestamp). With ``checkpoint`` set, the cursor of
+    the next page is saved after each page so an interrupted run resumes
+    where it left off; posts of a partially consumed page are yielded again,
+    so consumers should de-duplicate on ``id``.
+    """
+    from normalize import normalize_post
+
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    if checkpoint and cursor is None:
+        cursor = load_cursor(checkpoint)
+
+    yielded = 0
+    while True:
+        params = {"username_or_id": username, "count": page_size}
+        if cursor:
+            params["pagination_token"] = cursor
+        data = await fetch_json(client, "/userposts/", params, priority)
+        items = (data.get("data", {}) or {}).get("items", []) or []
+
+        for item in items:
+            post = normalize_post(item, username)
+            if since is not None and post["taken_at"] is not None and post["taken_at"] < since:
+                # pinned posts sit at the top of the feed regardless of age
+                if item.get("is_pinned") or item.get("timeline_pinned_user_ids"):
+                    continue
+                return
+            yield post
+            yielded += 1
+            if max_posts and yielded >= max_posts:
+                return
+
+        cursor = _next_cursor(data)
+        if not items or not cursor:
+            break
+        if checkpoint:
+            save_cursor(checkpoint, username, cursor)
+
+    # history exhausted: the next run starts from the newest post again
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+def iter_posts(api_key, username: str, **kwargs):
+    """Blocking generator over :func:`aiter_posts` for non-async callers."""
+    loop = asyncio.new_event_loop()
+    client = make_client(api_key, 1)
+    posts = aiter_posts(client, username, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(posts.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(posts.aclose())
+        loop.run_until_complete(client.aclose())
+        loop.close()
@@ -0,0 +1,168 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+HORIZON = 5
+# Newest posts kept per account (for MAE, and to rebuild the sums when
+# older posts arrive); the longest window a trend is fitted over
+MAX_POSTS = 1000
+
+# Per-account sufficient statistics of the (post index, eng_score) series
+N, SX, SY, SXY, SXX, SYY = range(6)
+
+
+def _unix_seconds(taken_at: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(taken_at):
+        return (taken_at - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return pd.to_numeric(taken_at, errors="coerce")
+
+
+def solve(stats: np.ndarray) -> tuple:
+    """Closed-form OLS ``eng_score ~ post_index`` for every row of ``stats``.
+
+    Returns ``(slope, intercept, r2)`` arrays. Accounts with fewer than two
+    posts get a flat line through their mean; R² follows sklearn's
+    ``r2_score`` (1.0 for a perfect fit of a constant series, else 0.0).
+    """
+    n = stats[:, N]
+    safe_n = np.where(n > 0, n, 1)
+    sxx = stats[:, SXX] - stats[:, SX] ** 2 / safe_n
+    sxy = stats[:, SXY] - stats[:, SX] * stats[:, SY] / safe_n
+    syy = stats[:, SYY] - stats[:, SY] ** 2 / safe_n
+
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxx), where=sxx > 1e-12)
+    intercept = (stats[:, SY] - slope * stats[:, SX]) / safe_n
+    sse = np.clip(syy - slope * sxy, 0, None)
+    r2 = np.where(syy > 1e-12, 1 - sse / np.where(syy > 1e-12, syy, 1), np.where(sse > 1e-12, 0.0, 1.0))
+    return slope, intercept, r2
+
+
+def window_stats(sums: np.ndarray, limit: int = None) -> np.ndarray:
+    """``[n, Σx, Σy, Σxy, Σx², Σy²]`` of the newest ``limit`` points of a series
+    (all without one) from its running sums ``[Σy, Σy², Σiy]`` (row ``i`` covers
+    points ``0..i-1``), with ``x`` counted from the window's oldest point."""
+    total = len(sums) - 1
+    n = total if limit is None else min(limit, total)
+    start = total - n
+    sy, syy, siy = sums[total] - sums[start]
+    return np.array([n, n * (n - 1) / 2, sy, siy - start * sy, (n - 1) * n * (2 * n - 1) / 6, syy])
+
+
+class TrendForecaster:
+    """Linear engagement trend per account, fitted for many accounts at once.
+
+    Each account keeps its newest :data:`MAX_POSTS` posts sorted by time with
+    running sums of ``[y, y², iy]`` (``i`` is the post's position, oldest
+    first), so the statistics ``[n, Σx, Σy, Σxy, Σx², Σy²]`` of any newest-``limit``
+    window are a subtraction. Posts are de-duplicated by id (``username:taken_at``
+    without one), so feeding overlapping fetches is safe. Posts newer than
+    the latest one held extend the sums; a batch reaching further back (a
+    larger fetch) re-sorts the account's posts and rebuilds them. A forecast
+    is one vectorized solve over the windows' stats.
+    """
+
+    def __init__(self, max_posts: int = None):
+        self.max_posts = max_posts or MAX_POSTS
+        self._lock = threading.Lock()
+        # username -> {"keys": set, "times": array, "series": array, "sums": array (n + 1, 3)}
+        self._accounts = {}
+
+    def update(self, df: pd.DataFrame) -> int:
+        """Fold posts (``username``, ``taken_at``, ``eng_score``, optionally ``id``) into the series.
+
+        Returns the number of posts added.
+        """
+        username = df["username"].astype(str).str.lower()
+        taken_at = _unix_seconds(df["taken_at"]).astype("float64")
+        ids = df["id"].fillna("").astype(str) if "id" in df else pd.Series("", index=df.index)
+        fallback = username + ":" + taken_at.astype(str)
+        posts = pd.DataFrame({
+            "key": ids.where(ids != "", fallback).to_numpy(dtype=object),
+            "username": username.to_numpy(dtype=object),
+            "taken_at": taken_at.to_numpy(),
+            "eng": df["eng_score"].astype("float64").fillna(0).to_numpy(),
+        }).dropna(subset=["taken_at"]).drop_duplicates("key")
+        if posts.empty:
+            return 0
+
+        posts = posts.sort_values(["username", "taken_at"], kind="stable")
+        names = posts["username"].to_numpy(dtype=object)
+        keys = posts["key"].to_numpy(dtype=object)
+        taken = posts["taken_at"].to_numpy()
+        eng = posts["eng"].to_numpy()
+        bounds = np.flatnonzero(names[1:] != names[:-1]) + 1
+
+        added = 0
+        with self._lock:
+            for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(names)]):
+                account = self._accounts.setdefault(names[start], {
+                    "keys": set(), "times": np.empty(0), "series": np.empty(0), "sums": np.zeros((1, 3))})
+                seen = account["keys"]
+                fresh = start + np.flatnonzero([key not in seen for key in keys[start:end]])
+                if not len(fresh):
+                    continue
+                seen.update(keys[fresh].tolist())
+                y = eng[fresh]
+                times = np.concatenate([account["times"], taken[fresh]])
+                series = np.concatenate([account["series"], y])
+                held = len(account["series"])
+                # new posts that all follow the ones held (and stay under the cap)
+                # extend the running sums; anything else re-sorts and rebuilds them
+                if (not held or taken[fresh[0]] > account["times"][-1]) and len(series) <= self.max_posts:
+                    x = held + np.arange(len(y))
+                    sums = account["sums"][-1] + np.cumsum(np.column_stack([y, y * y, x * y]), axis=0)
+                    sums = np.vstack([account["sums"], sums])
+                else:
+                    order = np.argsort(times, kind="stable")[-self.max_posts:]
+                    times, series = times[order], series[order]
+                    x = np.arange(len(series))
+                    sums = np.vstack([np.zeros((1, 3)), np.cumsum(np.column_stack(
+                        [series, series * series, x * series]), axis=0)])
+                account["times"], account["series"], account["sums"] = times, series, sums
+                added += len(fresh)
+        return added
+
+    def stats(self, usernames, limit: int = None) -> np.ndarray:
+        """``[n, Σx, Σy, Σxy, Σx², Σy²]`` rows of ``usernames`` over their newest
+        ``limit`` posts (all held posts without one; zeros for unknown accounts)."""
+        with self._lock:
+            return np.array([window_stats(self._accounts[u]["sums"], limit) if u in self._accounts
+                             else np.zeros(6) for u in (u.lower() for u in usernames)]).reshape(-1, 6)
+
+    def forecast(self, usernames=None, horizon: int = HORIZON, limit: int = None) -> list:
+        """Next ``horizon`` predictions plus fit quality for every account,
+        fitted on its newest ``limit`` posts (all held posts without one).
+
+        One solve over all requested accounts; unknown accounts get an
+        ``error`` entry instead of a forecast.
+        """
+        with self._lock:
+            names = [u.lower() for u in usernames] if usernames is not None else list(self._accounts)
+            known = [u for u in names if u in self._accounts and len(self._accounts[u]["series"])]
+            stats = np.array([window_stats(self._accounts[u]["sums"], limit) for u in known]).reshape(-1, 6)
+            series = [self._accounts[u]["series"][-int(n):] for u, n in zip(known, stats[:, N])]
+
+        slope, intercept, r2 = solve(stats)
+        n = stats[:, N]
+
+        # MAE over the padded (accounts x posts) residual matrix
+        width = int(n.max()) if len(n) else 0
+        observed = np.full((len(known), width), np.nan)
+        for i, values in enumerate(series):
+            observed[i, :len(values)] = values
+        fitted = intercept[:, None] + slope[:, None] * np.arange(width)
+        mae = np.nanmean(np.abs(observed - fitted), axis=1) if width else np.zeros(0)
+
+        future = intercept[:, None] + slope[:, None] * (n[:, None] + np.arange(horizon))
+
+        results = {username: {
+            "username": username,
+            "posts": int(n[i]),
+            "slope": float(slope[i]),
+            "intercept": float(intercept[i]),
+            "r2": float(r2[i]),
+            "mae": float(mae[i]),
+            "predictions": future[i].tolist(),
+        } for i, username in enumerate(known)}
+        return [results.get(u, {"username": u, "error": "No posts"}) for u in names]
@@ -0,0 +1,185 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from normalize import post_keys
+
+HASHTAG_PATTERN = r"#(\w+)"
+
+TOP_COLUMNS = ["hashtag", "posts", "avg_likes", "avg_eng"]
+
+
+def extract_hashtags(captions) -> pd.Series:
+    """Lower-cased hashtags (without ``#``) of every caption, one list per caption."""
+    return pd.Series(captions, dtype="object").fillna("").astype(str).str.lower().str.findall(HASHTAG_PATTERN)
+
+
+class HashtagIndex:
+    """Inverted index ``hashtag -> post ids`` with running per-tag aggregates.
+
+    Every account keeps ``[posts, likes_sum, eng_sum, eng_count]`` per tag,
+    updated as posts are added; posts already indexed are skipped, so feeding
+    the same frame again (a Streamlit rerun, a delta sync) only pays for the
+    new rows. Each account also keeps its post keys in time order and its
+    ``(post, tag)`` rows, so a ranking over its newest ``limit`` posts is
+    exact. Rankings are built on the first query after a change and then
+    served as slices.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._postings = {}
+        self._stats = {}
+        # username -> (times, post keys), sorted by time
+        self._posts = {}
+        # username -> (post keys, tags, likes, eng), one entry per (post, tag)
+        self._tags = {}
+        self._ranked = {}
+
+    def add_posts(self, df: pd.DataFrame) -> int:
+        """Index posts not seen before; returns the number added."""
+        if df.empty:
+            return 0
+        keys = post_keys(df)
+        with self._lock:
+            seen = np.fromiter((key in self._seen for key in keys), dtype=bool, count=len(keys))
+            new = ~seen & ~pd.Series(keys, dtype="object").duplicated().values
+            if not new.any():
+                return 0
+            posts = pd.DataFrame({
+                "key": pd.Series(keys[new], dtype="object"),
+                "username": df.loc[new, "username"].astype(str).str.lower().to_numpy(dtype=object),
+                # parsed at ingest when the caption feature stage ran
+                "hashtag": df.loc[new, "hashtags"].values if "hashtags" in df else extract_hashtags(df.loc[new, "caption"]).values,
+                "likes": pd.to_numeric(df.loc[new, "likes"], errors="coerce").fillna(0).values,
+                "eng": df.loc[new, "eng_score"].astype("float64").replace([np.inf, -np.inf], np.nan).values,
+                # posts without a timestamp count as the oldest
+                "time": pd.to_numeric(df["taken_at"], errors="coerce").to_numpy(dtype="float64", na_value=-np.inf)[new],
+            })
+            self._seen.update(keys[new])
+
+            tags = posts.explode("hashtag").dropna(subset=["hashtag"]).drop_duplicates(["key", "hashtag"])
+            self._hold(posts, tags)
+            self._ranked.clear()
+            if tags.empty:
+                return int(new.sum())
+
+            postings = self._postings
+            for tag, key in zip(tags["hashtag"].to_numpy(dtype=object), tags["key"].to_numpy(dtype=object)):
+                ids = postings.get(tag)
+                if ids is None:
+                    ids = postings[tag] = set()
+                ids.add(key)
+
+            grouped = tags.groupby(["username", "hashtag"]).agg(
+                posts=("key", "size"),
+                likes=("likes", "sum"),
+                eng=("eng", "sum"),
+                eng_n=("eng", "count"),
+            )
+            columns = (grouped[c].tolist() for c in ("posts", "likes", "eng", "eng_n"))
+            for (username, tag), posts_n, likes, eng, eng_n in zip(grouped.index, *columns):
+                stats = self._stats.setdefault(username, {}).setdefault(tag, [0, 0.0, 0.0, 0])
+                stats[0] += posts_n
+                stats[1] += likes
+                stats[2] += eng
+                stats[3] += eng_n
+        return int(new.sum())
+
+    def _hold(self, posts: pd.DataFrame, tags: pd.DataFrame):
+        ordered = posts.sort_values(["username", "time"], kind="stable")
+        users, times, keys = (ordered[c].to_numpy(dtype=dtype) for c, dtype in
+                              (("username", object), ("time", "float64"), ("key", object)))
+        bounds = np.flatnonzero(users[1:] != users[:-1]) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(users)]):
+            username = users[start]
+            held = self._posts.get(username)
+            if held is None:
+                self._posts[username] = (times[start:stop], keys[start:stop])
+            else:
+                merged_times = np.concatenate([held[0], times[start:stop]])
+                order = np.argsort(merged_times, kind="stable")
+                self._posts[username] = (merged_times[order], np.concatenate([held[1], keys[start:stop]])[order])
+
+        columns = [tags[c].to_numpy(dtype=dtype) for c, dtype in
+                   (("key", object), ("hashtag", object), ("likes", "float64"), ("eng", "float64"))]
+        for username, rows in tags.groupby("username").indices.items():
+            batch = tuple(column[rows] for column in columns)
+            held = self._tags.get(username)
+            self._tags[username] = batch if held is None else tuple(np.concatenate(pair) for pair in zip(held, batch))
+
+    def _window(self, username: str, limit: int) -> dict:
+        """``tag -> [posts, likes_sum, eng_sum, eng_count]`` over the account's newest ``limit`` posts."""
+        held = self._tags.get(username)
+        if held is None:
+            return {}
+        keys, tags, likes, eng = held
+        inside = pd.Index(self._posts[username][1][-limit:]).get_indexer(keys) >= 0
+        grouped = pd.DataFrame({"hashtag": tags[inside], "likes": likes[inside], "eng": eng[inside]}) \
+            .groupby("hashtag").agg(posts=("likes", "size"), likes=("likes", "sum"),
+                                    eng=("eng", "sum"), eng_n=("eng", "count"))
+        return {tag: list(row) for tag, row in zip(grouped.index, grouped.itertuples(index=False))}
+
+    def posts_for(self, tag: str) -> set:
+        """Ids of every indexed post using ``tag``."""
+        with self._lock:
+            return set(self._postings.get(tag.lstrip("#").lower(), ()))
+
+    def _table(self, usernames, limit: int = None) -> pd.DataFrame:
+        totals = {}
+        for username in usernames:
+            held = self._posts.get(username)
+            if limit is not None and held is not None and limit < len(held[0]):
+                stats = self._window(username, limit)
+            else:
+                stats = self._stats.get(username, {})
+            for tag, (posts, likes, eng, eng_n) in stats.items():
+                acc = totals.setdefault(tag, [0, 0.0, 0.0, 0])
+                acc[0] += posts
+                acc[1] += likes
+                acc[2] += eng
+                acc[3] += eng_n
+        if not totals:
+            return pd.DataFrame(columns=TOP_COLUMNS)
+        stats = np.array(list(totals.values()), dtype="float64")
+        table = pd.DataFrame({
+            "hashtag": list(totals),
+            "posts": stats[:, 0].astype("int64"),
+            "avg_likes": stats[:, 1] / stats[:, 0],
+            "avg_eng": np.divide(stats[:, 2], stats[:, 3], out=np.full(len(stats), np.nan), where=stats[:, 3] > 0),
+        })
+        return table
+
+    def top(self, n: int = 10, by: str = "avg_likes", usernames=None, limit: int = None) -> pd.DataFrame:
+        """Top ``n`` hashtags by ``avg_likes``, ``avg_eng`` or ``posts`` (frequency).
+
+        ``usernames`` limits the ranking to those accounts (default: all) and
+        ``limit`` to each account's newest ``limit`` posts.
+        """
+        with self._lock:
+            accounts = tuple(sorted({u.lower() for u in usernames})) if usernames is not None else tuple(sorted(self._stats))
+            ranked = self._ranked.get((accounts, by, limit))
+            if ranked is None:
+                ranked = self._table(accounts, limit).sort_values(by, ascending=False, kind="stable").reset_index(drop=True)
+                self._ranked[(accounts, by, limit)] = ranked
+        return ranked.head(n)
+
+    def frequency(self, n: int = 30, usernames=None, limit: int = None) -> pd.Series:
+        """Post counts of the ``n`` most used hashtags."""
+        top = self.top(n, by="posts", usernames=usernames, limit=limit)
+        return pd.Series(top["posts"].values, index=top["hashtag"].values, name="count")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> HashtagIndex:
+    """Process-wide hashtag index, filled by :mod:`ingest`."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashtagIndex()
+        return _index
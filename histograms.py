@@ -0,0 +1,235 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from normalize import post_keys
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+HOURS = list(range(24))
+BINS = 7 * 24
+
+# counts, likes sum, eng_score sum, number of finite eng_scores
+FIELDS = ["count", "likes", "eng", "eng_n"]
+
+
+def _unix_seconds(taken_at) -> np.ndarray:
+    taken_at = pd.Series(taken_at)
+    if pd.api.types.is_datetime64_any_dtype(taken_at):
+        taken_at = (taken_at - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return pd.to_numeric(taken_at, errors="coerce").astype("float64").to_numpy()
+
+
+def weekday_hour_bins(seconds: np.ndarray) -> np.ndarray:
+    """``weekday * 24 + hour`` (UTC, Monday = 0) of unix timestamps."""
+    seconds = seconds.astype("int64")
+    # 1970-01-01 was a Thursday (weekday 3)
+    return ((seconds // 86400 + 3) % 7) * 24 + (seconds // 3600) % 24
+
+
+def month_windows(seconds: np.ndarray) -> np.ndarray:
+    """Calendar month (months since 1970-01) of unix timestamps."""
+    return seconds.astype("int64").astype("datetime64[s]").astype("datetime64[M]").astype("int64")
+
+
+def month_start(month: int) -> int:
+    """Unix timestamp of the first second of a calendar month (months since 1970-01)."""
+    return int(np.datetime64(int(month), "M").astype("datetime64[s]").astype("int64"))
+
+
+def _likes(df: pd.DataFrame) -> np.ndarray:
+    return pd.to_numeric(df["likes"], errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def _eng(df: pd.DataFrame) -> np.ndarray:
+    return df["eng_score"].astype("float64").replace([np.inf, -np.inf], np.nan).to_numpy()
+
+
+def month_of(value) -> int:
+    """Calendar month (months since 1970-01) of anything ``pd.Timestamp``
+    accepts; ``ValueError`` if it is not a date."""
+    try:
+        stamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        stamp = pd.NaT
+    if pd.isna(stamp):
+        raise ValueError(f"Not a date: {value!r}")
+    return int(month_windows(np.array([stamp.timestamp()]))[0])
+
+
+class PostingHistogram:
+    """Weekday × hour aggregate of posts: counts, likes and eng_score sums.
+
+    Histograms add up, so per-account or per-month histograms merge into
+    portfolio-wide ones, and every answer costs O(168) whatever the number
+    of posts behind it.
+    """
+
+    def __init__(self, data: np.ndarray = None):
+        self.data = np.zeros((len(FIELDS), BINS)) if data is None else data
+
+    @classmethod
+    def from_posts(cls, df: pd.DataFrame) -> "PostingHistogram":
+        return cls.from_arrays(_unix_seconds(df["taken_at"]), _likes(df), _eng(df))
+
+    @classmethod
+    def from_arrays(cls, seconds: np.ndarray, likes: np.ndarray, eng: np.ndarray) -> "PostingHistogram":
+        """Histogram of posts given as timestamps, likes and eng_scores (NaN = missing)."""
+        valid = ~np.isnan(seconds)
+        bins = weekday_hour_bins(seconds[valid])
+        likes, eng = likes[valid], eng[valid]
+        finite = ~np.isnan(eng)
+        return cls(np.vstack([
+            np.bincount(bins, minlength=BINS),
+            np.bincount(bins, weights=likes, minlength=BINS),
+            np.bincount(bins[finite], weights=eng[finite], minlength=BINS),
+            np.bincount(bins[finite], minlength=BINS),
+        ]).astype("float64"))
+
+    def __add__(self, other: "PostingHistogram") -> "PostingHistogram":
+        return PostingHistogram(self.data + other.data)
+
+    @property
+    def posts(self) -> int:
+        return int(self.data[0].sum())
+
+    def grid(self, metric: str = "eng") -> np.ndarray:
+        """7×24 matrix of post counts or mean ``likes``/``eng`` (NaN where empty)."""
+        if metric == "count":
+            return self.data[0].reshape(7, 24)
+        total, n = (self.data[1], self.data[0]) if metric == "likes" else (self.data[2], self.data[3])
+        return np.divide(total, n, out=np.full(BINS, np.nan), where=n > 0).reshape(7, 24)
+
+    def by_hour(self, metric: str = "count") -> np.ndarray:
+        """24 hourly post counts or mean ``likes``/``eng`` across weekdays."""
+        hourly = self.data.reshape(len(FIELDS), 7, 24).sum(axis=1)
+        if metric == "count":
+            return hourly[0]
+        total, n = (hourly[1], hourly[0]) if metric == "likes" else (hourly[2], hourly[3])
+        return np.divide(total, n, out=np.full(24, np.nan), where=n > 0)
+
+    def best_hour(self, metric: str = "count"):
+        """Hour (0-23) with the most posts or the best mean ``likes``/``eng``; ``None`` if empty."""
+        hourly = self.by_hour(metric)
+        if not self.posts or np.isnan(hourly).all():
+            return None
+        return int(np.nanargmax(hourly))
+
+    def to_frame(self, metric: str = "eng") -> pd.DataFrame:
+        return pd.DataFrame(self.grid(metric), index=WEEKDAYS, columns=HOURS)
+
+
+class HistogramIndex:
+    """Per-account, per-month posting histograms, filled as posts are ingested.
+
+    Posts already seen (by id) are skipped, so the same frame can be fed on
+    every run. Queries merge the requested accounts and months. A query
+    limited to each account's newest ``limit`` posts reads the months the
+    window covers whole from the stored histograms, and only the posts of
+    the month it starts in from the account's time-sorted posts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._windows = {}
+        # username -> (times, likes, eng), sorted by time
+        self._posts = {}
+
+    def add_posts(self, df: pd.DataFrame) -> int:
+        """Fold posts not seen before into their account/month histograms."""
+        if df.empty:
+            return 0
+        keys = post_keys(df)
+        with self._lock:
+            seen = np.fromiter((key in self._seen for key in keys), dtype=bool, count=len(keys))
+            new = ~seen & ~pd.Series(keys, dtype="object").duplicated().values
+            seconds = _unix_seconds(df["taken_at"])
+            new &= ~np.isnan(seconds)
+            if not new.any():
+                return 0
+            self._seen.update(keys[new])
+
+            posts = df[new]
+            seconds = seconds[new]
+            usernames = posts["username"].astype(str).str.lower().to_numpy(dtype=object)
+            groups = pd.DataFrame({"username": usernames, "month": month_windows(seconds)})
+            codes, uniques = pd.MultiIndex.from_frame(groups).factorize()
+            # one bincount per field over (group, weekday, hour) for every account/month at once
+            flat = codes * BINS + weekday_hour_bins(seconds)
+            size = len(uniques) * BINS
+            likes = _likes(posts)
+            eng = _eng(posts)
+            finite = ~np.isnan(eng)
+            data = np.stack([
+                np.bincount(flat, minlength=size),
+                np.bincount(flat, weights=likes, minlength=size),
+                np.bincount(flat[finite], weights=eng[finite], minlength=size),
+                np.bincount(flat[finite], minlength=size),
+            ]).astype("float64").reshape(len(FIELDS), len(uniques), BINS)
+
+            for i, (username, month) in enumerate(uniques):
+                months = self._windows.setdefault(username, {})
+                if month in months:
+                    months[month].data += data[:, i]
+                else:
+                    months[month] = PostingHistogram(data[:, i].copy())
+
+            # per-account posts, sorted by time, for windows starting mid-month
+            accounts, names = pd.factorize(usernames)
+            order = np.lexsort((seconds, accounts))
+            accounts, columns = accounts[order], (seconds[order], likes[order], eng[order])
+            bounds = np.flatnonzero(np.diff(accounts)) + 1
+            for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(accounts)]):
+                username = names[accounts[start]]
+                batch = [column[start:end] for column in columns]
+                held = self._posts.get(username)
+                if held is not None:
+                    batch = [np.concatenate([old, new]) for old, new in zip(held, batch)]
+                    if batch[0][len(held[0])] < held[0][-1]:
+                        resort = np.argsort(batch[0], kind="stable")
+                        batch = [column[resort] for column in batch]
+                self._posts[username] = tuple(batch)
+        return int(new.sum())
+
+    def histogram(self, usernames=None, since=None, until=None, limit: int = None) -> PostingHistogram:
+        """Merged histogram of ``usernames`` (default: all) over a month range,
+        counting each account's newest ``limit`` posts only (all without one).
+
+        ``since``/``until`` are anything ``pd.Timestamp`` accepts and select
+        whole calendar months; anything else raises ``ValueError``.
+        """
+        names = {u.lower() for u in usernames} if usernames is not None else None
+        first = month_of(since) if since is not None else -np.inf
+        last = month_of(until) if until is not None else np.inf
+        merged = PostingHistogram()
+        with self._lock:
+            for username in (names if names is not None else list(self._windows)):
+                oldest = first
+                held = self._posts.get(username)
+                if limit is not None and held is not None and limit < len(held[0]):
+                    # the window starts mid-month: that month comes from its posts,
+                    # later months from their stored histograms
+                    start = len(held[0]) - limit
+                    month = int(month_windows(held[0][start:start + 1])[0])
+                    if first <= month <= last:
+                        end = np.searchsorted(held[0], month_start(month + 1), side="left")
+                        merged.data += PostingHistogram.from_arrays(*(c[start:end] for c in held)).data
+                    oldest = max(first, month + 1)
+                for month, hist in self._windows.get(username, {}).items():
+                    if oldest <= month <= last:
+                        merged.data += hist.data
+        return merged
+
+
+_histograms = None
+_histograms_lock = threading.Lock()
+
+
+def get_histograms() -> HistogramIndex:
+    """Process-wide histogram index, filled by :mod:`ingest`."""
+    global _histograms
+    with _histograms_lock:
+        if _histograms is None:
+            _histograms = HistogramIndex()
+        return _histograms
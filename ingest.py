@@ -0,0 +1,47 @@
+import threading
+
+from hashtags import get_index
+from histograms import get_histograms
+from registry import get_registry
+from summaries import get_summaries
+
+# accounts whose stored history this process has already ingested
+_loaded = set()
+_loaded_lock = threading.Lock()
+
+
+# -------------------------------
+# Every path that brings posts in (live fetches, store syncs, the
+# dashboards) hands them to ingest_posts, so the persisted models, the
+# posting histograms, the hashtag index and the account summaries are
+# updated once here and queries read them instead of rescanning posts.
+# -------------------------------
+def ingest_posts(df, limit: int = None) -> int:
+    """Fold normalized posts into the model registry, the posting histograms,
+    the hashtag index and the account summaries; posts already ingested are
+    skipped. ``limit`` is the post count the fetch asked for. Returns the
+    number of posts new to the registry."""
+    if df is None or df.empty:
+        return 0
+    get_histograms().add_posts(df)
+    get_index().add_posts(df)
+    get_summaries().add_posts(df)
+    return get_registry().update(df, limit)
+
+
+def ingest_followers(df_f):
+    """Latest follower counts (a followers frame) for the account summaries."""
+    if df_f is not None and not df_f.empty:
+        get_summaries().add_followers(df_f)
+
+
+def ingest_stored(store, usernames):
+    """Ingest the stored history of accounts not yet ingested by this process
+    (posts written before it started); later syncs ingest in ``append_posts``."""
+    with _loaded_lock:
+        names = [u.lower() for u in dict.fromkeys(usernames) if u.lower() not in _loaded]
+        if names:
+            df, df_f = store.load_frames(names)
+            ingest_posts(df)
+            ingest_followers(df_f)
+            _loaded.update(names)
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import get_setting
+
+JOBS_PATH = get_setting("INSTA_JOBS_PATH", os.path.join(".insta_cache", "jobs.sqlite"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """SQLite-backed queue of per-account work items.
+
+    A job is a list of usernames; every username is one item that workers
+    claim, run and complete independently, so progress and partial results
+    are visible while the job runs. Items left ``running`` by a crashed or
+    restarted server are put back in the queue on start-up.
+    """
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status);
+        """)
+        self._conn.execute("UPDATE job_items SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+        self._conn.commit()
+
+    def submit(self, kind: str, usernames, params: dict = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params or {}), len(usernames), now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, position, username, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, i, name, QUEUED, now) for i, name in enumerate(usernames)],
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self):
+        """Mark the oldest queued item as running and return it (or ``None``)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT i.job_id, i.position, i.username, j.kind, j.params "
+                "FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.status = ? ORDER BY j.created_at, i.position LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, updated_at = ? WHERE job_id = ? AND position = ?",
+                (RUNNING, time.time(), row[0], row[1]),
+            )
+            self._conn.commit()
+        return {
+            "job_id": row[0],
+            "position": row[1],
+            "username": row[2],
+            "kind": row[3],
+            "params": json.loads(row[4]),
+        }
+
+    def complete(self, item: dict, result=None, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND position = ?",
+                (FAILED if error else DONE, json.dumps(result) if result is not None else None,
+                 error, time.time(), item["job_id"], item["position"]),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str, offset: int = 0, limit: int = 100):
+        """Job status, progress counts and one page of finished items."""
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT kind, params, total, created_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            rows = self._conn.execute(
+                "SELECT username, status, result, error FROM job_items "
+                "WHERE job_id = ? AND status IN (?, ?) ORDER BY position LIMIT ? OFFSET ?",
+                (job_id, DONE, FAILED, limit, offset),
+            ).fetchall()
+
+        total = job[2]
+        finished = counts.get(DONE, 0) + counts.get(FAILED, 0)
+        if finished == total:
+            status = DONE
+        elif counts.get(RUNNING, 0) or finished:
+            status = RUNNING
+        else:
+            status = QUEUED
+        return {
+            "job_id": job_id,
+            "kind": job[0],
+            "params": json.loads(job[1]),
+            "status": status,
+            "total": total,
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "progress": round(finished / total, 4) if total else 1.0,
+            "offset": offset,
+            "limit": limit,
+            "results": [{
+                "username": username,
+                "status": item_status,
+                "result": json.loads(result) if result else None,
+                "error": error,
+            } for username, item_status, result, error in rows],
+        }
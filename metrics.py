@@ -0,0 +1,142 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; shared by every latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Route of the request being served and its stage timings (for Server-Timing)
+_route = contextvars.ContextVar("metrics_route", default="background")
+_timings = contextvars.ContextVar("metrics_timings", default=None)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {n}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {n}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "insta_http_request_duration_seconds", "API request latency by route.",
+    ("method", "route", "status"))
+UPSTREAM_LATENCY = Histogram(
+    "insta_upstream_request_duration_seconds", "RapidAPI call latency by endpoint.",
+    ("endpoint",))
+UPSTREAM_ERRORS = Counter(
+    "insta_upstream_errors_total", "Failed RapidAPI calls by endpoint and reason.",
+    ("endpoint", "reason"))
+STAGE_LATENCY = Histogram(
+    "insta_stage_duration_seconds", "Time spent in each processing stage of a route.",
+    ("route", "stage"))
+
+METRICS = [REQUEST_LATENCY, UPSTREAM_LATENCY, UPSTREAM_ERRORS, STAGE_LATENCY]
+
+
+# -------------------------------
+# Request / stage timing
+# -------------------------------
+def begin_request(route: str) -> list:
+    """Start collecting stage timings for the current request context."""
+    timings = []
+    _route.set(route)
+    _timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage ``name`` of the current route."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, route=_route.get(), stage=name)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing(timings, total: float) -> str:
+    """``Server-Timing`` header value (durations in milliseconds)."""
+    entries = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def observe_upstream(endpoint: str, elapsed: float, error: str = None):
+    UPSTREAM_LATENCY.observe(elapsed, endpoint=endpoint)
+    if error:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=error)
+
+
+# -------------------------------
+# Exposition
+# -------------------------------
+def render(samples: dict = None) -> str:
+    """All metrics in Prometheus text format.
+
+    ``samples`` maps extra metric names to ``(type, help, value)`` read at
+    scrape time (cache and scheduler statistics).
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, (kind, help, value) in (samples or {}).items():
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
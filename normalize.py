@@ -0,0 +1,179 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+# Fixed schema of a normalized post frame (``taken_at`` is unix seconds)
+POST_DTYPES = {
+    "username": "object",
+    "id": "object",
+    "likes": "int64",
+    "views": "int64",
+    "comments": "int64",
+    "caption": "object",
+    "eng_score": "float64",
+    "taken_at": "Int64",
+}
+POST_COLUMNS = list(POST_DTYPES)
+
+FOLLOWER_DTYPES = {
+    "username": "object",
+    "followers": "Int64",
+}
+
+
+def caption_text(caption_field) -> str:
+    """RapidAPI returns captions either as a dict with ``text`` or a plain string."""
+    if isinstance(caption_field, dict):
+        return caption_field.get("text", "") or ""
+    if isinstance(caption_field, str):
+        return caption_field
+    return ""
+
+
+def post_id(item: dict) -> str:
+    for key in ("id", "pk", "code"):
+        if item.get(key) is not None:
+            return str(item[key])
+    return ""
+
+
+def normalize_post(item: dict, username: str, followers=None) -> dict:
+    """Flatten one raw ``/userposts/`` item into the dashboard's post row.
+
+    Streaming counterpart of :func:`normalize_posts`; both apply the same rules.
+    """
+    likes = int(item.get("like_count", 0) or 0)
+    views = int(item.get("view_count") or item.get("play_count") or item.get("video_view_count") or 0)
+    taken_at = item.get("taken_at", None)
+    return {
+        "username": username,
+        "id": post_id(item),
+        "likes": likes,
+        "views": views,
+        "comments": int(item.get("comment_count", 0) or 0),
+        "caption": caption_text(item.get("caption", "")),
+        "eng_score": (likes / views) if views else (likes / max(1, followers) if followers else None),
+        "taken_at": int(taken_at) if taken_at is not None else None,
+    }
+
+
+# -------------------------------
+# Vectorized batch normalization
+# -------------------------------
+def _numeric(values) -> np.ndarray:
+    try:
+        # fast path: ints, floats, None and numeric strings
+        return np.array(values, dtype="float64")
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce").to_numpy(dtype="float64")
+
+
+def eng_scores(likes, views, followers=None) -> np.ndarray:
+    """likes / views, falling back to likes / followers for posts without views."""
+    likes = np.asarray(likes, dtype="float64")
+    views = np.asarray(views, dtype="float64")
+    if followers is None:
+        followers = np.full(len(likes), np.nan)
+    followers = np.asarray(followers, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_views = likes / views
+        by_followers = likes / np.maximum(1, followers)
+    return np.where(views > 0, by_views, np.where(followers > 0, by_followers, np.nan))
+
+
+def _field(items, key) -> list:
+    return list(map(dict.get, items, repeat(key)))
+
+
+def _ids(items) -> np.ndarray:
+    # first non-null of id -> pk -> code, as strings
+    ids = np.array(_field(items, "id"), dtype="object")
+    for key in ("pk", "code"):
+        missing = pd.isna(ids)
+        if missing.any():
+            ids[missing] = np.array(_field(items, key), dtype="object")[missing]
+    ids[pd.isna(ids)] = ""
+    return np.array(list(map(str, ids)), dtype="object")
+
+
+def _captions(items) -> np.ndarray:
+    raw = pd.Series(_field(items, "caption"), dtype="object")
+    kinds = raw.map(type).to_numpy()
+    captions = np.full(len(raw), "", dtype="object")
+    is_str = kinds == str
+    is_dict = kinds == dict
+    captions[is_str] = raw.to_numpy()[is_str]
+    captions[is_dict] = [text or "" for text in map(dict.get, raw.to_numpy()[is_dict], repeat("text"))]
+    return captions
+
+
+def normalize_posts(items, usernames, followers=None) -> pd.DataFrame:
+    """Turn a batch of raw ``/userposts/`` items into a typed post frame.
+
+    ``usernames`` and ``followers`` are either scalars or sequences aligned
+    with ``items``. Only the handful of raw fields we need are pulled out of
+    each dict; everything else is column arithmetic.
+    """
+    n = len(items)
+    if isinstance(usernames, str):
+        usernames = [usernames] * n
+    if followers is None or np.isscalar(followers):
+        followers = np.full(n, np.nan if followers is None else followers, dtype="float64")
+
+    likes = np.nan_to_num(_numeric(_field(items, "like_count")))
+    comments = np.nan_to_num(_numeric(_field(items, "comment_count")))
+
+    # first positive of view_count -> play_count -> video_view_count
+    views = _numeric(_field(items, "view_count"))
+    for key in ("play_count", "video_view_count"):
+        views = np.where(views > 0, views, _numeric(_field(items, key)))
+    views = np.nan_to_num(views)
+
+    df = pd.DataFrame({
+        "username": pd.Series(usernames, dtype="object"),
+        "id": pd.Series(_ids(items), dtype="object"),
+        "likes": likes.astype("int64"),
+        "views": views.astype("int64"),
+        "comments": comments.astype("int64"),
+        "caption": pd.Series(_captions(items), dtype="object"),
+        "eng_score": eng_scores(likes, views, followers),
+        "taken_at": pd.array(_numeric(_field(items, "taken_at")), dtype="Float64").astype("Int64"),
+    })
+    return df.astype(POST_DTYPES)
+
+
+def normalize_accounts(accounts) -> tuple:
+    """Build ``(posts, followers)`` frames from fetcher account results."""
+    items, names, counts, follower_rows = [], [], [], []
+    for account in accounts:
+        followers = account["user_info"].get("follower_count", None)
+        followers = int(followers) if followers is not None else None
+        follower_rows.append({"username": account["username"], "followers": followers})
+
+        posts = account["posts"]
+        items.extend(posts)
+        names.extend([account["username"]] * len(posts))
+        counts.extend([followers if followers is not None else np.nan] * len(posts))
+
+    df = normalize_posts(items, names, np.asarray(counts, dtype="float64"))
+    df_f = pd.DataFrame(follower_rows, columns=list(FOLLOWER_DTYPES)).astype(FOLLOWER_DTYPES)
+    return df, df_f
+
+
+def enforce_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Reorder/cast an existing post frame to :data:`POST_DTYPES`."""
+    return df.reindex(columns=POST_COLUMNS).astype(POST_DTYPES)
+
+
+def post_keys(df: pd.DataFrame) -> np.ndarray:
+    """Stable identity per post row: its id, or ``username:caption`` without one.
+
+    Used by the incremental indexes to skip posts they have already seen.
+    """
+    ids = df["id"].fillna("").astype(str)
+    missing = ids == ""
+    if missing.any():
+        ids = ids.copy()
+        ids[missing] = df.loc[missing, "username"].astype(str).str.lower() + ":" + df.loc[missing, "caption"].fillna("").astype(str)
+    return ids.to_numpy(dtype=object)
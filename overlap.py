@@ -0,0 +1,296 @@
+import glob
+import os
+import threading
+import uuid
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from config import get_setting
+
+SKETCH_PATH = get_setting("INSTA_SKETCH_PATH", os.path.join(".insta_cache", "sketches"))
+
+# One-permutation MinHash bins (Jaccard error ~ 1/sqrt(bins)) and
+# HyperLogLog precision (2**p registers, ~1.04/sqrt(2**p) cardinality error)
+MINHASH_BINS = 1024
+HLL_PRECISION = 14
+
+# Ids hashed per batch when reading large lists or files
+ID_BATCH = 1_000_000
+ID_COLUMNS = ("id", "pk", "user_id", "follower_id", "username")
+
+_EMPTY = np.iinfo(np.uint64).max
+
+
+# Canonical decimal integers of up to 19 digits; those within the int64
+# range (see _int64_mask) hash as numbers
+_INTEGER = r"-?(?:0|[1-9][0-9]{0,18})"
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _int64_mask(keys: pd.Series) -> np.ndarray:
+    numeric = keys.str.fullmatch(_INTEGER).to_numpy(dtype=bool, copy=True)
+    digits = keys.str.lstrip("-")
+    # 19-digit candidates may still overflow; digit strings of equal length
+    # compare like the numbers they spell
+    long = numeric & (digits.str.len() == 19).to_numpy(dtype=bool)
+    if long.any():
+        negative = keys.str.startswith("-").to_numpy(dtype=bool)[long]
+        bound = np.where(negative, str(_INT64_MAX + 1), str(_INT64_MAX)).astype(object)
+        numeric[long] = digits.to_numpy(dtype=object)[long] <= bound
+    return numeric
+
+
+def _canonical(value) -> str:
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value).strip().lower()
+
+
+def canonical_ids(ids) -> pd.Series:
+    """Each id as its canonical string: trimmed and lower-cased, integral
+    numbers without a decimal part. Missing ids are dropped."""
+    ids = pd.Series(ids).dropna()
+    if ids.dtype.kind in "iu":
+        return ids.astype(str)
+    if pd.api.types.is_string_dtype(ids):
+        return ids.astype(str).str.strip().str.lower()
+    return pd.Series([_canonical(v) for v in ids], dtype=str)
+
+
+def hash_ids(ids) -> np.ndarray:
+    """Stable 64-bit hashes of follower/engager ids.
+
+    Every id is canonicalized on its own (see :func:`canonical_ids`) and
+    integers hash as numbers, so ``123``, ``123.0`` and ``" 123"`` count as
+    the same person whatever batch or source they come from.
+    """
+    ids = pd.Series(ids)
+    if ids.dtype.kind == "i" or (ids.dtype.kind == "u" and (ids <= _INT64_MAX).all()):
+        return pd.util.hash_array(ids.to_numpy(dtype="int64"))
+    keys = canonical_ids(ids)
+    numeric = _int64_mask(keys)
+    hashes = np.empty(len(keys), dtype=np.uint64)
+    hashes[numeric] = pd.util.hash_array(keys[numeric].astype("int64").to_numpy())
+    hashes[~numeric] = pd.util.hash_array(keys[~numeric].to_numpy(dtype=object))
+    return hashes
+
+
+class AudienceSketch:
+    """Mergeable MinHash + HyperLogLog sketch of one account's audience.
+
+    ``minhash`` holds the minimum hash per bin (one-permutation MinHash),
+    ``hll`` the HyperLogLog registers; both merge element-wise, so ids can
+    be added in any number of batches. 24 KB per account at the defaults,
+    whatever the size of the audience.
+    """
+
+    def __init__(self, minhash: np.ndarray = None, hll: np.ndarray = None, ids_added: int = 0):
+        self.minhash = minhash if minhash is not None else np.full(MINHASH_BINS, _EMPTY, dtype=np.uint64)
+        self.hll = hll if hll is not None else np.zeros(2 ** HLL_PRECISION, dtype=np.uint8)
+        self.ids_added = ids_added
+
+    def add_hashes(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        bins = len(self.minhash)
+        bin_bits = np.uint64(bins.bit_length() - 1)
+        np.minimum.at(self.minhash, (hashes & np.uint64(bins - 1)).astype(np.intp), hashes >> bin_bits)
+
+        p = int(np.log2(len(self.hll)))
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # position of the leftmost 1-bit in the remaining 64 - p bits
+        bit_length = np.frexp(rest.astype("float64"))[1]
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.hll, index, rank)
+        self.ids_added += len(hashes)
+
+    def add_ids(self, ids):
+        ids = pd.Series(ids)
+        for start in range(0, len(ids), ID_BATCH):
+            self.add_hashes(hash_ids(ids.iloc[start:start + ID_BATCH]))
+
+    def merge(self, other: "AudienceSketch") -> "AudienceSketch":
+        return AudienceSketch(np.minimum(self.minhash, other.minhash), np.maximum(self.hll, other.hll),
+                              self.ids_added + other.ids_added)
+
+    def cardinality(self) -> float:
+        return hll_cardinality(self.hll)
+
+
+def hll_cardinality(registers: np.ndarray) -> float:
+    """HyperLogLog estimate, with linear counting for small cardinalities."""
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype("int64")), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+    return float(estimate) if estimate.ndim == 0 else estimate
+
+
+def jaccard_matrix(minhashes: np.ndarray) -> np.ndarray:
+    """Pairwise Jaccard estimates for stacked MinHash signatures (accounts x bins).
+
+    Bins empty in both sketches are ignored; with fewer ids than bins the
+    estimate gets coarser.
+    """
+    filled = minhashes != _EMPTY
+    matrix = np.empty((len(minhashes), len(minhashes)))
+    # one row at a time keeps memory at accounts x bins
+    for i, row in enumerate(minhashes):
+        equal = (minhashes == row) & filled & filled[i]
+        either = filled | filled[i]
+        with np.errstate(invalid="ignore"):
+            matrix[i] = equal.sum(axis=1) / either.sum(axis=1)
+    return matrix
+
+
+class SketchStore:
+    """Audience sketches persisted per account (one ``.npz`` file each).
+
+    Files are the source of truth: a cached sketch is served only while its
+    file is unchanged, so ids added by another process (the API server, a
+    dashboard session) show up on the next read.
+    """
+
+    def __init__(self, root: str = SKETCH_PATH):
+        self.root = root
+        self._lock = threading.Lock()
+        # username -> (file mtime in ns, sketch)
+        self._cache = {}
+
+    @property
+    def version(self) -> int:
+        """Digest of every sketch file's name and mtime; changes whenever any
+        process updates a sketch, so memoized results can depend on it."""
+        stamps = []
+        for path in sorted(glob.glob(os.path.join(self.root, "*.npz"))):
+            try:
+                stamps.append(f"{os.path.basename(path)}@{os.stat(path).st_mtime_ns}")
+            except FileNotFoundError:
+                continue
+        return zlib.crc32(",".join(stamps).encode())
+
+    def _path(self, username: str) -> str:
+        return os.path.join(self.root, f"{username.lower()}.npz")
+
+    def usernames(self) -> list:
+        return sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join(self.root, "*.npz")))
+
+    def get(self, username: str):
+        """The stored sketch of ``username`` or ``None``."""
+        with self._lock:
+            return self._load(username.lower())
+
+    def _load(self, username: str):
+        path = self._path(username)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._cache.pop(username, None)
+            return None
+        cached = self._cache.get(username)
+        if cached is None or cached[0] != mtime:
+            with np.load(path) as data:
+                sketch = AudienceSketch(data["minhash"], data["hll"], int(data["ids_added"]))
+            cached = self._cache[username] = (mtime, sketch)
+        return cached[1]
+
+    def _save(self, username: str, sketch: AudienceSketch):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(username)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp.npz"
+        np.savez(tmp, minhash=sketch.minhash, hll=sketch.hll, ids_added=sketch.ids_added)
+        os.replace(tmp, path)
+        self._cache[username.lower()] = (os.stat(path).st_mtime_ns, sketch)
+
+    def add_ids(self, username: str, ids, replace: bool = False) -> AudienceSketch:
+        """Fold follower/engager ids into the account's sketch (or start over with ``replace``)."""
+        sketch = AudienceSketch()
+        sketch.add_ids(ids)
+        return self._merge(username, sketch, replace)
+
+    def add_file(self, username: str, path_or_buffer, column: str = None, replace: bool = False) -> AudienceSketch:
+        """Fold ids from a CSV/text file (one id per line, or an id column) or
+        a Parquet file, read in batches of :data:`ID_BATCH`."""
+        sketch = AudienceSketch()
+        name = getattr(path_or_buffer, "name", path_or_buffer)
+        if str(name).endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(path_or_buffer)
+            column = column or next((c for c in ID_COLUMNS if c in parquet.schema.names), parquet.schema.names[0])
+            for batch in parquet.iter_batches(batch_size=ID_BATCH, columns=[column]):
+                sketch.add_hashes(hash_ids(batch.column(0).to_pandas()))
+        else:
+            chunks = pd.read_csv(path_or_buffer, chunksize=ID_BATCH, dtype=str, header=None)
+            header = None
+            for chunk in chunks:
+                if header is None:
+                    # a first row naming a known id column is a header, anything else is data
+                    first = [str(v).strip().lower() for v in chunk.iloc[0]]
+                    wanted = column.lower() if column else next((c for c in ID_COLUMNS if c in first), None)
+                    header = first if wanted in first else []
+                    position = first.index(wanted) if header else 0
+                    chunk = chunk.iloc[1:] if header else chunk
+                sketch.add_hashes(hash_ids(chunk.iloc[:, position].dropna()))
+        return self._merge(username, sketch, replace)
+
+    def _merge(self, username: str, sketch: AudienceSketch, replace: bool) -> AudienceSketch:
+        # read, merge and write under one lock so concurrent adds are not lost
+        with self._lock:
+            current = None if replace else self._load(username.lower())
+            merged = sketch if current is None else current.merge(sketch)
+            self._save(username, merged)
+        return merged
+
+    def overlap(self, usernames) -> dict:
+        """Audience size per account, pairwise Jaccard and union reach.
+
+        Accounts without a sketch are listed in ``missing`` and left out.
+        """
+        names, sketches, missing = [], [], []
+        for username in dict.fromkeys(u.lower() for u in usernames):
+            sketch = self.get(username)
+            if sketch is None:
+                missing.append(username)
+            else:
+                names.append(username)
+                sketches.append(sketch)
+        if not sketches:
+            return {"usernames": [], "audience": [], "jaccard": np.empty((0, 0)), "union_reach": 0.0,
+                    "missing": missing}
+
+        registers = np.stack([s.hll for s in sketches])
+        return {
+            "usernames": names,
+            "audience": hll_cardinality(registers),
+            "jaccard": jaccard_matrix(np.stack([s.minhash for s in sketches])),
+            # HyperLogLog union: register-wise max over every account
+            "union_reach": hll_cardinality(registers.max(axis=0)),
+            "missing": missing,
+        }
+
+    def overlap_frame(self, usernames) -> tuple:
+        """:meth:`overlap` as a labelled Jaccard frame plus the union reach."""
+        result = self.overlap(usernames)
+        names = result["usernames"]
+        return pd.DataFrame(result["jaccard"], index=names, columns=names), result["union_reach"]
+
+
+_sketches = None
+_sketches_lock = threading.Lock()
+
+
+def get_sketches() -> SketchStore:
+    """Process-wide sketch store shared by the API server and the dashboards."""
+    global _sketches
+    with _sketches_lock:
+        if _sketches is None:
+            _sketches = SketchStore()
+        return _sketches
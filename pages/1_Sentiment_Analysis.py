@@ -1,19 +1,19 @@
 import streamlit as st
-import pandas as pd
-from textblob import TextBlob
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import plotly.express as px
 
+from pipeline import get_pipeline, indexes_stage
+from wordclouds import render_png
+
 st.set_page_config(page_title="Sentiment & Caption Analysis", layout="wide")
 st.title("🧠 Sentiment & Caption Analysis")
 st.write("Analyze emotional tone and keyword patterns in your Instagram captions.")
 
-if 'df' not in st.session_state:
+pipeline = get_pipeline(st.session_state)
+if "features" not in pipeline:
     st.error("No data found. Run Analyze on the main page first.")
     st.stop()
 
-df = st.session_state['df'].copy()
+df = pipeline.value("features")
 if df.empty:
     st.error("Loaded dataframe is empty.")
     st.stop()
@@ -22,9 +22,21 @@ if 'caption' not in df.columns:
     st.error("No 'caption' column found.")
     st.stop()
 
+
+def sentiment_stage(df):
+    # scored once at ingest by the caption feature stage
+    return df[["username", "caption", "likes", "sentiment", "sentiment_label",
+               "word_count", "hashtag_count", "mention_count", "emoji_count"]]
+
+
+def wordcloud_stage(indexes):
+    # token counts of this run's posts; the PNG is cached by frequency digest
+    freqs = indexes["words"].frequencies()
+    return render_png(freqs, width=1000, height=500, background_color="white", colormap="coolwarm")
+
+
 # Sentiment calculation
-df["sentiment"] = df["caption"].astype(str).apply(lambda x: TextBlob(x).sentiment.polarity)
-df["sentiment_label"] = df["sentiment"].apply(lambda x: "Positive" if x > 0.05 else ("Negative" if x < -0.05 else "Neutral"))
+df = pipeline.run("sentiment", sentiment_stage, deps=("features",))
 
 col1, col2 = st.columns([1.2, 1])
 with col1:
@@ -37,14 +49,18 @@ with col2:
     fig2 = px.bar(avg_sentiment, x="sentiment_label", y="likes", title="Average Likes per Sentiment")
     st.plotly_chart(fig2, use_container_width=True)
 
+# Caption shape per account
+st.subheader("✍️ Caption Style")
+style = df.groupby("username")[["word_count", "hashtag_count", "mention_count", "emoji_count"]].mean().reset_index()
+fig3 = px.bar(style.melt(id_vars="username", var_name="feature", value_name="per_post"), x="username", y="per_post",
+              color="feature", barmode="group", title="Average Words, Hashtags, Mentions and Emoji per Caption")
+st.plotly_chart(fig3, use_container_width=True)
+
 # Wordcloud
 st.subheader("💬 Common Words in Captions")
-text = " ".join(df["caption"].dropna().astype(str))
-if text.strip():
-    wc = WordCloud(width=1000, height=500, background_color="white", colormap="coolwarm").generate(text)
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.imshow(wc, interpolation='bilinear')
-    ax.axis("off")
-    st.pyplot(fig)
+pipeline.run("indexes", indexes_stage, deps=("features", "normalize"))
+png = pipeline.run("sentiment_wordcloud", wordcloud_stage, deps=("indexes",))
+if png is not None:
+    st.image(png)
 else:
     st.info("No caption text available for word cloud.")
@@ -1,43 +1,42 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import re
+
+from hashtags import get_index
+from pipeline import get_pipeline
 
 st.set_page_config(page_title="Hashtag Insights", layout="wide")
 st.title("🏷️ Hashtag & Keyword Insights")
 st.write("Find which hashtags bring the most engagement.")
 
-if 'df' not in st.session_state:
+pipeline = get_pipeline(st.session_state)
+if "features" not in pipeline or "normalize" not in pipeline:
     st.error("No data found. Run Analyze on the main page first.")
     st.stop()
 
-df = st.session_state['df'].copy()
+df = pipeline.value("features")
 if 'caption' not in df.columns:
     st.error("No 'caption' column found.")
     st.stop()
 
-# Extract hashtags (lowercased)
-df["hashtags"] = df["caption"].astype(str).apply(lambda x: re.findall(r"#(\w+)", x.lower()))
-tags = df.explode("hashtags").dropna(subset=["hashtags"])
+# Served from the hashtag index filled at ingest, over each analyzed
+# account's newest posts (all stored posts when reading from the store)
+request = st.session_state.get("analyze", {})
+window = None if request.get("use_store", True) else request["limit"]
+usernames = pipeline.value("normalize")[1]["username"].tolist()
+index = get_index()
+tag_stats = index.top(50, by="avg_likes", usernames=usernames, limit=window)
 
-if tags.empty:
+if tag_stats.empty:
     st.info("No hashtags found.")
     st.stop()
 
-tag_stats = tags.groupby("hashtags").agg(
-    posts=("username", "count"),
-    avg_likes=("likes", "mean"),
-    avg_eng=("eng_score", "mean")
-).reset_index().sort_values(by="avg_likes", ascending=False)
-
 top_n = st.slider("Top N Hashtags", 5, 30, 10)
 st.subheader("🔥 Top Hashtags by Avg Likes")
-fig1 = px.bar(tag_stats.head(top_n), x="hashtags", y="avg_likes", color="avg_likes", text_auto=".0f")
+fig1 = px.bar(tag_stats.head(top_n), x="hashtag", y="avg_likes", color="avg_likes", text_auto=".0f")
 st.plotly_chart(fig1, use_container_width=True)
 
 st.subheader("📊 Hashtag Frequency")
-freq = tags["hashtags"].value_counts().head(30).reset_index()
-freq.columns = ["Hashtag", "Count"]
+freq = index.frequency(30, usernames=usernames, limit=window).rename_axis("Hashtag").reset_index(name="Count")
 fig2 = px.treemap(freq, path=["Hashtag"], values="Count", title="Most Frequently Used Hashtags")
 st.plotly_chart(fig2, use_container_width=True)
 
@@ -2,28 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from overlap import get_sketches
+from pipeline import get_pipeline
+from summaries import get_summaries
+
 st.set_page_config(page_title="Influencer Comparison", layout="wide")
 st.title("🤝 Influencer / Brand Comparison")
-st.write("Compare engagement, growth, and consistency across multiple accounts.")
+st.write("Compare engagement, its typical range (median / 90th percentile) and consistency across multiple accounts.")
 
-if 'df' not in st.session_state or 'df_f' not in st.session_state:
+pipeline = get_pipeline(st.session_state)
+if "features" not in pipeline or "normalize" not in pipeline:
     st.error("No data found. Run Analyze on the main page first.")
     st.stop()
 
-df = st.session_state['df'].copy()
-df_f = st.session_state['df_f'].copy()
 
-# Build metrics per account from posts
-metrics = df.groupby("username").agg(
-    avg_likes=("likes", "mean"),
-    avg_comments=("comments", "mean"),
-    avg_eng_score=("eng_score", "mean"),
-    posts=("username", "count")
-).reset_index()
+def metrics_stage(frames, window):
+    # Read the analyzed accounts from the summary table filled at ingest,
+    # over each account's newest `window` posts (all stored posts without one)
+    metrics = get_summaries().table(frames[1]["username"], limit=window)
+    metrics = metrics[metrics["posts"] > 0].reset_index(drop=True)
+    metrics["followers"] = pd.to_numeric(metrics["followers"], errors="coerce").fillna(0).astype(int)
+    return metrics
+
 
-# Merge followers
-metrics = metrics.merge(df_f, on="username", how="left")
-metrics["followers"] = pd.to_numeric(metrics["followers"], errors="coerce").fillna(0).astype(int)
+request = st.session_state.get("analyze", {})
+window = None if request.get("use_store", True) else request["limit"]
+metrics = pipeline.run("comparison_metrics", metrics_stage, window, deps=("normalize",))
 
 # Select accounts to compare
 accounts = metrics["username"].tolist()
@@ -47,5 +51,39 @@ fig_scatter = px.scatter(cmp, x="followers", y="avg_eng_score", size="posts", co
                          hover_data=["avg_likes", "avg_comments"], title="Followers vs Avg Engagement")
 st.plotly_chart(fig_scatter, use_container_width=True)
 
+# Typical vs strong posts, and how steady each account is
+spread = cmp.melt(id_vars="username", value_vars=["p50_eng_score", "avg_eng_score", "p90_eng_score"],
+                  var_name="statistic", value_name="eng_score")
+fig_spread = px.bar(spread, x="username", y="eng_score", color="statistic", barmode="group",
+                    title="Engagement Score: Median, Mean and 90th Percentile")
+st.plotly_chart(fig_spread, use_container_width=True)
+
+fig_cv = px.bar(cmp, x="username", y="cv_eng_score", color="username",
+                labels={"cv_eng_score": "Coefficient of variation"},
+                title="Consistency (lower = steadier engagement)")
+st.plotly_chart(fig_cv, use_container_width=True)
+
 st.subheader("Comparison Table")
 st.dataframe(cmp.reset_index(drop=True))
+
+# Audience overlap from follower / engager id sketches
+st.subheader("Audience Overlap")
+sketches = get_sketches()
+with st.expander("Upload audience ids"):
+    st.caption("One id or username per line, or a CSV/Parquet file with an id column. "
+               "Lists of any size are reduced to a small sketch per account.")
+    target = st.selectbox("Account", selected)
+    upload = st.file_uploader("Follower or engager ids", type=["csv", "txt", "parquet"])
+    replace = st.checkbox("Replace the existing sketch", value=False)
+    if upload is not None and st.button("Add ids"):
+        sketch = sketches.add_file(target, upload, replace=replace)
+        st.success(f"{target}: ~{sketch.cardinality():,.0f} unique ids")
+
+jaccard, union_reach = sketches.overlap_frame(selected)
+if len(jaccard) < 2:
+    st.info("Add audience ids for at least two of the selected accounts to compare audiences.")
+else:
+    st.write(f"👥 Combined unique reach: **{union_reach:,.0f}**")
+    fig_overlap = px.imshow(jaccard * 100, text_auto=".1f", color_continuous_scale="Blues",
+                            labels={"color": "Overlap %"}, title="Pairwise Audience Overlap (Jaccard %)")
+    st.plotly_chart(fig_overlap, use_container_width=True)
@@ -2,65 +2,69 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_absolute_error
-from io import BytesIO
-import requests
+
+from export import FORMATS, export_bytes
+from fetcher import fetch_posts_sync
+from ingest import ingest_posts
+from normalize import normalize_posts
+from registry import get_registry
 
 st.set_page_config(page_title="📈 Engagement Forecast", layout="wide")
 st.markdown('<div style="font-size:28px;font-weight:800;background:linear-gradient(90deg,#ff6ec4,#7873f5);-webkit-background-clip:text;-webkit-text-fill-color:transparent">📈 Engagement Forecast & Trend Prediction</div>', unsafe_allow_html=True)
 
+SOURCES = {"RapidAPI": "rapidapi", "Instaloader (public profiles)": "instaloader"}
+source = SOURCES[st.radio("Data source", list(SOURCES), horizontal=True)]
+
 API_KEY = st.secrets.get("RAPIDAPI_KEY")
-if not API_KEY:
+if source == "rapidapi" and not API_KEY:
     st.error("RAPIDAPI_KEY not found. Add to .streamlit/secrets.toml")
     st.stop()
 
-headers = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "instagram-scraper-20251.p.rapidapi.com"
-}
-
 username = st.text_input("Enter an Instagram username for forecasting", "nike")
 limit = st.number_input("Number of posts to analyze", 10, 50, 20)
 
 if st.button("🔮 Forecast Engagement"):
     with st.spinner("Fetching posts and building model..."):
-        url = f"https://instagram-scraper-20251.p.rapidapi.com/userposts/?username_or_id={username}&count={limit}"
+        # served from the shared response cache when Analyze already fetched this account
         try:
-            response = requests.get(url, headers=headers, timeout=15)
-            data = response.json()
+            if source == "instaloader":
+                from analyzer import fetch_account
+
+                account = fetch_account(username, limit)
+                if account["error"]:
+                    raise RuntimeError(account["error"])
+                posts = account["posts"]
+            else:
+                posts = fetch_posts_sync(API_KEY, username, limit)
         except Exception as e:
             st.error(f"Error fetching data: {e}")
             st.stop()
 
-        posts = data.get("data", {}).get("items", []) or []
         if not posts:
             st.error("No posts found for this account.")
             st.stop()
 
-        df = pd.DataFrame([{
-            "taken_at": p.get("taken_at"),
-            "likes": int(p.get("like_count", 0) or 0),
-            "views": int(p.get("view_count") or p.get("play_count") or p.get("video_view_count") or 0)
-        } for p in posts])
+        posts = normalize_posts(posts, username)
+        # new posts also go into the account's stored models
+        ingest_posts(posts, limit)
+        df = posts[["username", "taken_at", "likes", "views", "eng_score"]]
 
         df["taken_at"] = pd.to_datetime(df["taken_at"], unit="s", errors="coerce")
-        df = df.sort_values("taken_at").reset_index(drop=True)
-        df["eng_score"] = (df["likes"] / df["views"].replace(0, np.nan)).fillna(0)
+        df = df.dropna(subset=["taken_at"]).sort_values("taken_at").reset_index(drop=True)
+        df["eng_score"] = df["eng_score"].fillna(0)
         df["post_index"] = np.arange(len(df))
 
         if len(df) < 3:
             st.info("Not enough posts to build a reliable forecast (need at least 3).")
             st.stop()
 
-        X = df[["post_index"]].values
-        y = df["eng_score"].values
-        model = LinearRegression().fit(X, y)
-        df["predicted"] = model.predict(X)
+        # stored trend over the account's newest posts, as many as were fetched
+        fit = get_registry().forecast([username], horizon=5, limit=len(df))[0]
+        df["predicted"] = fit["intercept"] + fit["slope"] * df["post_index"]
 
         # Future 5 posts prediction
         future_idx = np.arange(len(df), len(df) + 5)
-        future_preds = model.predict(future_idx.reshape(-1, 1))
+        future_preds = fit["predictions"]
         last_date = df["taken_at"].max()
         future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=5, freq="D")
         df_future = pd.DataFrame({"post_index": future_idx, "predicted": future_preds, "taken_at": future_dates})
@@ -73,15 +77,15 @@ if st.button("🔮 Forecast Engagement"):
         st.plotly_chart(fig, use_container_width=True)
 
         # Metrics
-        r2 = r2_score(y, df["predicted"])
-        mae = mean_absolute_error(y, df["predicted"])
-        st.metric("Model R² Score", f"{r2:.3f}")
-        st.metric("Mean Absolute Error", f"{mae:.3f}")
+        st.metric("Model R² Score", f"{fit['r2']:.3f}")
+        st.metric("Mean Absolute Error", f"{fit['mae']:.3f}")
 
         # Download
-        out = BytesIO()
-        with pd.ExcelWriter(out, engine="openpyxl") as writer:
-            df.to_excel(writer, sheet_name="historical", index=False)
-            df_future.to_excel(writer, sheet_name="forecast", index=False)
-        st.download_button("⬇ Download Forecast Data", data=out.getvalue(), file_name=f"{username}_forecast.xlsx")
+        # generated only when clicked; Excel holds both sheets, Parquet/CSV the history
+        sheets = {"historical": df, "forecast": df_future}
+        for fmt, col in zip(FORMATS, st.columns(len(FORMATS))):
+            col.download_button(f"⬇ Download Forecast Data ({fmt.upper()})",
+                                data=lambda fmt=fmt: export_bytes(sheets, fmt),
+                                file_name=f"{username}_forecast.{fmt}", mime=FORMATS[fmt],
+                                on_click="ignore")
         st.success("Forecast completed.")
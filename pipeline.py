@@ -0,0 +1,166 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from captions import caption_features
+from fetcher import fetch_accounts_sync
+from hashtags import get_index
+from histograms import get_histograms
+from ingest import ingest_followers, ingest_posts
+from normalize import normalize_accounts
+from overlap import get_sketches
+from registry import get_registry
+from store import get_store, sync_accounts_sync
+from wordclouds import WordFrequencyIndex
+
+
+class Pipeline:
+    """Memoized stages kept in a mapping that outlives reruns (``st.session_state``).
+
+    A stage is recomputed only when its arguments or the version of one of
+    its upstream stages changed; otherwise the stored value is returned. The
+    dashboard and every page share the same entries, so switching pages or
+    touching a widget never rebuilds the dataset. Stage functions must not
+    mutate their inputs.
+    """
+
+    def __init__(self, state, key: str = "pipeline"):
+        if key not in state:
+            state[key] = {}
+        self._stages = state[key]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._stages
+
+    def value(self, name: str):
+        return self._stages[name]["value"]
+
+    def version(self, name: str) -> str:
+        return self._stages[name]["version"]
+
+    def run(self, name: str, fn, *args, deps=()):
+        """``fn(*upstream values, *args)``, memoized on ``args`` and upstream versions."""
+        key = (args, tuple(self.version(dep) for dep in deps))
+        entry = self._stages.get(name)
+        if entry is not None and entry["key"] == key:
+            return entry["value"]
+        value = fn(*(self.value(dep) for dep in deps), *args)
+        self._stages[name] = {"key": key, "value": value, "version": uuid.uuid4().hex}
+        return value
+
+
+def get_pipeline(state) -> Pipeline:
+    return Pipeline(state)
+
+
+# -------------------------------
+# Stages
+# -------------------------------
+def fetch_stage(api_key, names, limit, use_store, run, source="rapidapi") -> dict:
+    """Raw data for ``names``; ``run`` changes on every Analyze click to force a refresh.
+
+    ``source`` is ``"rapidapi"`` or ``"instaloader"`` (the loader pool in ``analyzer``).
+    """
+    if source == "instaloader":
+        import analyzer
+    if use_store:
+        # delta sync: only posts newer than what the store already holds are fetched
+        if source == "instaloader":
+            synced = analyzer.sync_accounts(get_store(), list(names), limit)
+        else:
+            synced = sync_accounts_sync(api_key, list(names), limit)
+        errors = [(r["username"], r["error"]) for r in synced if r["error"]]
+        return {"frames": None if errors else get_store().load_frames(list(names)), "errors": errors}
+    # fetch every account concurrently over one pooled client (or loader pool)
+    if source == "instaloader":
+        accounts = analyzer.fetch_accounts(list(names), limit)
+    else:
+        accounts = fetch_accounts_sync(api_key, list(names), limit)
+    errors = [(a["username"], a["error"]) for a in accounts if a["error"]]
+    return {"accounts": accounts, "errors": errors}
+
+
+def normalize_stage(fetched: dict) -> tuple:
+    """``(posts, followers)`` frames, ingested into the persisted models and indexes."""
+    if fetched.get("frames") is not None:
+        frames = fetched["frames"]
+    else:
+        # one vectorized pass over every account's raw posts
+        frames = normalize_accounts(fetched["accounts"])
+    ingest_posts(frames[0])
+    ingest_followers(frames[1])
+    return frames
+
+
+def features_stage(frames: tuple) -> pd.DataFrame:
+    df = frames[0].copy()
+    df["caption"] = df["caption"].fillna("")
+    # every caption feature (hashtags, mentions, tokens, first-line length,
+    # emoji, sentiment) in one pass; tabs and pages read these columns
+    df = df.join(caption_features(df["caption"]))
+
+    df["taken_at"] = pd.to_datetime(df["taken_at"], unit="s", errors="coerce")
+    df["hour"] = df["taken_at"].dt.hour
+    df["weekday"] = df["taken_at"].dt.day_name()
+    df["hook_score"] = df["eng_score"] * (df["first_line_len"] / max(df["first_line_len"].max(), 1))
+    return df
+
+
+def indexes_stage(df: pd.DataFrame, frames: tuple) -> dict:
+    """Caption-word index over the posts of this run, shared by the
+    dashboard tabs and pages."""
+    words = WordFrequencyIndex()
+    words.add_posts(df)
+    return {"words": words}
+
+
+def aggregates_stage(df: pd.DataFrame, frames: tuple, window: int = None, sketch_version: int = 0) -> dict:
+    """Dashboard aggregates; pass ``get_sketches().version`` so audience
+    overlap is recomputed when sketches change. Posting times and hashtags
+    come from the histograms and the hashtag index filled at ingest, over
+    each account's newest ``window`` posts (all stored posts without one)."""
+    df_f = frames[1]
+    usernames = df_f["username"].tolist()
+    posting = get_histograms().histogram(usernames, limit=window)
+
+    # Competitor overlap: mean pairwise Jaccard of the audience sketches
+    # (None until at least two of the accounts have one)
+    jaccard, union_reach = get_sketches().overlap_frame(df_f["username"])
+    overlap = None
+    if len(jaccard) >= 2:
+        pairs = jaccard.to_numpy()[np.triu_indices(len(jaccard), k=1)]
+        overlap = float(np.nanmean(pairs) * 100)
+
+    # Heatmap grid (mean eng_score per weekday x hour)
+    pivot = posting.to_frame("eng").dropna(how="all").dropna(axis=1, how="all")
+    pivot.index.name = "weekday"
+
+    avg_eng_per_user = df.groupby("username")["eng_score"].mean().reset_index()
+    comparison = df_f.merge(avg_eng_per_user.rename(columns={"eng_score": "avg_eng_score"}), on="username", how="left")
+    comparison["avg_eng_score"] = comparison["avg_eng_score"].fillna(0)
+
+    return {
+        "avg_eng": round(df["eng_score"].replace([np.inf, -np.inf], np.nan).dropna().mean() or 0, 4),
+        "total_followers": int(df_f["followers"].dropna().sum() or 0),
+        # best hour by mean likes, from the weekday x hour histogram
+        "best_hour": posting.best_hour("likes") or 0,
+        "overlap": overlap,
+        "overlap_matrix": jaccard,
+        "union_reach": union_reach,
+        "pivot": pivot,
+        "avg_eng_per_user": avg_eng_per_user,
+        "hook": df.groupby("username")["hook_score"].mean().reset_index(),
+        "top_hashtags": get_index().frequency(15, usernames=usernames, limit=window),
+        "comparison": comparison,
+    }
+
+
+def models_stage(frames: tuple, window: int = None) -> dict:
+    """Stored likes-from-views virality model pooled over the accounts of this
+    run and their newest ``window`` posts each (all stored posts without one),
+    or ``None`` without enough view data."""
+    virality = get_registry().model("virality", usernames=frames[1]["username"].tolist(), limit=window)
+    if virality is None or virality.n <= 2:
+        virality = None
+    return {"virality": virality}
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from normalize import POST_COLUMNS, normalize_posts
+
+# Fixed-width fields, each held in one contiguous array
+NUMERIC_DTYPES = {
+    "likes": "int64",
+    "views": "int64",
+    "comments": "int64",
+    "eng_score": "float64",
+    "taken_at": "int64",
+}
+# Variable-width fields, held as Arrow string chunks
+STRING_COLUMNS = ["id", "caption"]
+
+# ``taken_at`` has no NaN; missing timestamps are stored as this sentinel
+MISSING_TIME = np.iinfo("int64").min
+INITIAL_CAPACITY = 4096
+
+
+def _arrow_strings(values):
+    import pyarrow as pa
+
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return values.cast(pa.large_string())
+    return pa.array(values, type=pa.large_string(), from_pandas=True)
+
+
+class PostTable:
+    """Append-only columnar container of normalized posts.
+
+    Numeric fields live in contiguous NumPy arrays that grow geometrically,
+    so appending a chunk copies only that chunk. Usernames are
+    dictionary-encoded as ``int32`` codes, and ids and captions are kept as
+    Arrow strings (one UTF-8 buffer per chunk, no Python objects). A post
+    costs 44 bytes plus its raw text, against ~500 bytes as a dict of
+    Python objects.
+
+    :meth:`column` and :meth:`to_pandas` return views of the arrays, not
+    copies; a view taken before a later append keeps showing the old rows.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._n = 0
+        self._numeric = {name: np.empty(capacity, dtype) for name, dtype in NUMERIC_DTYPES.items()}
+        self._codes = np.empty(capacity, "int32")
+        self._names = []
+        self._name_codes = {}
+        self._strings = {name: [] for name in STRING_COLUMNS}
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def usernames(self) -> list:
+        """The username dictionary; ``codes`` index into it."""
+        return list(self._names)
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._n]
+
+    @property
+    def nbytes(self) -> int:
+        used = sum(a[:self._n].nbytes for a in self._numeric.values()) + self.codes.nbytes
+        return used + sum(chunk.nbytes for chunks in self._strings.values() for chunk in chunks)
+
+    def _reserve(self, extra: int):
+        needed = self._n + extra
+        capacity = len(self._codes)
+        if needed <= capacity:
+            return
+        # an empty table has nothing to double
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self._numeric.items():
+            grown = np.empty(capacity, array.dtype)
+            grown[:self._n] = array[:self._n]
+            self._numeric[name] = grown
+        grown = np.empty(capacity, "int32")
+        grown[:self._n] = self._codes[:self._n]
+        self._codes = grown
+
+    def _encode(self, usernames) -> np.ndarray:
+        if isinstance(usernames, pd.Series):
+            local, uniques = pd.factorize(usernames.astype("object").str.lower(), use_na_sentinel=False)
+        else:
+            import pyarrow.compute as pc
+            encoded = pc.dictionary_encode(pc.utf8_lower(usernames)).combine_chunks()
+            local, uniques = encoded.indices.to_numpy(zero_copy_only=False), encoded.dictionary.to_pylist()
+        mapping = np.empty(len(uniques), "int32")
+        for i, name in enumerate(uniques):
+            code = self._name_codes.get(name)
+            if code is None:
+                code = self._name_codes[name] = len(self._names)
+                self._names.append(name)
+            mapping[i] = code
+        return mapping[local]
+
+    # -------------------------------
+    # Appending
+    # -------------------------------
+    def append(self, posts) -> int:
+        """Append a chunk of normalized posts (a post frame or an Arrow table
+        with :data:`normalize.POST_COLUMNS`); returns the number added."""
+        n = len(posts)
+        if n == 0:
+            return 0
+        self._reserve(n)
+        start, end = self._n, self._n + n
+
+        is_arrow = not isinstance(posts, pd.DataFrame)
+        for name, array in self._numeric.items():
+            column = posts[name]
+            if is_arrow:
+                import pyarrow.compute as pc
+                fill = MISSING_TIME if name == "taken_at" else (np.nan if name == "eng_score" else 0)
+                column = pc.fill_null(column, fill).to_numpy()
+            elif name == "taken_at":
+                column = column.to_numpy(dtype="int64", na_value=MISSING_TIME)
+            else:
+                column = column.to_numpy(dtype=array.dtype, na_value=np.nan if name == "eng_score" else 0)
+            array[start:end] = column
+
+        self._codes[start:end] = self._encode(posts["username"])
+        for name in STRING_COLUMNS:
+            strings = _arrow_strings(posts[name])
+            self._strings[name].extend(strings.chunks if hasattr(strings, "chunks") else [strings])
+        self._n = end
+        return n
+
+    def append_items(self, items, username, followers=None) -> int:
+        """Append raw ``/userposts/`` items (see :func:`normalize.normalize_posts`)."""
+        return self.append(normalize_posts(items, username, followers))
+
+    # -------------------------------
+    # Views
+    # -------------------------------
+    def column(self, name: str) -> np.ndarray:
+        """View of a numeric column (``username`` gives the codes)."""
+        if name == "username":
+            return self.codes
+        return self._numeric[name][:self._n]
+
+    def strings(self, name: str):
+        """Arrow ``ChunkedArray`` of a string column."""
+        import pyarrow as pa
+        return pa.chunked_array(self._strings[name], type=pa.large_string())
+
+    def to_pandas(self, columns=None) -> pd.DataFrame:
+        """A post frame over the table's buffers.
+
+        Numeric columns are views; ``username`` is a ``Categorical`` over the
+        dictionary, ``taken_at`` a nullable ``Int64`` and ids/captions Arrow
+        strings sharing the stored buffers.
+        """
+        data = {}
+        for name in columns or POST_COLUMNS:
+            if name == "username":
+                data[name] = pd.Categorical.from_codes(self.codes, categories=pd.Index(self._names, dtype="object"))
+            elif name == "taken_at":
+                values = self.column(name)
+                data[name] = pd.arrays.IntegerArray(values, values == MISSING_TIME)
+            elif name in STRING_COLUMNS:
+                data[name] = pd.arrays.ArrowStringArray(self.strings(name))
+            else:
+                data[name] = self.column(name)
+        return pd.DataFrame(data, copy=False)
+
+    # -------------------------------
+    # Aggregates on the contiguous arrays
+    # -------------------------------
+    def mask(self, usernames) -> np.ndarray:
+        """Boolean row mask for ``usernames``."""
+        wanted = [self._name_codes[u.lower()] for u in usernames if u.lower() in self._name_codes]
+        return np.isin(self.codes, np.asarray(wanted, dtype="int32"))
+
+    def count(self, by_user: bool = False):
+        if not by_user:
+            return self._n
+        return pd.Series(np.bincount(self.codes, minlength=len(self._names)), index=self._names, name="posts")
+
+    def sum(self, field: str, by_user: bool = False):
+        values = self.column(field)
+        finite = ~np.isnan(values) if values.dtype.kind == "f" else slice(None)
+        if not by_user:
+            return values[finite].sum()
+        sums = np.bincount(self.codes[finite], weights=values[finite], minlength=len(self._names))
+        return pd.Series(sums, index=self._names, name=field)
+
+    def mean(self, field: str, by_user: bool = False):
+        """Mean of ``field`` ignoring NaN (per username with ``by_user``)."""
+        values = self.column(field)
+        finite = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(self._n, bool)
+        if not by_user:
+            return float(values[finite].mean()) if finite.any() else float("nan")
+        counts = np.bincount(self.codes[finite], minlength=len(self._names))
+        sums = np.bincount(self.codes[finite], weights=values[finite], minlength=len(self._names))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(sums / counts, index=self._names, name=field)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PostTable":
+        table = cls(max(INITIAL_CAPACITY, len(df)))
+        table.append(df)
+        return table
@@ -0,0 +1,332 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from config import get_setting
+from forecast import HORIZON, N, TrendForecaster, solve
+from normalize import post_keys
+
+REGISTRY_PATH = get_setting("INSTA_MODELS_PATH", os.path.join(".insta_cache", "models.sqlite"))
+
+
+class LinearModel:
+    """A fitted ``y = intercept + slope * x`` (likes from views, or eng_score
+    from the post index) with its fit quality and data stamp."""
+
+    def __init__(self, key: str, slope: float, intercept: float, r2: float, n: int,
+                 data_version: str, updated_at: float = None):
+        self.key = key
+        self.slope = slope
+        self.intercept = intercept
+        self.r2 = r2
+        self.n = n
+        self.data_version = data_version
+        self.updated_at = updated_at
+
+    def predict(self, x):
+        """Prediction for a scalar or an array of ``x``."""
+        return self.intercept + self.slope * np.asarray(x, dtype="float64")
+
+    def to_dict(self) -> dict:
+        return {"key": self.key, "slope": self.slope, "intercept": self.intercept, "r2": self.r2,
+                "posts": self.n, "data_version": self.data_version, "updated_at": self.updated_at}
+
+
+def virality_terms(df: pd.DataFrame) -> np.ndarray:
+    """Per-post terms ``[1, x, y, xy, x², y²]`` of views (x) and likes (y);
+    zeros for posts without views. Summed they give the model's statistics."""
+    views = pd.to_numeric(df["views"], errors="coerce").astype("float64").to_numpy()
+    likes = pd.to_numeric(df["likes"], errors="coerce").astype("float64").to_numpy()
+    usable = (views > 0) & ~np.isnan(likes)
+    x, y = np.where(usable, views, 0), np.where(usable, likes, 0)
+    return np.column_stack([usable, x, y, x * y, x * x, y * y]).astype("float64")
+
+
+def _fit(key: str, stats: np.ndarray, data_version: str, updated_at: float = None):
+    if stats[N] == 0:
+        return None
+    slope, intercept, r2 = solve(stats[None, :])
+    return LinearModel(key, float(slope[0]), float(intercept[0]), float(r2[0]), int(stats[N]),
+                       data_version, updated_at)
+
+
+class ModelRegistry:
+    """Disk-backed registry of per-account models, pooled per cohort: virality
+    (likes ~ views) and the engagement trend (eng_score ~ post index).
+
+    Every ingested post is stored once (by id) with the values the models
+    need. In memory an account keeps its posts sorted by time with running
+    sums of ``[n, Σx, Σy, Σxy, Σx², Σy²]`` (see :mod:`forecast`), so a model over
+    all posts or over the newest ``limit`` is a subtraction and a closed-form
+    solve, and a cohort model sums its members' statistics. Posts newer than
+    an account's latest extend the sums; older ones (a larger fetch) re-sort
+    that account. Each account carries a data version bumped by every update
+    from any process; stale accounts are re-read from disk, and fitted models
+    are cached until a member's version changes.
+    """
+
+    KINDS = ("virality", "trend")
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                username TEXT PRIMARY KEY,
+                fetched_limit INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                username TEXT NOT NULL,
+                post TEXT NOT NULL,
+                taken_at REAL,
+                views REAL,
+                likes REAL,
+                eng_score REAL,
+                PRIMARY KEY (username, post)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cohorts (
+                name TEXT PRIMARY KEY,
+                members TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # username -> {"fetched_limit", "version", "updated_at", "keys", "times", "terms", "sums"}
+        self._accounts = {}
+        self._trend = TrendForecaster()
+        self._cohorts = {name: json.loads(members) for name, members in self._conn.execute("SELECT * FROM cohorts")}
+        self._fitted = {}
+
+    def _select(self, sql: str, usernames) -> list:
+        rows = []
+        for i in range(0, len(usernames), 500):
+            chunk = usernames[i:i + 500]
+            rows.extend(self._conn.execute(sql.format(marks=",".join("?" * len(chunk))), chunk))
+        return rows
+
+    def _account(self, username: str) -> dict:
+        return self._accounts.setdefault(username, {
+            "fetched_limit": 0, "version": 0, "updated_at": None,
+            "keys": set(), "times": np.empty(0), "terms": np.empty((0, 6)), "sums": np.zeros((1, 6))})
+
+    def _refresh(self, usernames):
+        """Bring the in-memory posts of ``usernames`` up to their stored version."""
+        names = sorted(set(usernames))
+        for username, fetched_limit, version, updated_at in self._select(
+                "SELECT * FROM accounts WHERE username IN ({marks})", names):
+            account = self._account(username)
+            account["fetched_limit"], account["updated_at"] = fetched_limit, updated_at
+            if account["version"] == version:
+                continue
+            stored = pd.DataFrame(self._select(
+                "SELECT username, post, taken_at, views, likes, eng_score FROM posts WHERE username IN ({marks})",
+                [username]), columns=["username", "_key", "taken_at", "views", "likes", "eng_score"])
+            self._absorb(account, stored[~stored["_key"].isin(account["keys"])])
+            account["version"] = version
+
+    def _absorb(self, account: dict, posts: pd.DataFrame):
+        """Add posts (``_key``, ``taken_at``, ``views``, ``likes``, ``eng_score``) to an account's sums."""
+        if posts.empty:
+            return
+        # posts without a timestamp count as the oldest
+        times = np.nan_to_num(posts["taken_at"].astype("float64").to_numpy(), nan=-np.inf)
+        terms = virality_terms(posts)
+        order = np.argsort(times, kind="stable")
+        times, terms = times[order], terms[order]
+        if len(account["times"]) and times[0] < account["times"][-1]:
+            times = np.concatenate([account["times"], times])
+            terms = np.concatenate([account["terms"], terms])
+            order = np.argsort(times, kind="stable")
+            times, terms = times[order], terms[order]
+            sums = np.vstack([np.zeros((1, 6)), np.cumsum(terms, axis=0)])
+        else:
+            sums = np.vstack([account["sums"], account["sums"][-1] + np.cumsum(terms, axis=0)])
+            times = np.concatenate([account["times"], times])
+            terms = np.concatenate([account["terms"], terms])
+        account["keys"].update(posts["_key"].tolist())
+        account["times"], account["terms"], account["sums"] = times, terms, sums
+        self._trend.update(posts.assign(id=posts["_key"]))
+
+    # -------------------------------
+    # Ingest
+    # -------------------------------
+    def update(self, df: pd.DataFrame, limit: int = None) -> int:
+        """Store posts not seen before (a post frame) and fold them into their accounts' models.
+
+        ``limit`` records how many posts the fetch asked for, see
+        :meth:`fetched_limit`. Returns the number of posts added.
+        """
+        if df.empty:
+            return 0
+        posts = df.assign(_key=post_keys(df), username=df["username"].astype(str).str.lower()) \
+            .drop_duplicates(["username", "_key"])
+        for column in ("taken_at", "views", "likes", "eng_score"):
+            posts[column] = pd.to_numeric(posts[column], errors="coerce").astype("float64")
+        now = time.time()
+        added = 0
+        with self._lock:
+            self._refresh(posts["username"].unique().tolist())
+            for username, group in posts.groupby("username"):
+                account = self._account(username)
+                fresh = group[~group["_key"].isin(account["keys"])]
+                if fresh.empty and (limit or 0) <= account["fetched_limit"]:
+                    continue
+                values = fresh[["username", "_key", "taken_at", "views", "likes", "eng_score"]]
+                self._conn.executemany("INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?)",
+                                       values.astype(object).where(values.notna(), None).itertuples(index=False))
+                bump = int(not fresh.empty)
+                self._conn.execute("""
+                    INSERT INTO accounts VALUES (?, ?, ?, ?) ON CONFLICT (username) DO UPDATE SET
+                        fetched_limit = max(fetched_limit, excluded.fetched_limit),
+                        version = version + excluded.version, updated_at = excluded.updated_at
+                """, (username, limit or 0, bump, now))
+                (version,) = self._conn.execute("SELECT version FROM accounts WHERE username = ?",
+                                                (username,)).fetchone()
+                self._absorb(account, fresh)
+                account["fetched_limit"] = max(account["fetched_limit"], limit or 0)
+                account["updated_at"] = now
+                # a version that moved further means another process wrote too:
+                # left stale, the next refresh reads its posts
+                if version == account["version"] + bump:
+                    account["version"] = version
+                added += len(fresh)
+            self._conn.commit()
+        return added
+
+    def fetched_limit(self, username: str) -> int:
+        """Largest post ``limit`` fetched for the account so far (0 if never)."""
+        with self._lock:
+            self._refresh([username.lower()])
+            account = self._accounts.get(username.lower())
+            return account["fetched_limit"] if account else 0
+
+    # -------------------------------
+    # Cohorts
+    # -------------------------------
+    def set_cohort(self, name: str, usernames):
+        """Define (or redefine) a named group of accounts sharing a pooled model."""
+        members = sorted({u.lower() for u in usernames})
+        with self._lock:
+            self._cohorts[name] = members
+            self._conn.execute("INSERT OR REPLACE INTO cohorts VALUES (?, ?)", (name, json.dumps(members)))
+            self._conn.commit()
+        return members
+
+    def cohorts(self) -> dict:
+        with self._lock:
+            return {name: list(members) for name, members in self._cohorts.items()}
+
+    # -------------------------------
+    # Lookup
+    # -------------------------------
+    def __contains__(self, username: str) -> bool:
+        with self._lock:
+            self._refresh([username.lower()])
+            return username.lower() in self._accounts
+
+    def posts(self, username: str) -> int:
+        """Number of posts stored for the account."""
+        with self._lock:
+            self._refresh([username.lower()])
+            account = self._accounts.get(username.lower())
+            return len(account["times"]) if account else 0
+
+    def _stats(self, kind: str, usernames, limit: int = None) -> np.ndarray:
+        if kind == "trend":
+            return self._trend.stats(usernames, limit).sum(axis=0)
+        total = np.zeros(6)
+        for username in usernames:
+            sums = self._accounts[username]["sums"]
+            start = max(len(sums) - 1 - limit, 0) if limit is not None else 0
+            total += sums[-1] - sums[start]
+        return total
+
+    def model(self, kind: str = "virality", username: str = None, usernames=None, cohort: str = None,
+              limit: int = None):
+        """The stored ``kind`` model of one account, of a cohort or pooled over ``usernames``.
+
+        ``virality`` predicts likes from views, ``trend`` eng_score from the
+        post index (0 = oldest). ``limit`` fits each account's newest
+        ``limit`` posts only. Returns ``None`` when there is no
+        data to fit; a cohort name that was never defined raises ``KeyError``.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown model kind: {kind!r}")
+        with self._lock:
+            if cohort is not None:
+                members, key = self._cohorts[cohort], f"cohort:{cohort}"
+            elif username is not None:
+                members, key = [username.lower()], f"account:{username.lower()}"
+            else:
+                members = sorted({u.lower() for u in usernames})
+                key = "accounts:" + ",".join(members)
+            key = f"{kind}:{key}" if limit is None else f"{kind}:{key}@{limit}"
+            self._refresh(members)
+            accounts = [(u, self._accounts[u]) for u in members if u in self._accounts]
+            versions = ",".join(f"{u}@{a['version']}" for u, a in accounts)
+            # accounts report their version count, groups a digest of their members' versions
+            stamp = str(accounts[0][1]["version"]) if username is not None and accounts else \
+                f"{zlib.crc32(versions.encode()):08x}"
+
+            cached = self._fitted.get(key)
+            if cached is not None and cached.data_version == stamp:
+                return cached
+            stats = self._stats(kind, [u for u, _ in accounts], limit)
+            updated_at = max((a["updated_at"] for _, a in accounts), default=None)
+            fitted = _fit(key, stats, stamp, updated_at)
+            if fitted is not None:
+                self._fitted[key] = fitted
+            return fitted
+
+    def forecast(self, usernames, horizon: int = HORIZON, limit: int = None) -> list:
+        """Trend forecasts of ``usernames`` over their newest ``limit`` stored
+        posts, see :meth:`forecast.TrendForecaster.forecast`."""
+        with self._lock:
+            self._refresh([u.lower() for u in usernames])
+        return self._trend.forecast(usernames, horizon, limit)
+
+    def describe(self, usernames=None) -> list:
+        """Per-account models with their data versions."""
+        with self._lock:
+            if usernames is None:
+                names = [u for (u,) in self._conn.execute("SELECT username FROM accounts ORDER BY username")]
+            else:
+                names = [u.lower() for u in usernames]
+        out = []
+        for username in names:
+            entry = {"username": username, "fetched_limit": self.fetched_limit(username),
+                     "posts": self.posts(username)}
+            for kind in self.KINDS:
+                model = self.model(kind, username)
+                entry[kind] = model.to_dict() if model is not None else None
+            out.append(entry)
+        return out
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide model registry shared by the API server and the dashboards."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
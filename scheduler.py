@@ -0,0 +1,147 @@
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+
+from config import get_setting
+
+# Request priorities: lower values are served first
+INTERACTIVE = 0
+BATCH = 10
+
+# Requests per second allowed by the RapidAPI plan, and the burst size
+RATE = float(get_setting("RAPIDAPI_RPS", 5))
+BURST = float(get_setting("RAPIDAPI_BURST", RATE))
+
+# How often queued (non-head) waiters re-check their place in line
+POLL_INTERVAL = 0.02
+
+
+class _LeaderCancelled(Exception):
+    """Handed to coalesced waiters when the caller running their request is cancelled."""
+
+
+class RequestScheduler:
+    """Quota-aware gate in front of the upstream API.
+
+    * a token bucket limits the dispatch rate to ``rate`` requests/second;
+    * waiters are served by priority (then arrival order) when tokens run out;
+    * concurrent calls with the same key are coalesced, so one upstream
+      request answers every waiter (singleflight).
+
+    State is guarded by a thread lock and results are handed over through
+    ``concurrent.futures.Future``, so a single scheduler can be shared by
+    Streamlit sessions running their own event loops in separate threads.
+    """
+
+    def __init__(self, rate: float = RATE, burst: float = BURST):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.dispatched = 0
+        self.coalesced = 0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        """Wait for a token; higher-priority waiters go first."""
+        ticket = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+
+        acquired = False
+        try:
+            while True:
+                with self._lock:
+                    self._refill()
+                    is_head = self._waiters[0] == ticket
+                    if is_head and self._tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        self.dispatched += 1
+                        acquired = True
+                        return
+                    wait = (1 - self._tokens) / self.rate if is_head else POLL_INTERVAL
+                await asyncio.sleep(wait)
+        finally:
+            if not acquired:
+                with self._lock:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+
+    async def submit(self, key, factory, priority: int = INTERACTIVE):
+        """Run ``factory()`` once per ``key`` among concurrent callers.
+
+        If the caller running the request is cancelled, the callers waiting
+        on it retry and one of them runs the request instead.
+        """
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                return await self._lead(key, future, factory, priority)
+            try:
+                # shielded: a waiter going away must not cancel the shared result
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue
+
+    async def _lead(self, key, future, factory, priority):
+        try:
+            await self.acquire(priority)
+            result = await factory()
+        except asyncio.CancelledError:
+            self._release(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def _release(self, key):
+        # before waking the waiters, so a retrying one starts a new request
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dispatched": self.dispatched,
+                "coalesced": self.coalesced,
+                "queued": len(self._waiters),
+                "in_flight": len(self._inflight),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Process-wide scheduler for the RapidAPI host."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
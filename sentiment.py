@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import get_setting
+
+SENTIMENT_PATH = get_setting("INSTA_SENTIMENT_PATH", os.path.join(".insta_cache", "sentiment.sqlite"))
+MAX_WORKERS = int(get_setting("SENTIMENT_WORKERS", os.cpu_count() or 1))
+
+# Captions per task sent to a worker process, and the number of uncached
+# captions below which scoring inline beats the cost of the pool
+BATCH_SIZE = 256
+PARALLEL_THRESHOLD = 512
+
+# Polarity cut-offs used for the Positive / Neutral / Negative labels
+POSITIVE = 0.05
+NEGATIVE = -0.05
+
+
+def caption_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _score_batch(texts) -> list:
+    from textblob import TextBlob
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+def sentiment_labels(polarity) -> np.ndarray:
+    polarity = np.asarray(polarity, dtype="float64")
+    return np.select([polarity > POSITIVE, polarity < NEGATIVE], ["Positive", "Negative"], "Neutral")
+
+
+class SentimentEngine:
+    """Batch caption scorer memoized by caption hash.
+
+    Scores live in SQLite so they survive reruns and restarts and are shared
+    between the dashboards and the API; only captions never seen before are
+    scored, across a process pool when there are many of them.
+    """
+
+    def __init__(self, path: str = SENTIMENT_PATH, max_workers: int = MAX_WORKERS):
+        self.path = path
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS polarity (hash TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self._conn.commit()
+
+    def _lookup(self, hashes) -> dict:
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT hash, score FROM polarity WHERE hash IN ({marks})", chunk
+                ).fetchall())
+        return found
+
+    def _compute(self, texts) -> list:
+        if len(texts) < PARALLEL_THRESHOLD or self.max_workers <= 1:
+            return _score_batch(texts)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        batches = [texts[i:i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+        return [score for batch in self._pool.map(_score_batch, batches) for score in batch]
+
+    def score(self, captions) -> np.ndarray:
+        """Polarity in [-1, 1] for every caption, in input order."""
+        captions = ["" if c is None else str(c) for c in captions]
+        hashes = [caption_hash(c) if c.strip() else None for c in captions]
+        by_hash = {h: c for h, c in zip(hashes, captions) if h}
+        scores = self._lookup(list(by_hash))
+
+        missing = [h for h in by_hash if h not in scores]
+        if missing:
+            computed = self._compute([by_hash[h] for h in missing])
+            rows = list(zip(missing, computed))
+            with self._lock:
+                self._conn.executemany("INSERT OR REPLACE INTO polarity VALUES (?, ?)", rows)
+                self._conn.commit()
+            scores.update(rows)
+
+        return np.array([scores[h] if h else 0.0 for h in hashes], dtype="float64")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SentimentEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SentimentEngine()
+        return _engine
@@ -0,0 +1,225 @@
+import asyncio
+import glob
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from config import get_setting
+from fetcher import MAX_CONCURRENCY, aiter_posts, fetch_user_info, make_client
+from ingest import ingest_followers, ingest_posts
+from normalize import FOLLOWER_DTYPES, POST_COLUMNS, enforce_schema, eng_scores, post_keys
+from scheduler import INTERACTIVE
+
+STORE_PATH = get_setting("INSTA_STORE_PATH", ".insta_store")
+
+# Number of part files per account before they are merged into one
+COMPACT_AFTER = 16
+
+FOLLOWER_COLUMNS = ["username", "followers", "fetched_at"]
+
+
+class PostStore:
+    """Local Parquet store of normalized posts and follower snapshots.
+
+    Layout (one directory per account, one Parquet file per sync)::
+
+        <root>/posts/username=<name>/part-<ts>-<id>.parquet
+        <root>/followers/username=<name>/part-<ts>-<id>.parquet
+    """
+
+    def __init__(self, root: str = STORE_PATH):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _dir(self, kind: str, username: str) -> str:
+        return os.path.join(self.root, kind, f"username={username.lower()}")
+
+    def _parts(self, kind: str, username: str) -> list:
+        return sorted(glob.glob(os.path.join(self._dir(kind, username), "part-*.parquet")))
+
+    def _write(self, kind: str, username: str, df: pd.DataFrame):
+        path = self._dir(kind, username)
+        os.makedirs(path, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = os.path.join(path, f".{name}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(path, name))
+
+    def _read(self, kind: str, usernames, columns=None) -> pd.DataFrame:
+        frames = []
+        for username in usernames:
+            for part in self._parts(kind, username):
+                frames.append(pd.read_parquet(part, columns=columns))
+        if not frames:
+            return pd.DataFrame(columns=columns or (POST_COLUMNS if kind == "posts" else FOLLOWER_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+    def usernames(self) -> list:
+        dirs = glob.glob(os.path.join(self.root, "posts", "username=*"))
+        return sorted(os.path.basename(d).split("=", 1)[1] for d in dirs)
+
+    # -------------------------------
+    # Posts
+    # -------------------------------
+    def latest_taken_at(self, username: str):
+        """Newest stored ``taken_at`` (unix seconds) or ``None``."""
+        taken = self._read("posts", [username], columns=["taken_at"])["taken_at"].dropna()
+        return int(taken.max()) if not taken.empty else None
+
+    def append_posts(self, username: str, posts) -> int:
+        """Store posts not seen before (by ``id``) and ingest them; returns the number added.
+
+        Posts without an id cannot be told apart from each other and are skipped.
+        """
+        df = pd.DataFrame(posts, columns=POST_COLUMNS)
+        df = df[df["id"].notna() & (df["id"].astype(str).str.strip() != "")]
+        if df.empty:
+            return 0
+        df["username"] = username.lower()
+        df = enforce_schema(df)
+        keys = pd.Series(post_keys(df), index=df.index)
+        with self._lock:
+            known = set(self._read("posts", [username], columns=["id"])["id"].dropna().astype(str))
+            df = df[~keys.isin(known) & ~keys.duplicated()]
+            if df.empty:
+                return 0
+            self._write("posts", username, df)
+            if len(self._parts("posts", username)) > COMPACT_AFTER:
+                self._compact("posts", username)
+        # scored with the latest follower count, as load_frames reads them back
+        followers = self.load_followers([username])["followers"].astype("float64")
+        followers = np.full(len(df), followers.iloc[0] if len(followers) else np.nan)
+        ingest_posts(df.assign(eng_score=eng_scores(df["likes"], df["views"], followers)))
+        return len(df)
+
+    def load_posts(self, usernames=None) -> pd.DataFrame:
+        """All stored posts for ``usernames`` (default: every account), newest first."""
+        usernames = [u.lower() for u in usernames] if usernames else self.usernames()
+        df = enforce_schema(self._read("posts", usernames))
+        return df.sort_values(["username", "taken_at"], ascending=[True, False]).reset_index(drop=True)
+
+    # -------------------------------
+    # Follower snapshots
+    # -------------------------------
+    def append_followers(self, username: str, followers, fetched_at: float = None):
+        df = pd.DataFrame([{
+            "username": username.lower(),
+            "followers": followers,
+            "fetched_at": fetched_at or time.time(),
+        }], columns=FOLLOWER_COLUMNS)
+        with self._lock:
+            self._write("followers", username, df)
+            if len(self._parts("followers", username)) > COMPACT_AFTER:
+                self._compact("followers", username)
+        ingest_followers(df)
+
+    def load_followers(self, usernames=None, history: bool = False) -> pd.DataFrame:
+        """Latest follower count per account, or every snapshot with ``history``."""
+        usernames = [u.lower() for u in usernames] if usernames else self.usernames()
+        df = self._read("followers", usernames).sort_values("fetched_at")
+        if not history:
+            df = df.drop_duplicates("username", keep="last")
+        return df.reset_index(drop=True)
+
+    def load_frames(self, usernames=None) -> tuple:
+        """``(posts, followers)`` frames shaped like :func:`normalize.normalize_accounts`.
+
+        ``eng_score`` is recomputed with the latest follower counts so posts
+        without views get the same follower fallback as a live fetch.
+        """
+        df = self.load_posts(usernames)
+        df_f = self.load_followers(usernames)[["username", "followers"]].astype(FOLLOWER_DTYPES)
+        followers = df["username"].map(df_f.set_index("username")["followers"])
+        df["eng_score"] = eng_scores(df["likes"], df["views"], followers.astype("float64"))
+        return df, df_f
+
+    def load_table(self, usernames=None) -> tuple:
+        """``(posts, followers)`` like :meth:`load_frames`, with posts as a
+        :class:`posts.PostTable` read straight from the Parquet parts.
+
+        Ids and captions stay Arrow strings and numeric columns are copied
+        once into the table's arrays, so no per-post Python objects are made.
+        """
+        import pyarrow.parquet as pq
+        from posts import PostTable
+
+        usernames = [u.lower() for u in usernames] if usernames else self.usernames()
+        table = PostTable()
+        for username in usernames:
+            for part in self._parts("posts", username):
+                table.append(pq.read_table(part, columns=POST_COLUMNS))
+
+        df_f = self.load_followers(usernames)[["username", "followers"]].astype(FOLLOWER_DTYPES)
+        followers = df_f.set_index("username")["followers"].astype("float64").reindex(table.usernames)
+        table.column("eng_score")[:] = eng_scores(table.column("likes"), table.column("views"),
+                                                  followers.to_numpy()[table.codes])
+        return table, df_f
+
+    def _compact(self, kind: str, username: str):
+        parts = self._parts(kind, username)
+        merged = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+        self._write(kind, username, merged)
+        for part in parts:
+            os.remove(part)
+
+
+# -------------------------------
+# Delta sync
+# -------------------------------
+async def sync_account(store: PostStore, client, username: str, limit: int,
+                       priority: int = INTERACTIVE) -> dict:
+    """Fetch only posts newer than the newest stored one.
+
+    Accounts not yet in the store get their first ``limit`` posts.
+    """
+    result = {"username": username, "new_posts": 0, "followers": None, "error": None}
+    latest = store.latest_taken_at(username)
+    try:
+        user_info = await fetch_user_info(client, username, use_cache=False, priority=priority)
+        posts = [p async for p in aiter_posts(client, username, page_size=min(limit, 50),
+                                              max_posts=None if latest else limit,
+                                              since=latest, priority=priority)]
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    followers = user_info.get("follower_count", None)
+    if followers is not None:
+        store.append_followers(username, int(followers))
+    result["followers"] = followers
+    result["new_posts"] = store.append_posts(username, posts)
+    return result
+
+
+async def sync_accounts(store: PostStore, client, usernames, limit: int,
+                        priority: int = INTERACTIVE) -> list:
+    return await asyncio.gather(*(
+        sync_account(store, client, name, limit, priority) for name in usernames
+    ))
+
+
+def sync_accounts_sync(api_key, usernames, limit: int, store: PostStore = None) -> list:
+    """Blocking delta sync for callers without an event loop (Streamlit)."""
+    store = store or get_store()
+
+    async def run():
+        async with make_client(api_key, MAX_CONCURRENCY) as client:
+            return await sync_accounts(store, client, usernames, limit)
+
+    return asyncio.run(run())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PostStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PostStore()
+        return _store
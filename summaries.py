@@ -0,0 +1,253 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from normalize import post_keys
+
+# Per-post fields summarized for every account
+FIELDS = ["likes", "comments", "eng_score"]
+QUANTILES = {"p50": 0.5, "p90": 0.9}
+SUMMARY_COLUMNS = ["username", "posts", "followers"] + [
+    f"{stat}_{field}" for field in FIELDS for stat in ("avg", "std", "cv", *QUANTILES)
+]
+
+# t-digest size: at most ~compression / 2 centroids per digest
+DIGEST_COMPRESSION = 100
+
+
+def _compress(means: np.ndarray, weights: np.ndarray, compression: float) -> tuple:
+    # sort, then merge neighbours that fall into the same unit of the k1 scale
+    # (narrow at the tails, wide around the median); one bincount per pass
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    q = (np.cumsum(weights) - weights / 2) / weights.sum()
+    k = compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+    bins = np.floor(k - k[0]).astype("int64")
+    w = np.bincount(bins, weights=weights)
+    m = np.bincount(bins, weights=weights * means)
+    keep = w > 0
+    return m[keep] / w[keep], w[keep]
+
+
+class TDigest:
+    """Merging t-digest: approximate quantiles from a few dozen centroids.
+
+    Values are folded in batch by batch; accuracy is best at the tails,
+    where centroids are kept small.
+    """
+
+    def __init__(self, compression: float = DIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.means, self.weights = _compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))]),
+            self.compression,
+        )
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        merged = TDigest(self.compression)
+        merged.min, merged.max = min(self.min, other.min), max(self.max, other.max)
+        if self.count or other.count:
+            merged.means, merged.weights = _compress(
+                np.concatenate([self.means, other.means]),
+                np.concatenate([self.weights, other.weights]),
+                self.compression,
+            )
+        return merged
+
+    def quantile(self, q: float) -> float:
+        if not len(self.means):
+            return float("nan")
+        total = self.weights.sum()
+        # interpolate between centroid midpoints, anchored at min and max
+        mids = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.concatenate([[0], mids, [total]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+
+class AccountSummaries:
+    """Materialized per-account summary table, updated as posts are ingested.
+
+    Each account keeps, per field, the count, mean and sum of squared
+    deviations (merged batch by batch, Chan et al.) and a :class:`TDigest`.
+    Posts already seen are skipped. Only the rows of accounts touched since
+    the last query are rebuilt, so comparing accounts is a table lookup.
+    The field values are also kept sorted by time, so a row over an
+    account's newest ``limit`` posts is computed exactly from those alone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._moments = {}
+        self._digests = {}
+        # username -> (times, values (posts x fields)), sorted by time
+        self._posts = {}
+        self._followers = {}
+        self._rows = {}
+        self._dirty = set()
+        self._table = None
+
+    def add_posts(self, df: pd.DataFrame) -> int:
+        """Fold posts not seen before into their accounts; returns the number added."""
+        if df.empty:
+            return 0
+        keys = post_keys(df)
+        with self._lock:
+            seen = np.fromiter((key in self._seen for key in keys), dtype=bool, count=len(keys))
+            new = ~seen & ~pd.Series(keys, dtype="object").duplicated().values
+            if not new.any():
+                return 0
+            self._seen.update(keys[new])
+
+            posts = pd.DataFrame({"username": df.loc[new, "username"].astype(str).str.lower().to_numpy(dtype=object)})
+            for field in FIELDS:
+                posts[field] = pd.to_numeric(df.loc[new, field], errors="coerce").astype("float64") \
+                    .replace([np.inf, -np.inf], np.nan).to_numpy()
+            values = np.column_stack([posts[field].to_numpy() for field in FIELDS])
+            # posts without a timestamp count as the oldest
+            times = pd.to_numeric(df["taken_at"], errors="coerce").to_numpy(dtype="float64", na_value=-np.inf)[new]
+
+            grouped = posts.groupby("username")
+            n, mean, var = grouped[FIELDS].count(), grouped[FIELDS].mean(), grouped[FIELDS].var(ddof=0)
+            # (accounts x fields x [count, mean, M2]) for this batch
+            n = n.to_numpy(dtype="float64")
+            batches = np.stack([n, np.nan_to_num(mean.to_numpy()), np.nan_to_num(var.to_numpy()) * n], axis=2)
+            for i, username in enumerate(mean.index):
+                rows = grouped.indices[username]
+                # this batch's moments, merged into the running ones
+                batch = batches[i]
+                moments = self._moments.get(username)
+                if moments is None:
+                    self._moments[username] = batch
+                    self._digests[username] = {field: TDigest() for field in FIELDS}
+                else:
+                    na, ma, m2a = moments.T
+                    nb, mb, m2b = batch.T
+                    total = na + nb
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        delta = mb - ma
+                        mean_ab = np.where(total > 0, ma + delta * nb / total, 0.0)
+                        m2_ab = np.where(total > 0, m2a + m2b + delta ** 2 * na * nb / total, 0.0)
+                    self._moments[username] = np.stack([total, mean_ab, m2_ab], axis=1)
+                for j, field in enumerate(FIELDS):
+                    self._digests[username][field].add(values[rows, j])
+                self._hold(username, times[rows], values[rows])
+                self._dirty.add(username)
+            self._table = None
+        return int(new.sum())
+
+    def _hold(self, username: str, times: np.ndarray, values: np.ndarray):
+        held = self._posts.get(username)
+        if held is not None:
+            times, values = np.concatenate([held[0], times]), np.concatenate([held[1], values])
+        order = np.argsort(times, kind="stable")
+        self._posts[username] = (times[order], values[order])
+
+    def add_followers(self, df_f: pd.DataFrame):
+        """Latest follower counts (a followers frame), shown next to the summaries."""
+        with self._lock:
+            for username, followers in zip(df_f["username"].str.lower(), df_f["followers"]):
+                if pd.notna(followers):
+                    self._followers[username] = int(followers)
+                    self._dirty.add(username)
+            self._table = None
+
+    def _row(self, username: str, limit: int = None) -> dict:
+        row = {"username": username, "followers": self._followers.get(username)}
+        moments = self._moments.get(username)
+        if moments is None:
+            row["posts"] = 0
+            return row
+        values = self._posts[username][1]
+        if limit is not None and limit < len(values):
+            # a window of the newest posts: exact moments and quantiles of their values
+            values = values[-limit:]
+            finite = ~np.isnan(values)
+            count = finite.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.nansum(values, axis=0) / count
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            moments = np.stack([count, mean, m2], axis=1)
+            quantiles = [{name: float(np.quantile(values[finite[:, i], i], q)) if count[i] else float("nan")
+                          for name, q in QUANTILES.items()} for i in range(len(FIELDS))]
+        else:
+            quantiles = [{name: self._digests[username][field].quantile(q) for name, q in QUANTILES.items()}
+                         for field in FIELDS]
+        row["posts"] = int(moments[:, 0].max())
+        for (count, mean, m2), field, field_quantiles in zip(moments, FIELDS, quantiles):
+            std = float(np.sqrt(m2 / count)) if count else float("nan")
+            row[f"avg_{field}"] = float(mean) if count else float("nan")
+            row[f"std_{field}"] = std
+            # coefficient of variation: lower means steadier
+            row[f"cv_{field}"] = std / mean if count and mean else float("nan")
+            for name, value in field_quantiles.items():
+                row[f"{name}_{field}"] = value
+        return row
+
+    def posts(self, username: str) -> int:
+        """Number of posts summarized for the account."""
+        with self._lock:
+            held = self._posts.get(username.lower())
+            return len(held[0]) if held is not None else 0
+
+    def table(self, usernames=None, limit: int = None) -> pd.DataFrame:
+        """One row per account (default: all); unknown accounts get ``posts == 0``.
+
+        With ``limit``, accounts holding more posts than that are summarized
+        over their newest ``limit`` posts (exact quantiles); the others read
+        their materialized row.
+        """
+        with self._lock:
+            for username in self._dirty:
+                self._rows[username] = self._row(username)
+            self._dirty.clear()
+            if self._table is None:
+                self._table = pd.DataFrame(list(self._rows.values()), columns=SUMMARY_COLUMNS).set_index("username", drop=False)
+            table = self._table
+            names = [u.lower() for u in usernames] if usernames is not None else list(table.index)
+            windows = [self._row(u, limit) for u in names
+                       if limit is not None and u in self._posts and limit < len(self._posts[u][0])]
+        if windows:
+            rows = pd.DataFrame(windows, columns=SUMMARY_COLUMNS).set_index("username", drop=False)
+            table = pd.concat([table.drop(index=rows.index), rows])
+        if usernames is None:
+            return table.reset_index(drop=True)
+        out = table.reindex(names)
+        out["username"] = names
+        out["posts"] = out["posts"].fillna(0).astype(int)
+        return out.reset_index(drop=True)
+
+    def __contains__(self, username: str) -> bool:
+        with self._lock:
+            return username.lower() in self._moments
+
+
+_summaries = None
+_summaries_lock = threading.Lock()
+
+
+def get_summaries() -> AccountSummaries:
+    """Process-wide summary table, filled by :mod:`ingest`."""
+    global _summaries
+    with _summaries_lock:
+        if _summaries is None:
+            _summaries = AccountSummaries()
+        return _summaries
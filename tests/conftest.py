@@ -0,0 +1,131 @@
+import os
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# caches, stores and registries opened with their default paths go to a
+# scratch directory instead of the working tree
+SCRATCH = tempfile.mkdtemp(prefix="insta-tests-")
+for name, leaf in (("INSTA_CACHE_PATH", "responses.sqlite"), ("INSTA_JOBS_PATH", "jobs.sqlite"),
+                   ("INSTA_MODELS_PATH", "models.sqlite"), ("INSTA_SENTIMENT_PATH", "sentiment.sqlite"),
+                   ("INSTA_SKETCH_PATH", "sketches"), ("INSTA_STORE_PATH", "store"),
+                   ("INSTA_WORDCLOUD_PATH", "wordclouds")):
+    os.environ[name] = os.path.join(SCRATCH, leaf)
+
+NOW = 1_700_000_000
+# posts are about this many seconds apart, so hours and months vary
+STEP = 7 * 3600
+
+
+# -------------------------------
+# Post frames
+# -------------------------------
+def posts_frame(n, username="acct", seed=0, start=0) -> pd.DataFrame:
+    """``n`` normalized posts of one account, newest first: ``{username}-{k}``
+    is the k-th newest, and likes grow with views (about 5%)."""
+    rng = np.random.default_rng(seed)
+    k = np.arange(start, start + n)
+    views = rng.integers(1000, 100_000, n).astype("float64")
+    return pd.DataFrame({
+        "id": [f"{username}-{i}" for i in k],
+        "username": username,
+        "caption": [f"post {i} #tag{i % 5}" for i in k],
+        "taken_at": NOW - STEP * k - rng.integers(0, STEP, n),
+        "likes": np.round(0.05 * views + rng.normal(0, 50, n)).clip(0),
+        "comments": rng.integers(0, 50, n).astype("float64"),
+        "views": views,
+        "eng_score": rng.normal(0.05, 0.01, n) - 0.0005 * k,
+    })
+
+
+@pytest.fixture
+def make_posts():
+    return posts_frame
+
+
+# -------------------------------
+# API server against a stubbed upstream
+# -------------------------------
+class Upstream:
+    """Stand-in for the RapidAPI server: :attr:`POSTS` posts per account
+    (newest first, built like :func:`posts_frame`) and 1000 followers."""
+
+    POSTS = 200
+    FOLLOWERS = 1000
+
+    def __init__(self):
+        self.calls = []
+
+    def items(self, username):
+        df = posts_frame(self.POSTS, username, seed=zlib.crc32(username.encode()))
+        return [{"id": row.id, "taken_at": int(row.taken_at), "like_count": int(row.likes),
+                 "comment_count": int(row.comments), "view_count": int(row.views),
+                 "caption": {"text": row.caption}} for row in df.itertuples()]
+
+    def frame(self, username, limit=None) -> pd.DataFrame:
+        """The account's newest ``limit`` posts as the API normalizes them."""
+        from normalize import normalize_posts
+
+        return normalize_posts(self.items(username)[:limit], username, self.FOLLOWERS)
+
+    def __call__(self, request):
+        import httpx
+
+        params = request.url.params
+        self.calls.append((request.url.path, params["username_or_id"]))
+        if request.url.path == "/userinfo/":
+            return httpx.Response(200, json={"data": {"follower_count": self.FOLLOWERS}})
+        start, count = int(params.get("pagination_token", 0)), int(params["count"])
+        items = self.items(params["username_or_id"])
+        token = str(start + count) if start + count < len(items) else None
+        return httpx.Response(200, json={"data": {"items": items[start:start + count]},
+                                         "pagination_token": token})
+
+
+@pytest.fixture
+def upstream():
+    return Upstream()
+
+
+@pytest.fixture
+def api(upstream, tmp_path, monkeypatch):
+    """``TestClient`` of the API server with fresh caches and stores, fetching from :class:`Upstream`."""
+    import httpx
+    from fastapi.testclient import TestClient
+
+    import cache
+    import fastapi_app
+    import fetcher
+    import hashtags
+    import histograms
+    import ingest
+    import registry
+    import scheduler
+    import store
+    import summaries
+
+    make_client = fetcher.make_client
+
+    def stub_client(api_key, max_connections=fetcher.MAX_CONCURRENCY):
+        client = make_client(api_key, max_connections)
+        client._transport = httpx.MockTransport(upstream)
+        return client
+
+    monkeypatch.setattr(fetcher, "make_client", stub_client)
+    monkeypatch.setattr(scheduler, "_scheduler", scheduler.RequestScheduler(rate=1000, burst=1000))
+    monkeypatch.setattr(cache, "_cache", cache.ResponseCache(str(tmp_path / "responses.sqlite")))
+    monkeypatch.setattr(registry, "_registry", registry.ModelRegistry(str(tmp_path / "models.sqlite")))
+    monkeypatch.setattr(store, "_store", store.PostStore(str(tmp_path / "store")))
+    monkeypatch.setattr(hashtags, "_index", hashtags.HashtagIndex())
+    monkeypatch.setattr(histograms, "_histograms", histograms.HistogramIndex())
+    monkeypatch.setattr(summaries, "_summaries", summaries.AccountSummaries())
+    monkeypatch.setattr(ingest, "_loaded", set())
+    with TestClient(fastapi_app.app) as client:
+        yield client
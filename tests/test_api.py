@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+
+def test_forecast_fits_the_newest_limit_posts(api, upstream):
+    # the second request reads a window of the posts stored by the first
+    for limit in (40, 20):
+        body = api.get("/forecast", params={"username": "alpha", "limit": limit}).json()
+        series = upstream.frame("alpha", limit)["eng_score"].to_numpy()[::-1]
+        slope, intercept = np.polyfit(np.arange(limit), series, 1)
+        assert np.isclose(body["predicted_engagement_next_post"], intercept + slope * limit, atol=1e-4)
+
+
+def test_forecast_batch(api, upstream):
+    body = api.post("/forecast/batch", json={"usernames": ["alpha", "beta"], "limit": 30, "horizon": 2}).json()
+    for result in body["forecasts"]:
+        series = upstream.frame(result["username"], 30)["eng_score"].to_numpy()[::-1]
+        slope, intercept = np.polyfit(np.arange(30), series, 1)
+        assert result["posts"] == 30
+        assert np.allclose(result["predictions"], intercept + slope * np.array([30, 31]), atol=1e-4)
+
+
+def test_best_time_is_the_busiest_hour(api, upstream):
+    for limit in (120, 50):
+        body = api.get("/best_time", params={"username": "alpha", "limit": limit}).json()
+        counts = pd.to_datetime(upstream.frame("alpha", limit)["taken_at"], unit="s").dt.hour.value_counts()
+        assert counts[body["best_hour_to_post"]] == counts.max()
+
+
+def test_heatmap_counts_the_newest_limit_posts(api, upstream):
+    # the later requests read windows of the histograms stored by the first
+    for limit in (120, 30, 75):
+        body = api.get("/heatmap", params={"usernames": "alpha,beta", "limit": limit, "metric": "count"}).json()
+        assert body["posts"] == 2 * limit
+        seconds = pd.concat([upstream.frame(u, limit) for u in ("alpha", "beta")])["taken_at"].astype("int64")
+        stamps = pd.to_datetime(seconds, unit="s")
+        expected = np.zeros((7, 24))
+        np.add.at(expected, (stamps.dt.weekday, stamps.dt.hour), 1)
+        assert np.array_equal(body["values"], expected)
+
+    body = api.get("/heatmap", params={"usernames": "alpha", "limit": 75, "since": "2023-10"}).json()
+    taken_at = pd.to_datetime(upstream.frame("alpha", 75)["taken_at"].astype("int64"), unit="s")
+    assert body["posts"] == (taken_at >= "2023-10-01").sum()
+
+    assert api.get("/heatmap", params={"usernames": "alpha", "since": "notadate"}).status_code == 400
+
+
+def test_compare_summarizes_the_newest_limit_posts(api, upstream):
+    body = api.get("/compare", params={"usernames": "alpha,beta", "limit": 30}).json()
+    rows = {row["username"]: row for row in body["accounts"]}
+    for username in ("alpha", "beta"):
+        likes = upstream.frame(username, 30)["likes"]
+        assert rows[username]["posts"] == 30
+        assert rows[username]["followers"] == upstream.FOLLOWERS
+        assert np.isclose(rows[username]["avg_likes"], likes.mean(), atol=1e-4)
+        assert np.isclose(rows[username]["std_likes"], likes.std(ddof=0), atol=1e-4)
+
+    # a smaller window is read from the summary table without refetching
+    calls = len(upstream.calls)
+    body = api.get("/compare", params={"usernames": "alpha,beta", "limit": 10}).json()
+    assert len(upstream.calls) == calls
+    for row in body["accounts"]:
+        likes = upstream.frame(row["username"], 10)["likes"]
+        assert row["posts"] == 10
+        assert np.isclose(row["p50_likes"], likes.median(), atol=1e-4)
+
+    from cache import get_cache
+
+    lookups = sum(get_cache().stats()[k] for k in ("hits", "misses"))
+    api.get("/compare", params={"usernames": "alpha", "limit": 10, "refresh": True})
+    assert sum(get_cache().stats()[k] for k in ("hits", "misses")) > lookups
+
+
+def test_loaded_posts_reach_the_registry(api):
+    api.get("/forecast", params={"username": "alpha", "limit": 40})
+    body = api.get("/models", params={"usernames": "alpha"}).json()
+    account = body["models"][0]
+    assert account["posts"] == 40 and account["fetched_limit"] == 40
+    assert account["virality"]["posts"] == account["trend"]["posts"] == 40
+
+    body = api.get("/virality/predict", params={"username": "alpha", "views": 1000, "limit": 40}).json()
+    assert body["posts"] == 40
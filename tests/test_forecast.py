@@ -0,0 +1,63 @@
+import numpy as np
+
+from forecast import TrendForecaster, solve, window_stats
+
+
+def running_sums(y):
+    terms = np.column_stack([y, y * y, np.arange(len(y)) * y])
+    return np.vstack([np.zeros((1, 3)), np.cumsum(terms, axis=0)])
+
+
+def test_solve_matches_polyfit():
+    y = np.random.default_rng(1).normal(size=40)
+    slope, intercept, r2 = solve(window_stats(running_sums(y))[None, :])
+    expected_slope, expected_intercept = np.polyfit(np.arange(40), y, 1)
+    assert np.isclose(slope[0], expected_slope)
+    assert np.isclose(intercept[0], expected_intercept)
+    residuals = y - (expected_intercept + expected_slope * np.arange(40))
+    assert np.isclose(r2[0], 1 - residuals.var() / y.var())
+
+
+def test_window_matches_fit_of_newest_points():
+    y = np.random.default_rng(2).normal(size=50)
+    slope, intercept, _ = solve(window_stats(running_sums(y), limit=15)[None, :])
+    expected_slope, expected_intercept = np.polyfit(np.arange(15), y[-15:], 1)
+    assert np.isclose(slope[0], expected_slope)
+    assert np.isclose(intercept[0], expected_intercept)
+
+
+def test_incremental_update_matches_single_fit(make_posts):
+    df = make_posts(60)
+    incremental = TrendForecaster()
+    # newest posts first, then a larger fetch reaching older posts
+    assert incremental.update(df.head(10)) == 10
+    assert incremental.update(df) == 50
+    assert incremental.update(df) == 0
+
+    fit = incremental.forecast(["acct"], horizon=1)[0]
+    slope, intercept = np.polyfit(np.arange(60), df["eng_score"][::-1], 1)
+    assert fit["posts"] == 60
+    assert np.isclose(fit["slope"], slope)
+    assert np.isclose(fit["intercept"], intercept)
+
+
+def test_max_posts_keeps_newest(make_posts):
+    df = make_posts(50)
+    forecaster = TrendForecaster(max_posts=20)
+    forecaster.update(df)
+    fit = forecaster.forecast(["acct"], horizon=1)[0]
+    slope, _ = np.polyfit(np.arange(20), df["eng_score"].head(20)[::-1], 1)
+    assert fit["posts"] == 20
+    assert np.isclose(fit["slope"], slope)
+
+
+def test_forecast_limit_uses_newest_posts(make_posts):
+    df = make_posts(50)
+    forecaster = TrendForecaster()
+    forecaster.update(df)
+    fit = forecaster.forecast(["acct"], horizon=2, limit=20)[0]
+    series = df["eng_score"].head(20).to_numpy()[::-1]
+    slope, intercept = np.polyfit(np.arange(20), series, 1)
+    assert fit["posts"] == 20
+    assert np.allclose(fit["predictions"], intercept + slope * np.array([20, 21]))
+    assert np.isclose(fit["mae"], np.abs(series - (intercept + slope * np.arange(20))).mean())
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from hashtags import HashtagIndex
+
+
+def expected_counts(df):
+    return df["caption"].str.findall(r"#(\w+)").explode().value_counts()
+
+
+def test_posts_are_indexed_once(make_posts):
+    df = make_posts(60)
+    index = HashtagIndex()
+    assert index.add_posts(df.iloc[20:]) == 40
+    assert index.add_posts(df) == 20
+    assert index.add_posts(df) == 0
+
+    frequency = index.frequency(10)
+    assert frequency.to_dict() == expected_counts(df).to_dict()
+    assert index.posts_for("#TAG3") == set(df.loc[df["caption"].str.endswith("#tag3"), "id"])
+
+
+def test_limit_ranks_the_newest_posts(make_posts):
+    alpha, beta = make_posts(80, "alpha", seed=1), make_posts(30, "beta", seed=2)
+    index = HashtagIndex()
+    # older posts arrive after the newer ones, as a backfill would
+    index.add_posts(pd.concat([alpha.iloc[:25], beta]))
+    index.add_posts(alpha.iloc[25:])
+
+    window = pd.concat([alpha.iloc[:40], beta])
+    top = index.top(10, by="posts", usernames=["alpha", "beta"], limit=40).set_index("hashtag")
+    assert top["posts"].to_dict() == expected_counts(window).to_dict()
+
+    tags = window.assign(hashtag=window["caption"].str.extract(r"#(\w+)", expand=False))
+    avg_likes = tags.groupby("hashtag")["likes"].mean()
+    assert np.allclose(top["avg_likes"].sort_index(), avg_likes.sort_index())
+
+    # accounts holding no more than limit posts read their running totals
+    assert index.frequency(10, usernames=["beta"], limit=40).to_dict() == expected_counts(beta).to_dict()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from histograms import HistogramIndex, PostingHistogram, month_of
+
+
+def test_merged_histograms_equal_histogram_of_combined_posts(make_posts):
+    a, b = make_posts(200, seed=1), make_posts(300, seed=2)
+    merged = PostingHistogram.from_posts(a) + PostingHistogram.from_posts(b)
+    combined = PostingHistogram.from_posts(pd.concat([a, b]))
+    assert np.allclose(merged.data, combined.data)
+    assert merged.posts == 500
+
+
+def test_best_hour_matches_pandas(make_posts):
+    df = make_posts(500)
+    counts = pd.to_datetime(df["taken_at"], unit="s").dt.hour.value_counts()
+    assert counts[PostingHistogram.from_posts(df).best_hour("count")] == counts.max()
+
+
+def test_index_months_and_seen_posts(make_posts):
+    df = make_posts(400)
+    index = HistogramIndex()
+    assert index.add_posts(df) == 400
+    assert index.add_posts(df) == 0
+    assert np.allclose(index.histogram(["acct"]).data, PostingHistogram.from_posts(df).data)
+
+    since = pd.Timestamp("2023-10-01")
+    recent = df[pd.to_datetime(df["taken_at"], unit="s") >= since]
+    assert index.histogram(["acct"], since=since).posts == len(recent)
+
+
+def test_limit_counts_the_newest_posts(make_posts):
+    df = make_posts(400)
+    index = HistogramIndex()
+    # older posts arrive after newer ones, as with a larger fetch
+    index.add_posts(df.head(150))
+    index.add_posts(df)
+    for limit in (1, 37, 150, 399, 1000):
+        expected = PostingHistogram.from_posts(df.head(limit))
+        assert np.allclose(index.histogram(["acct"], limit=limit).data, expected.data)
+
+    newest = df.head(200)
+    since = pd.Timestamp("2023-10-01")
+    recent = newest[pd.to_datetime(newest["taken_at"], unit="s") >= since]
+    assert index.histogram(["acct"], since=since, limit=200).posts == len(recent)
+
+
+def test_invalid_month_raises():
+    with pytest.raises(ValueError):
+        month_of("notadate")
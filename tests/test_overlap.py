@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+
+from overlap import AudienceSketch, SketchStore, hash_ids
+
+
+def test_jaccard_of_one_third_overlap(tmp_path):
+    store = SketchStore(str(tmp_path))
+    # |A ∩ B| = 10k, |A ∪ B| = 30k
+    store.add_ids("a", np.arange(0, 20_000))
+    store.add_ids("b", np.arange(10_000, 30_000))
+    result = store.overlap(["a", "b"])
+    assert abs(result["jaccard"][0, 1] - 1 / 3) < 0.05
+    assert abs(result["union_reach"] - 30_000) / 30_000 < 0.03
+
+
+def test_hll_cardinality():
+    sketch = AudienceSketch()
+    sketch.add_ids(np.arange(100_000))
+    assert abs(sketch.cardinality() - 100_000) / 100_000 < 0.03
+    # adding the same ids again does not change the estimate
+    before = sketch.cardinality()
+    sketch.add_ids(np.arange(100_000))
+    assert sketch.cardinality() == before
+
+
+def test_ids_hash_the_same_in_any_batch():
+    assert len(set(hash_ids([123])) | set(hash_ids(["123"])) | set(hash_ids([" 123", "bob"])[:1])
+               | set(hash_ids([123.0, None]))) == 1
+    assert hash_ids(["1.5"])[0] != hash_ids(["1"])[0]
+
+
+def test_full_int64_range_hashes_like_strings():
+    for value in (1234567890123456789, np.iinfo(np.int64).max, np.iinfo(np.int64).min):
+        assert hash_ids(np.array([value]))[0] == hash_ids([str(value)])[0] == hash_ids([value, "bob"])[0]
+    # past int64 the id is a string either way
+    assert hash_ids(np.array([2 ** 63], dtype=np.uint64))[0] == hash_ids(["9223372036854775808"])[0]
+
+
+def test_concurrent_adds_are_not_lost(tmp_path):
+    store = SketchStore(str(tmp_path))
+    threads = [threading.Thread(target=store.add_ids, args=("acct", range(i * 1000, (i + 1) * 1000)))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get("acct").ids_added == 8000
+
+
+def test_updates_from_another_process_are_seen(tmp_path):
+    dashboard, api = SketchStore(str(tmp_path)), SketchStore(str(tmp_path))
+    api.add_ids("acct", np.arange(1000))
+    before = dashboard.version
+    assert dashboard.get("acct").ids_added == 1000
+
+    api.add_ids("acct", np.arange(1000, 3000))
+    assert dashboard.version != before
+    assert dashboard.get("acct").ids_added == 3000
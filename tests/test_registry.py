@@ -0,0 +1,62 @@
+import numpy as np
+
+from registry import ModelRegistry
+
+
+def test_older_posts_are_added_once(tmp_path, make_posts):
+    df = make_posts(50)
+    registry = ModelRegistry(str(tmp_path / "models.sqlite"))
+    assert registry.update(df.head(10), limit=10) == 10
+    assert registry.update(df, limit=50) == 40
+    assert registry.update(df, limit=50) == 0
+
+    model = registry.model(username="acct")
+    slope, intercept = np.polyfit(df["views"], df["likes"], 1)
+    assert model.n == 50
+    assert np.isclose(model.slope, slope) and np.isclose(model.intercept, intercept)
+    assert registry.fetched_limit("acct") == 50
+
+    # statistics and seen posts survive a restart
+    reopened = ModelRegistry(str(tmp_path / "models.sqlite"))
+    assert reopened.model(username="acct").n == 50
+    assert reopened.update(df) == 0
+
+
+def test_limit_fits_the_newest_posts(tmp_path, make_posts):
+    df = make_posts(60)
+    registry = ModelRegistry(str(tmp_path / "models.sqlite"))
+    registry.update(df)
+    model = registry.model(username="acct", limit=20)
+    slope, intercept = np.polyfit(df["views"].head(20), df["likes"].head(20), 1)
+    assert model.n == 20
+    assert np.isclose(model.slope, slope) and np.isclose(model.intercept, intercept)
+    assert registry.model(username="acct", limit=1000).n == 60
+
+
+def test_trend_per_account_and_cohort(tmp_path, make_posts):
+    a, b = make_posts(40, "a", seed=1), make_posts(30, "b", seed=2)
+    registry = ModelRegistry(str(tmp_path / "models.sqlite"))
+    registry.update(a)
+    registry.update(b)
+    trend = registry.model("trend", username="a")
+    slope, intercept = np.polyfit(np.arange(40), a["eng_score"][::-1], 1)
+    assert np.isclose(trend.slope, slope) and np.isclose(trend.intercept, intercept)
+
+    window = registry.model("trend", username="a", limit=10)
+    slope, _ = np.polyfit(np.arange(10), a["eng_score"].head(10)[::-1], 1)
+    assert window.n == 10 and np.isclose(window.slope, slope)
+
+    registry.set_cohort("rivals", ["A", "b"])
+    assert registry.model("trend", cohort="rivals").n == 70
+    assert registry.model("virality", cohort="rivals").n == 70
+
+
+def test_updates_from_another_process_are_seen(tmp_path, make_posts):
+    df = make_posts(50)
+    reader = ModelRegistry(str(tmp_path / "models.sqlite"))
+    writer = ModelRegistry(str(tmp_path / "models.sqlite"))
+    writer.update(df.head(10))
+    assert reader.model(username="acct").n == 10
+    writer.update(df)
+    assert reader.model(username="acct").n == 50
+    assert reader.model("trend", username="acct").n == 50
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from scheduler import RequestScheduler
+
+
+def test_concurrent_calls_share_one_request():
+    async def main():
+        scheduler = RequestScheduler(rate=1000)
+        calls = []
+
+        async def request():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(scheduler.submit("key", request) for _ in range(5)))
+        return results, calls, scheduler.stats()
+
+    results, calls, stats = asyncio.run(main())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+
+def test_token_bucket_limits_rate():
+    async def main():
+        scheduler = RequestScheduler(rate=20, burst=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await scheduler.acquire()
+        return time.monotonic() - start
+
+    # one token up front, then one every 50 ms
+    assert asyncio.run(main()) >= 0.18
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    async def main():
+        scheduler = RequestScheduler(rate=1000)
+        calls = []
+
+        async def request():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.create_task(scheduler.submit("key", request))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(scheduler.submit("key", request)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers, return_exceptions=True)
+        return leader.cancelled(), results, calls
+
+    cancelled, results, calls = asyncio.run(main())
+    assert cancelled
+    # one follower took over and ran the request for both
+    assert results == [2, 2]
+    assert len(calls) == 2
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    async def main():
+        scheduler = RequestScheduler(rate=1000)
+
+        async def request():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(scheduler.submit("key", request))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(scheduler.submit("key", request))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "result"
@@ -0,0 +1,64 @@
+import numpy as np
+
+from summaries import AccountSummaries, TDigest
+
+
+def test_merged_batches_equal_combined_summary(make_posts):
+    rng = np.random.default_rng(0)
+    a, b = rng.gamma(2, 100, 300), rng.gamma(5, 50, 700)
+    batched = AccountSummaries()
+    batched.add_posts(make_posts(len(a)).assign(likes=a))
+    batched.add_posts(make_posts(len(b), start=len(a)).assign(likes=b))
+    combined = AccountSummaries()
+    combined.add_posts(make_posts(len(a) + len(b)).assign(likes=np.concatenate([a, b])))
+
+    row, expected = batched.table(["acct"]).iloc[0], combined.table(["acct"]).iloc[0]
+    assert row["posts"] == expected["posts"] == 1000
+    values = np.concatenate([a, b])
+    assert np.isclose(row["avg_likes"], values.mean())
+    assert np.isclose(row["std_likes"], values.std())
+    assert np.isclose(row["std_likes"], expected["std_likes"])
+
+
+def test_seen_posts_are_skipped(make_posts):
+    summaries = AccountSummaries()
+    df = make_posts(10)
+    assert summaries.add_posts(df) == 10
+    assert summaries.add_posts(df) == 0
+
+
+def test_limit_summarizes_the_newest_posts(make_posts):
+    df = make_posts(300)
+    summaries = AccountSummaries()
+    # older posts arrive after newer ones, as with a larger fetch
+    summaries.add_posts(df.head(100))
+    summaries.add_posts(df)
+    newest = df.head(40)
+    row = summaries.table(["acct", "other"], limit=40).iloc[0]
+    assert row["posts"] == 40
+    assert np.isclose(row["avg_likes"], newest["likes"].mean())
+    assert np.isclose(row["std_eng_score"], newest["eng_score"].std(ddof=0))
+    assert np.isclose(row["p90_comments"], newest["comments"].quantile(0.9))
+    assert summaries.table(["acct"], limit=1000).iloc[0]["posts"] == 300
+
+
+def test_tdigest_quantiles():
+    values = np.random.default_rng(2).lognormal(3, 1, 20_000)
+    digest = TDigest()
+    for chunk in np.array_split(values, 20):
+        digest.add(chunk)
+    # accuracy is in rank: the estimate sits within a percentile of the true quantile
+    for q in (0.5, 0.9, 0.99):
+        assert abs(np.mean(values <= digest.quantile(q)) - q) < 0.01
+    assert len(digest.means) <= digest.compression
+
+
+def test_tdigest_merge_matches_single_digest():
+    values = np.random.default_rng(3).normal(size=10_000)
+    left, right, whole = TDigest(), TDigest(), TDigest()
+    left.add(values[:4000])
+    right.add(values[4000:])
+    whole.add(values)
+    merged = left.merge(right)
+    assert merged.count == whole.count == 10_000
+    assert abs(merged.quantile(0.9) - whole.quantile(0.9)) < 0.05
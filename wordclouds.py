@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import Counter
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from config import get_setting
+from normalize import post_keys
+
+WORDCLOUD_PATH = get_setting("INSTA_WORDCLOUD_PATH", os.path.join(".insta_cache", "wordclouds"))
+
+# Same token rule as WordCloud.process_text
+TOKEN_PATTERN = r"\w[\w']*"
+MAX_WORDS = 200
+
+
+def _stopwords() -> set:
+    from wordcloud import STOPWORDS
+    return {w.lower() for w in STOPWORDS}
+
+
+def _merge_plurals(freqs: dict) -> dict:
+    # "shoes" counts towards "shoe" when both occur, as WordCloud does
+    merged = dict(freqs)
+    for word, count in freqs.items():
+        if word.endswith("s") and not word.endswith("ss") and word[:-1] in merged:
+            merged[word[:-1]] += count
+            del merged[word]
+    return merged
+
+
+class WordFrequencyIndex:
+    """Caption token counts per account, updated as posts are ingested.
+
+    Tokens follow WordCloud's own rules (lower-cased, ``'s`` stripped, no
+    numbers or stopwords; no bigram collocations), so the counts can be fed
+    straight to ``WordCloud.generate_from_frequencies``. Posts already
+    counted are skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._counts = {}
+        self._stop = None
+
+    def add_posts(self, df: pd.DataFrame) -> int:
+        if df.empty:
+            return 0
+        keys = post_keys(df)
+        with self._lock:
+            if self._stop is None:
+                self._stop = _stopwords()
+            seen = np.fromiter((key in self._seen for key in keys), dtype=bool, count=len(keys))
+            new = ~seen & ~pd.Series(keys, dtype="object").duplicated().values
+            if not new.any():
+                return 0
+            self._seen.update(keys[new])
+
+            posts = df[new]
+            # tokens parsed at ingest when the caption feature stage ran
+            parsed = posts["tokens"] if "tokens" in posts else \
+                posts["caption"].fillna("").astype(str).str.lower().str.findall(TOKEN_PATTERN)
+            tokens = pd.DataFrame({
+                "username": posts["username"].astype(str).str.lower().to_numpy(dtype=object),
+                "token": parsed.to_numpy(dtype=object),
+            }).explode("token").dropna(subset=["token"])
+            tokens["token"] = tokens["token"].str.replace(r"'s$", "", regex=True)
+            tokens = tokens[~tokens["token"].str.isdigit() & ~tokens["token"].isin(self._stop) & (tokens["token"] != "")]
+
+            for username, counts in tokens.groupby("username")["token"]:
+                self._counts.setdefault(username, Counter()).update(counts.value_counts().to_dict())
+        return int(new.sum())
+
+    def frequencies(self, usernames=None, top: int = MAX_WORDS) -> dict:
+        """Merged ``{token: count}`` of the ``top`` tokens over ``usernames`` (default: all)."""
+        with self._lock:
+            names = [u.lower() for u in usernames] if usernames is not None else list(self._counts)
+            total = Counter()
+            for username in names:
+                total.update(self._counts.get(username, {}))
+        return dict(Counter(_merge_plurals(total)).most_common(top))
+
+
+def frequency_digest(freqs: dict, **options) -> str:
+    payload = json.dumps([sorted(freqs.items()), sorted(options.items())], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def render_png(freqs: dict, width: int = 900, height: int = 500, background_color: str = "white",
+               colormap: str = None, cache_dir: str = WORDCLOUD_PATH):
+    """PNG bytes of the word cloud for ``freqs``, or ``None`` without tokens.
+
+    Images are cached on disk under a digest of the frequencies and the
+    render options, so unchanged data is never laid out twice.
+    """
+    if not freqs:
+        return None
+    options = {"width": width, "height": height, "background_color": background_color, "colormap": colormap}
+    path = os.path.join(cache_dir, f"{frequency_digest(freqs, **options)}.png")
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    from wordcloud import WordCloud
+
+    wc = WordCloud(**options, max_words=len(freqs), random_state=0).generate_from_frequencies(freqs)
+    out = BytesIO()
+    wc.to_image().save(out, format="PNG")
+    png = out.getvalue()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return png
+